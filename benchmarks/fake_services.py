@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the services a cycle talks to, for load tests and offline runs.
+
+- Shoko v3: missing episodes (paginated), Series/{id}, Episode/{id}, Action/UpdateSeriesStats
+- Nyaa: RSS search (`?page=rss&u=<user>&q=<query>&p=<page>`) over a synthetic release corpus
+- qBittorrent WebUI: login, version endpoints and torrents/add
+- Discord: webhook sink accepting any POST
+
+Every service counts requests (GET /__stats), TCP connections and the peak number of
+requests handled at once, and can add a fixed latency per request.
+Only the standard library is used, so the stand-ins run anywhere the app runs.
+
+Usage:
+    python benchmarks/fake_services.py --episodes 10000 --latency-ms 20
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+RSS_PAGE_SIZE = 75
+GROUPS = ("Tsundere-Raws", "Arcedo")
+QUALITIES = ("1080p", "720p")
+SOURCES = ("CR", "ADN", "AMZN", "WEB")
+WORDS = ("Kimi", "no", "Sekai", "Hoshi", "Tensei", "Yume", "Kaze", "Mahou", "Shoujo", "Ken", "Densetsu",
+         "Akai", "Sora", "Umi", "Tsuki", "Hikari", "Kage", "Senki", "Gakuen", "Monogatari")
+
+RE_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokens(text: str) -> List[str]:
+    """Search tokens of a title; SxxEyy also yields Sxx and Eyy so 'Title S01' and 'Title E05' queries match."""
+    out = RE_TOKEN.findall(text.lower())
+    for tok in list(out):
+        m = re.fullmatch(r"s(\d+)e(\d+)", tok)
+        if m:
+            out.extend((f"s{m.group(1)}", f"e{m.group(2)}"))
+    return out
+
+
+class Corpus:
+    """
+    Synthetic library: `episodes` missing episodes spread over series of
+    `series_size` episodes, and releases on Nyaa for `available` of them.
+    """
+
+    def __init__(self, episodes: int = 1000, series_size: int = 12, available: float = 0.8, seed: int = 42):
+        rng = random.Random(seed)
+        self.series: Dict[int, dict] = {}
+        self.episodes: List[dict] = []
+        self.releases: List[dict] = []
+        series_count = max(1, -(-episodes // series_size))
+        for sid in range(1, series_count + 1):
+            name = " ".join(rng.sample(WORDS, 3)) + f" {sid}"
+            self.series[sid] = {
+                "IDs": {"ID": sid},
+                "Name": name,
+                "AniDB": {"Title": name, "Titles": [{"Name": name.upper(), "Language": "x-jat", "Type": "Synonym"}]},
+            }
+        for i in range(episodes):
+            sid = i // series_size + 1
+            number = i % series_size + 1
+            ep_id = 100000 + i
+            self.episodes.append({
+                "IDs": {"ID": ep_id, "ParentSeries": sid},
+                "Name": f"Episode {number}",
+                "AniDB": {"EpisodeNumber": number, "Type": "Normal", "AirDate": "2024-01-01"},
+            })
+            if rng.random() < available:
+                group = rng.choice(GROUPS)
+                quality = rng.choice(QUALITIES)
+                title = f"[{group}] {self.series[sid]['Name']} S01E{number:02d} VOSTFR {quality} {rng.choice(SOURCES)}"
+                self.releases.append({"title": title, "group": group, "hash": f"{ep_id:040x}"})
+        self._index: Dict[str, set] = defaultdict(set)
+        for n, release in enumerate(self.releases):
+            for tok in tokens(release["title"]):
+                self._index[tok].add(n)
+
+    def search(self, user: Optional[str], query: str, page: int = 1) -> List[dict]:
+        """Releases containing every query token (newest first), one RSS page of them."""
+        wanted = tokens(query)
+        if wanted:
+            sets = sorted((self._index.get(tok, set()) for tok in wanted), key=len)
+            hits = set.intersection(*sets) if sets else set()
+        else:
+            hits = set(range(len(self.releases)))
+        found = [self.releases[n] for n in sorted(hits, reverse=True)
+                 if not user or self.releases[n]["group"].lower() == user.lower()]
+        start = (page - 1) * RSS_PAGE_SIZE
+        return found[start:start + RSS_PAGE_SIZE]
+
+
+def rss_document(releases: List[dict]) -> str:
+    items = "".join(
+        "<item><title>{}</title><link>{}</link><guid>{}</guid></item>".format(
+            escape(r["title"]),
+            escape(f"magnet:?xt=urn:btih:{r['hash']}&dn={r['title']}"),
+            r["hash"],
+        )
+        for r in releases
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>Nyaa</title>{items}</channel></rss>'
+
+
+class FakeService:
+    """One ThreadingHTTPServer on 127.0.0.1 with request and connection counters and fixed latency."""
+
+    name = "service"
+
+    def __init__(self, corpus: Corpus, latency_ms: float = 0.0):
+        self.corpus = corpus
+        self.latency = latency_ms / 1000.0
+        self.requests: Counter = Counter()
+        # Connections accepted; keep-alive clients send many requests over few of them
+        self.connections = 0
+        # Requests being handled right now, and the most at once
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; avoid Nagle/delayed-ACK stalls
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with service._lock:
+                    service.connections += 1
+
+            def _dispatch(self, method: str):
+                parts = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if parts.path == "/__stats":
+                    return self._send(200, json.dumps(dict(service.requests)), "application/json")
+                with service._lock:
+                    service.requests[method + " " + re.sub(r"/\d+", "/{id}", parts.path)] += 1
+                    service.active += 1
+                    service.peak_active = max(service.peak_active, service.active)
+                try:
+                    if service.latency:
+                        time.sleep(service.latency)
+                    status, payload, ctype = service.handle(method, parts.path, parse_qs(parts.query), body)
+                    self._send(status, payload, ctype)
+                finally:
+                    with service._lock:
+                        service.active -= 1
+
+            def _send(self, status: int, payload: str, ctype: str):
+                data = payload.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                if service.name == "qbittorrent":
+                    self.send_header("Set-Cookie", "SID=fake; path=/")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name=f"fake-{self.name}", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, method: str, path: str, query: dict, body: bytes):
+        raise NotImplementedError
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeShoko(FakeService):
+    name = "shoko"
+
+    def handle(self, method, path, query, body):
+        path = path.rstrip("/")
+        if path.endswith("/ReleaseManagement/MissingEpisodes/Episodes"):
+            size = int((query.get("pageSize") or ["100"])[0])
+            page = int((query.get("page") or ["1"])[0])
+            items = self.corpus.episodes[(page - 1) * size:page * size]
+            return 200, json.dumps({"Total": len(self.corpus.episodes), "Page": page, "List": items}), "application/json"
+        m = re.search(r"/Series/(\d+)$", path)
+        if m and int(m.group(1)) in self.corpus.series:
+            return 200, json.dumps(self.corpus.series[int(m.group(1))]), "application/json"
+        m = re.search(r"/Episode/(\d+)$", path)
+        if m:
+            return 200, json.dumps({"IDs": {"ID": int(m.group(1))}, "Name": "Episode", "AniDB": {"Description": ""}}), "application/json"
+        if path.endswith("/Action/UpdateSeriesStats"):
+            return 200, "", "text/plain"
+        return 404, "{}", "application/json"
+
+
+class FakeNyaa(FakeService):
+    name = "nyaa"
+
+    def handle(self, method, path, query, body):
+        user = (query.get("u") or [None])[0]
+        q = (query.get("q") or [""])[0]
+        page = int((query.get("p") or ["1"])[0])
+        return 200, rss_document(self.corpus.search(user, q, page)), "application/rss+xml"
+
+
+class FakeQbit(FakeService):
+    name = "qbittorrent"
+
+    def __init__(self, corpus: Corpus, latency_ms: float = 0.0):
+        super().__init__(corpus, latency_ms)
+        self.added = 0
+
+    def handle(self, method, path, query, body):
+        if path.endswith("/auth/login"):
+            return 200, "Ok.", "text/plain"
+        if path.endswith("/app/version"):
+            return 200, "v4.6.5", "text/plain"
+        if path.endswith("/app/webapiVersion"):
+            return 200, "2.9.3", "text/plain"
+        if path.endswith("/torrents/add"):
+            self.added += 1
+            return 200, "Ok.", "text/plain"
+        return 200, "[]" if method == "GET" else "", "application/json"
+
+
+class FakeDiscord(FakeService):
+    name = "discord"
+
+    def handle(self, method, path, query, body):
+        return 200, "", "application/json"
+
+
+class FakeServices:
+    """Start all four stand-ins; use as a context manager."""
+
+    def __init__(self, corpus: Corpus, latency_ms: float = 0.0):
+        self.corpus = corpus
+        self.shoko = FakeShoko(corpus, latency_ms)
+        self.nyaa = FakeNyaa(corpus, latency_ms)
+        self.qbit = FakeQbit(corpus, latency_ms)
+        self.discord = FakeDiscord(corpus, latency_ms)
+        self.all = (self.shoko, self.nyaa, self.qbit, self.discord)
+
+    def __enter__(self):
+        for service in self.all:
+            service.start()
+        return self
+
+    def __exit__(self, *exc):
+        for service in self.all:
+            service.stop()
+
+    def urls(self) -> Dict[str, str]:
+        return {
+            "shoko": self.shoko.url + "/api/v3/",
+            "nyaa": [f"{self.nyaa.url}/?page=rss&u={g}" for g in GROUPS],
+            "qbittorrent": self.qbit.url,
+            "discord": self.discord.url + "/api/webhooks/1/fake",
+        }
+
+    def request_counts(self) -> Dict[str, int]:
+        return {service.name: sum(service.requests.values()) for service in self.all}
+
+    def connection_counts(self) -> Dict[str, int]:
+        return {service.name: service.connections for service in self.all}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fake Shoko/Nyaa/qBittorrent/Discord services")
+    parser.add_argument("--episodes", type=int, default=1000, help="Missing episodes served by Shoko")
+    parser.add_argument("--series-size", type=int, default=12, help="Episodes per series")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request")
+    args = parser.parse_args()
+
+    corpus = Corpus(args.episodes, args.series_size)
+    with FakeServices(corpus, args.latency_ms) as services:
+        # One line, so a parent process can read the URLs from stdout
+        print(json.dumps(services.urls()), flush=True)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
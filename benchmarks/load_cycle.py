@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+End-to-end load benchmark: one run_cycle against the local stand-in services.
+
+Starts benchmarks/fake_services.py in a child process (so its memory is not
+counted), builds the real clients with a config pointing at it and runs a full
+cycle: Shoko refresh and fetch, batch and per-episode searches, qBittorrent adds
+and Discord notifications. Reports episodes per minute, requests per episode
+(per service) and peak RSS of the app process.
+
+Usage:
+    python benchmarks/load_cycle.py [--episodes 10000] [--series-size 12] [--latency-ms 0] [--fanout]
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def bench_config(urls: dict, workdir: Path, episodes: int, log_level: str = "WARNING", fanout: bool = False) -> dict:
+    return {
+        "shoko": {"base_url": urls["shoko"], "api_key": "bench", "include_data_from": ["AniDB"], "page_size": 100},
+        "qbittorrent": {
+            "url": urls["qbittorrent"], "username": "admin", "password": "admin", "verify_cert": False,
+            "save_root": "/data/anime", "path_template": "{save_root}/{series}/Season {season2}",
+        },
+        "search": {
+            "nyaa": {
+                "rss_urls": urls["nyaa"],
+                "rate_limit_seconds": 0,
+                "preferred": {"language": "VOSTFR", "qualities": ["1080p", "720p"], "sources": ["CR", "ADN", "AMZN"]},
+            },
+            "alt_title_languages": ["romaji"],
+            "fanout": {"enabled": fanout},
+        },
+        "cache": {"path": str(workdir / "bench.db"), "ttl_hours": 24},
+        "notify": {"discord_webhook_url": urls["discord"]},
+        "general": {
+            "dry_run": False,
+            "max_items": episodes,
+            "language": "en",
+            "log_level": log_level,
+            "schedule_hours": 0,
+            "shoko_update_series_stats": True,
+            "shoko_update_wait_seconds": 0,
+        },
+    }
+
+
+def service_stats(urls: dict) -> Dict[str, int]:
+    import httpx
+    bases = {
+        "shoko": urls["shoko"].split("/api/")[0],
+        "nyaa": urls["nyaa"][0].split("/?")[0],
+        "qbittorrent": urls["qbittorrent"],
+        "discord": urls["discord"].split("/api/")[0],
+    }
+    return {name: sum(httpx.get(base + "/__stats").json().values()) for name, base in bases.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run one cycle against local fake services and report throughput")
+    parser.add_argument("--episodes", type=int, default=10000, help="Missing episodes in the backlog")
+    parser.add_argument("--series-size", type=int, default=12, help="Episodes per series")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency added by each fake service per request")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Directory for the cache DB (default: a temp dir; use /dev/shm to leave out disk fsync)")
+    parser.add_argument("--fanout", action="store_true", help="Enable the concurrent search mode (search.fanout)")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING))
+    # Env overrides win over the config file; keep the Shoko refresh wait out of the measurement
+    os.environ["SHOKO_UPDATE_WAIT_SECONDS"] = "0"
+
+    services = subprocess.Popen(
+        [sys.executable, str(ROOT / "benchmarks" / "fake_services.py"), "--episodes", str(args.episodes),
+         "--series-size", str(args.series_size), "--latency-ms", str(args.latency_ms)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        urls = json.loads(services.stdout.readline())
+
+        import main as app
+        from modules.cache import Cache
+        from utils.config import AppConfig
+        from utils.i18n import set_locale
+
+        set_locale("en")
+        with tempfile.TemporaryDirectory(dir=args.cache_dir) as tmp:
+            workdir = Path(tmp)
+            app_cfg = AppConfig.from_mapping(workdir / "config.yaml", bench_config(urls, workdir, args.episodes, args.log_level, args.fanout))
+            cache = Cache(app_cfg.cache_path, ttl_hours=app_cfg.cache_ttl_hours)
+            qbit, shoko, nyaa, notifier, discord, planner = app.build_clients(app_cfg, cache)
+            cycle_cfg = app.apply_app_config(app_cfg, nyaa, shoko, planner)
+            logger = logging.getLogger("main")
+
+            start = time.perf_counter()
+            app.run_cycle(cycle_cfg, logger, qbit, shoko, nyaa, cache, notifier, discord, planner=planner)
+            elapsed = time.perf_counter() - start
+            processed = len(cache.get_episode_checkpoints())
+
+        counts = service_stats(urls)
+    finally:
+        services.terminate()
+        services.wait()
+
+    total = sum(counts.values())
+    per_episode = {name: n / max(1, processed) for name, n in counts.items()}
+    # ru_maxrss is in KiB on Linux, in bytes on macOS
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    print(f"Backlog: {args.episodes} missing episodes, {args.series_size} per series, {args.latency_ms:.0f} ms latency")
+    print(f"Processed: {processed} episodes in {elapsed:.1f}s -> {processed / elapsed * 60:.0f} episodes/min")
+    print(f"Requests: {total} total, {total / max(1, processed):.2f} per episode "
+          f"({', '.join(f'{name} {n:.2f}' for name, n in per_episode.items())})")
+    print(f"Peak RSS: {peak_rss_mb:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Path template rendering benchmark.
+
+Renders a save path N times (default 100k) with the legacy per-call
+implementation (split + re.findall + str.format + safe_name on every segment)
+and with the compiled PathTemplate, checking both produce identical paths.
+
+Usage:
+    python benchmarks/path_template.py [--renders 100000] [--template "{save_root}/{series}/Season {season2}"]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.pathing import compile_path_template  # noqa: E402
+
+
+def legacy_safe_name(name):
+    if not name:
+        return ""
+    s = re.sub(r"[\\/:*?\"<>|]", "_", name)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+
+def legacy_render_path_template(template, mapping):
+    if not template:
+        return ""
+    leading = template.startswith("/")
+    segments = [seg for seg in template.split("/") if seg != ""]
+    out = []
+    for seg in segments:
+        fields = re.findall(r"{(\w+)}", seg)
+        if fields and any((mapping.get(f, "") == "") for f in fields):
+            continue
+        seg_fmt = seg.format(**mapping)
+        if fields and len(fields) == 1 and fields[0] == "save_root":
+            raw = os.path.normpath(seg_fmt)
+            if raw.startswith("/"):
+                leading = True
+                raw = raw[1:]
+            for part in [p for p in raw.split("/") if p]:
+                out.append(part)
+            continue
+        seg_fmt = legacy_safe_name(seg_fmt)
+        if seg_fmt:
+            out.append(seg_fmt)
+    path = "/".join(out)
+    if leading:
+        path = "/" + path if not path.startswith("/") else path
+    return os.path.normpath(path)
+
+
+SERIES = [
+    "My Hero Academia Season 7",
+    "Disney Twisted-Wonderland: The Animation",
+    "Re:Zero kara Hajimeru Isekai Seikatsu 3rd Season",
+    "Frieren: Beyond Journey's End",
+    "Kaiju No. 8",
+]
+
+
+def mappings(n):
+    for i in range(n):
+        ep = i % 24 + 1
+        yield {
+            'save_root': '/data/anime',
+            'series': SERIES[i % len(SERIES)],
+            'season': '' if i % 3 else '1',
+            'season2': '' if i % 3 else '01',
+            'episode': str(ep),
+            'episode2': f"{ep:02d}",
+            'quality': '1080p',
+            'group': 'Tsundere-Raws',
+            'source': 'WEB',
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark path template rendering")
+    parser.add_argument("--renders", type=int, default=100_000)
+    parser.add_argument("--template", default="{save_root}/{series}/Season {season2}/{group} [{quality}]")
+    args = parser.parse_args()
+
+    # run_cycle passes the already sanitized series name, as it does in production
+    from utils.pathing import safe_name
+    data = [dict(m, series=legacy_safe_name(m['series'])) for m in mappings(args.renders)]
+
+    start = time.perf_counter()
+    legacy = [legacy_render_path_template(args.template, m) for m in data]
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = compile_path_template(args.template).validate()
+    fast = [compiled.render(dict(m, series=safe_name(m['series']))) for m in data]
+    fast_s = time.perf_counter() - start
+
+    if legacy != fast:
+        print("FAIL: compiled template output differs from legacy renderer")
+        sys.exit(1)
+    print(f"{args.renders} renders of '{args.template}'")
+    print(f"  legacy:   {legacy_s * 1000:8.1f} ms ({legacy_s / args.renders * 1e6:.2f} us/render)")
+    print(f"  compiled: {fast_s * 1000:8.1f} ms ({fast_s / args.renders * 1e6:.2f} us/render)")
+    print(f"  speedup:  {legacy_s / fast_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
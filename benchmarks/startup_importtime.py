@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Startup import-time benchmark.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter, reports the
+slowest top-level imports and fails if a heavy dependency is imported eagerly
+or if the total exceeds the budget.
+
+Usage:
+    python benchmarks/startup_importtime.py [--budget-ms 150] [--runs 5]
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Dependencies that must only be imported on first use
+HEAVY_MODULES = ("feedparser", "bs4", "lxml", "qbittorrentapi", "tenacity", "httpx")
+
+RE_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure(target: str = "main") -> Tuple[int, Dict[str, int]]:
+    """
+    Return (total microseconds, {module: cumulative microseconds}) for one cold import.
+    The mapping holds top-level imports and their direct children (e.g. what main imports).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    total = 0
+    modules: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        m = RE_LINE.match(line)
+        if not m:
+            continue
+        # Nesting is one leading space at top level, then two more per level
+        depth = (len(m.group(3)) - 1) // 2
+        if depth == 0:
+            total += int(m.group(2))
+        if depth <= 1:
+            modules[m.group(4)] = int(m.group(2))
+    return total, modules
+
+
+def loaded_modules(target: str = "main") -> List[str]:
+    """Names of HEAVY_MODULES present in sys.modules right after importing target."""
+    code = f"import sys, {target}; print(' '.join(sorted(m for m in sys.modules if m.split('.')[0] in {HEAVY_MODULES!r})))"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return sorted({m.split(".")[0] for m in proc.stdout.split()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of main.py")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Fail if median total import time exceeds this")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    totals = []
+    last: Dict[str, int] = {}
+    for _ in range(max(1, args.runs)):
+        total, last = measure()
+        totals.append(total)
+    median_ms = statistics.median(totals) / 1000
+
+    print(f"import main: median {median_ms:.1f} ms over {len(totals)} run(s)")
+    for name, us in sorted(last.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    eager = loaded_modules()
+    if eager:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(eager)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"FAIL: {median_ms:.1f} ms exceeds budget of {args.budget_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,209 +1,613 @@
 #!/usr/bin/env python3
 import argparse
+import dataclasses
 import json
 import logging
 import os
+import socket
 import sqlite3
 import sys
 import time
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
-import yaml
 from dotenv import load_dotenv
 
-from modules.shoko_client import ShokoClient
-from modules.nyaa_search import NyaaSearcher
+from modules.shoko_client import MissingEpisode, ShokoClient
+from modules.nyaa_search import NyaaSearcher, Release
+from modules.search_providers import build_providers
 from modules.qbit_client import QbitClient
 from modules.discord_notifier import DiscordNotifier
-from modules.parser import build_queries_for_episode, infer_season_from_title
-from modules.cache import Cache
-from utils.logger import setup_logging
+from modules.parser import build_query_variants, build_series_query, infer_season_from_title
+from modules.completion_tracker import CompletionTracker, info_hash
+from modules.cache import STAGE_ADDED, STAGE_NOTIFIED, STAGE_SEARCHED, STAGE_SELECTED, Cache
+from modules.cycle_config import CycleConfig
+from modules.episode_index import EpisodeIndex
+from modules.episode_priority import EpisodePrioritizer
+from modules.work_queue import WorkQueue
+from modules.prefetch import Prefetcher
+from modules.query_planner import QueryPlanner
+from modules.work_leases import SeriesLeases
+from utils.config import AppConfig, ConfigWatcher, load_app_config, to_bool
+from utils.logger import set_log_context, setup_logging
 from utils.notifier import Notifier
-from utils.pathing import render_path_template, safe_name
-from utils.i18n import set_locale, t
-
-
-def expand_env_vars(obj):
-    if isinstance(obj, dict):
-        return {k: expand_env_vars(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [expand_env_vars(v) for v in obj]
-    if isinstance(obj, str) and obj.startswith("${") and obj.endswith("}"):
-        return os.environ.get(obj[2:-1], "")
-    return obj
-
-
-def to_bool(value, default=False) -> bool:
-    if isinstance(value, bool):
-        return value
-    if value is None:
-        return default
-    if isinstance(value, str):
-        s = value.strip().lower()
-        if s == "":
-            return default
-        if s in ("1", "true", "yes", "on"):  # common truthy
-            return True
-        if s in ("0", "false", "no", "off"):  # common falsy
-            return False
-    return bool(value)
-
-
-def load_config(path: Path) -> dict:
-    with path.open("r", encoding="utf-8") as f:
-        cfg = yaml.safe_load(f)
-    return expand_env_vars(cfg)
+from utils.pathing import safe_name
+from utils.i18n import lazy_t, set_locale, t
+from utils.ratelimit import get_rate_limiter
+from utils.circuit import get_circuit_breakers
+from utils.parse_pool import get_parse_pool
+
+
+def configure_rate_limits(cfg, feed_urls: Dict[str, list], shoko_url: str, webhook_url: Optional[str]):
+    """Register per-host token buckets from the rate_limits section (search providers by name, shoko, discord)."""
+    limits = cfg.get("rate_limits") or {}
+    limiter = get_rate_limiter()
+    for name, urls in (*feed_urls.items(), ("shoko", [shoko_url]), ("discord", [webhook_url])):
+        spec = limits.get(name) or {}
+        if not spec:
+            continue
+        rate = float(spec.get("per_second", 1))
+        burst = int(spec.get("burst", 1))
+        for url in urls:
+            if url:
+                limiter.configure(url, rate=rate, burst=burst)
+
+
+def configure_circuit_breakers(section: dict):
+    """Thresholds of the per-host circuit breakers (circuit_breaker section); open circuits stay open."""
+    get_circuit_breakers().configure(
+        enabled=to_bool(section.get("enabled", None), default=True),
+        window=int(section.get("window", 20)),
+        min_requests=int(section.get("min_requests", 5)),
+        failure_rate=float(section.get("failure_rate", 0.5)),
+        cooldown=float(section.get("cooldown_seconds", 60)),
+        max_cooldown=float(section.get("max_cooldown_seconds", 600)),
+    )
+
+
+# Settings read once when the clients are built: a reload changing them only warns, they apply after a restart
+RESTART_SETTINGS = (
+    ("shoko", "base_url"), ("shoko", "api_key"), ("shoko", "max_concurrency"), ("shoko", "keepalive_seconds"),
+    ("shoko", "json_decoder"),
+    ("qbittorrent", "url"), ("qbittorrent", "username"), ("qbittorrent", "password"), ("qbittorrent", "verify_cert"),
+    ("qbittorrent", "prefer_http"),
+    ("search", "provider"), ("search", "providers"), ("search", "nyaa", "users"), ("search", "nyaa", "rss_urls"),
+    ("search", "nyaa", "rate_limit_seconds"), ("search", "query_planner", "enabled"), ("search", "prefetch"),
+    ("notify",), ("completion",), ("coordination",), ("cache",),
+    ("general", "language"), ("general", "log_format"), ("general", "config_poll_seconds"),
+)
+
+
+def restart_settings_changed(current: AppConfig, reloaded: AppConfig) -> List[str]:
+    """Dotted names of the RESTART_SETTINGS whose value differs between two configs."""
+    def lookup(raw, path):
+        for key in path:
+            raw = raw.get(key) if hasattr(raw, "get") else None
+        return raw
+
+    changed = [".".join(path) for path in RESTART_SETTINGS if lookup(current.raw, path) != lookup(reloaded.raw, path)]
+    # dry_run itself is pushed into the clients, but the completion tracker is only built at startup
+    if current.dry_run != reloaded.dry_run and to_bool(reloaded.section("completion").get("enabled", None), default=False):
+        changed.append("general.dry_run (completion)")
+    return changed
+
+
+def apply_app_config(app_cfg: AppConfig, nyaa: NyaaSearcher, shoko: ShokoClient, planner: Optional[QueryPlanner],
+                     qbit: Optional[QbitClient] = None, discord: Optional[DiscordNotifier] = None) -> CycleConfig:
+    """Compile the cycle config and push reloadable settings into long-lived clients."""
+    cycle_cfg = CycleConfig.compile(app_cfg)
+    if qbit:
+        qbit.dry_run = app_cfg.dry_run
+    if discord:
+        discord.dry_run = app_cfg.dry_run
+    nyaa.set_scorer(cycle_cfg.scorer)
+    nyaa.set_fanout(cycle_cfg.fanout_queries, cycle_cfg.fanout_stop_score, cycle_cfg.fanout_hedge_after)
+    nyaa.set_catalog(cycle_cfg.catalog_fresh_minutes * 60)
+    configure_rate_limits(app_cfg.raw, nyaa.provider_urls(), shoko.base_url, app_cfg.section("notify").get("discord_webhook_url"))
+    configure_circuit_breakers(app_cfg.section("circuit_breaker"))
+    pool_cfg = app_cfg.section("search").get("parse_pool") or {}
+    get_parse_pool().configure(int(pool_cfg.get("workers", 0) or 0), int(float(pool_cfg.get("min_kb", 64) or 0) * 1024))
+    if planner:
+        planner.drop_after_misses = int((app_cfg.section("search").get("query_planner") or {}).get("drop_after_misses", 5))
+    logging.getLogger().setLevel(app_cfg.log_level)
+    return cycle_cfg
+
+
+def reload_config(watcher: ConfigWatcher, app_cfg: AppConfig, cycle_cfg: CycleConfig, nyaa: NyaaSearcher,
+                  shoko: ShokoClient, planner: Optional[QueryPlanner], logger: logging.Logger,
+                  qbit: Optional[QbitClient] = None, discord: Optional[DiscordNotifier] = None) -> Tuple[AppConfig, CycleConfig, bool]:
+    """
+    Swap in the config file if it changed: (app_cfg, cycle_cfg, reloaded). A file
+    that fails to load or apply is reported and the current config is kept (and
+    re-applied, in case the failure left a client half-configured). Changed
+    RESTART_SETTINGS are reported; they keep their startup values.
+    """
+    reloaded = None
+    try:
+        reloaded = watcher.poll()
+        if reloaded is None:
+            return app_cfg, cycle_cfg, False
+        new_cycle_cfg = apply_app_config(reloaded, nyaa, shoko, planner, qbit, discord)
+    except Exception as e:
+        logger.error(lazy_t("log.config_reload_failed"), reloaded.path if reloaded else watcher.path, e)
+        if reloaded is not None:
+            apply_app_config(app_cfg, nyaa, shoko, planner, qbit, discord)
+        return app_cfg, cycle_cfg, False
+    changed = restart_settings_changed(app_cfg, reloaded)
+    if changed:
+        logger.warning(lazy_t("log.config_restart_required"), ", ".join(changed))
+    return reloaded, new_cycle_cfg, True
 
 
 def ensure_cache_db(path: Path):
     path.parent.mkdir(parents=True, exist_ok=True)
 
 
-def run_cycle(cfg: dict, logger: logging.Logger, qbit: QbitClient, shoko: ShokoClient, nyaa: NyaaSearcher, cache: Cache, notifier: Notifier, discord: DiscordNotifier, max_items: int, early_exit: bool = True):
+def build_clients(app_cfg: AppConfig, cache: Cache) -> tuple:
+    """Create the long-lived clients: (qbit, shoko, nyaa, notifier, discord, planner)."""
+    cfg = app_cfg.raw
+    dry_run = app_cfg.dry_run
+    notifier = Notifier(cfg.get("notify", {}))
+
+    discord = DiscordNotifier(
+        webhook_url=cfg.get("notify", {}).get("discord_webhook_url"),
+        dry_run=dry_run
+    )
+
+    shoko = ShokoClient(
+        base_url=cfg["shoko"]["base_url"],
+        api_key=cfg["shoko"]["api_key"],
+        max_concurrency=int(cfg["shoko"].get("max_concurrency", 8) or 8),
+        keepalive_seconds=float(cfg["shoko"].get("keepalive_seconds", 30) or 30),
+        json_decoder=str(cfg["shoko"].get("json_decoder") or "auto"),
+    )
+
+    nyaa = NyaaSearcher(
+        users=cfg["search"]["nyaa"].get("users", ["Tsundere-Raws"]),
+        rss_urls=cfg["search"]["nyaa"].get("rss_urls", []),
+        preferred=cfg["search"]["nyaa"].get("preferred", {}),
+        rate_limit_seconds=int(cfg["search"]["nyaa"].get("rate_limit_seconds", 3)),
+        cache=cache,
+        providers=build_providers(cfg["search"], cache),
+    )
+
+    planner_cfg = cfg["search"].get("query_planner") or {}
+    planner = None
+    if to_bool(planner_cfg.get("enabled", None), default=True):
+        planner = QueryPlanner(cache, drop_after_misses=int(planner_cfg.get("drop_after_misses", 5)))
+
+    qbit = QbitClient(
+        url=cfg["qbittorrent"]["url"],
+        username=cfg["qbittorrent"].get("username", ""),
+        password=cfg["qbittorrent"].get("password", ""),
+        dry_run=dry_run,
+        verify_cert=bool(cfg["qbittorrent"].get("verify_cert", True)),
+        prefer_http=bool(cfg["qbittorrent"].get("prefer_http", False)),
+    )
+    return qbit, shoko, nyaa, notifier, discord, planner
+
+
+def close_clients(logger: logging.Logger, *clients):
+    """Close the long-lived clients' connection pools on shutdown."""
+    for client in clients:
+        try:
+            client.close()
+        except Exception as e:
+            logger.debug("Could not close %s: %s", type(client).__name__, e)
+
+
+def checkpoint_release(release: Release) -> dict:
+    """The part of a search result a resumed cycle needs to add and notify it."""
+    return {
+        "title": release.title,
+        "magnet": release.magnet or release.link,
+        "parsed": release.parsed or {},
+    }
+
+
+def build_episode_index(episodes: List[MissingEpisode], shoko: ShokoClient, alias_languages: list, logger: logging.Logger) -> EpisodeIndex:
+    """Index every missing episode under its series title variants and AniDB aliases."""
+    index = EpisodeIndex()
+    for ep in episodes:
+        if not ep.series_id or not ep.episode_number:
+            continue
+        try:
+            titles = shoko.get_series_titles(ep.series_id, languages=alias_languages)
+        except Exception as e:
+            logger.debug("Could not load titles for series %s: %s", ep.series_id, e)
+            continue
+        index.add_episode(ep.episode_id, titles, ep.episode_number)
+    return index
+
+
+def select_matching(results: list, index: EpisodeIndex, episode_id: int, prefound: dict) -> list:
+    """
+    Keep only releases that resolve to this episode; remember those matching other missing ones.
+    Episodes absent from the index (e.g. titles unavailable) keep their results unvalidated.
+    """
+    if episode_id not in index:
+        return results
+    matched = []
+    for r in results:
+        covered = index.resolve_all(r.parsed)
+        if episode_id in covered:
+            matched.append(r)
+        elif len(covered) == 1 and covered[0] not in prefound:
+            prefound[covered[0]] = r
+    return matched
+
+
+def batch_search_series(episodes: List[MissingEpisode], index: EpisodeIndex, shoko: ShokoClient, nyaa: NyaaSearcher, prefound: dict,
+                        cfg: CycleConfig, logger: logging.Logger):
+    """
+    Group missing episodes by series and issue one series-scoped query per feed for each
+    series of this cycle with enough missing episodes. Returned releases are distributed
+    to every missing episode they resolve to; a batch or season pack wins when it covers
+    at least `min_coverage` of the series' missing episodes.
+    """
+    min_missing = cfg.batch_min_missing
+    max_pages = cfg.batch_max_pages
+    min_coverage = cfg.batch_min_coverage
+    max_items = cfg.max_items
+
+    by_series: dict = {}
+    cycle_series: list = []
+    for ep in episodes:
+        if not ep.series_id or ep.episode_id not in index:
+            continue
+        by_series.setdefault(ep.series_id, []).append(ep.episode_id)
+        if len(cycle_series) < max_items and ep.series_id not in cycle_series:
+            cycle_series.append(ep.series_id)
+
+    for shoko_series_id in cycle_series:
+        set_log_context(series=shoko_series_id)
+        missing = [e for e in by_series[shoko_series_id] if e not in prefound]
+        if len(missing) < min_missing:
+            continue
+        series_title = shoko.get_series_name(shoko_series_id)
+        results = nyaa.search_series(build_series_query(series_title, None), max_pages=max_pages, series_id=shoko_series_id)
+
+        best_batch, best_covered = None, []
+        for r in results:
+            if not r.parsed.get("batch"):
+                continue
+            covered = [e for e in index.resolve_all(r.parsed) if e in missing]
+            if len(covered) >= min_coverage * len(missing) and len(covered) > len(best_covered):
+                best_batch, best_covered = r, covered
+        for e in best_covered:
+            prefound[e] = best_batch
+        for r in results:
+            if r.parsed.get("batch"):
+                continue
+            resolved = index.resolve(r.parsed)
+            if resolved in missing and resolved not in prefound:
+                prefound[resolved] = r
+        logger.info(lazy_t("log.batch_search_done"), series_title, sum(1 for e in missing if e in prefound), len(missing),
+                    best_batch.title if best_batch else "-")
+    set_log_context(series=None)
+
+
+def tried_queries(queries: list, results: list, early_exit: bool) -> list:
+    """Queries actually sent: with early exit, the search stops at the first query returning results."""
+    positions = [queries.index(r.query) for r in results if r.query in queries]
+    if not early_exit or not positions:
+        return list(queries)
+    return list(queries[:max(positions) + 1])
+
+
+def next_period_start(cache: Cache, attempt_ts: float) -> float:
+    """
+    Start of the schedule period that follows a cycle attempt made at `attempt_ts`:
+    the recorded cycle's start, or the attempt itself when the cycle failed before
+    recording one (qBittorrent login, Shoko fetch), so failures are retried a period later.
+    """
+    last = cache.get_cycle()
+    return max(last[0], attempt_ts) if last else attempt_ts
+
+
+def poll_completions(tracker: Optional[CompletionTracker], logger: logging.Logger):
+    """Apply qBittorrent's latest changes to the tracked downloads; failures only delay it."""
+    if tracker is None:
+        return
+    try:
+        tracker.poll()
+    except Exception as e:
+        logger.warning(lazy_t("log.completion_poll_failed"), e)
+
+
+def run_cycle(cfg: CycleConfig, logger: logging.Logger, qbit: QbitClient, shoko: ShokoClient, nyaa: NyaaSearcher, cache: Cache, notifier: Notifier, discord: DiscordNotifier, planner: Optional[QueryPlanner] = None,
+              leases: Optional[SeriesLeases] = None, tracker: Optional[CompletionTracker] = None, attempt_ts: Optional[float] = None):
+    # The cycle is recorded as started when the attempt began, before the Shoko refresh and fetch
+    attempt_ts = time.time() if attempt_ts is None else attempt_ts
     try:
         qbit.ensure_connected()
     except Exception as e:
         if not qbit.dry_run:
-            logger.error(t("log.qbit_connect_fail"), e)
+            logger.error(lazy_t("log.qbit_connect_fail"), e)
             return
         else:
-            logger.warning(t("log.qbit_not_connected_dryrun"), e)
-
-    # Request Shoko to update series stats and wait a bit to ensure fresh data (configurable)
-    # Prioritize environment variables over config file to prevent stale volume issues
-    update_enabled_env = os.environ.get("SHOKO_UPDATE_SERIES_STATS")
-    if update_enabled_env is not None:
-        update_enabled = to_bool(update_enabled_env, default=True)
+            logger.warning(lazy_t("log.qbit_not_connected_dryrun"), e)
+    poll_completions(tracker, logger)
+
+    max_items = cfg.max_items
+    early_exit = cfg.early_exit
+    cycle_start = time.monotonic()
+
+    # Resume an interrupted cycle from its checkpoints instead of refreshing and refetching
+    checkpoints: dict = {}
+    last = cache.get_cycle()
+    if (last and last[1] is None and cfg.resume_max_age_hours > 0
+            and time.time() - last[0] < cfg.resume_max_age_hours * 3600):
+        cycle_id = last[0]
+        episodes = [MissingEpisode.from_row(row) for row in cache.get_cycle_episodes()]
+        checkpoints = cache.get_episode_checkpoints()
+        logger.info(lazy_t("log.cycle_resumed"), time.strftime("%Y-%m-%d %H:%M", time.localtime(last[0])), len(checkpoints), len(episodes))
     else:
-        update_enabled = to_bool(cfg.get("general", {}).get("shoko_update_series_stats", None), default=True)
-    
-    wait_raw_env = os.environ.get("SHOKO_UPDATE_WAIT_SECONDS")
-    if wait_raw_env is not None:
-        wait_raw = wait_raw_env
-    else:
-        wait_raw = cfg.get("general", {}).get("shoko_update_wait_seconds", None)
-    
-    try:
-        wait_seconds = int(str(wait_raw).strip()) if str(wait_raw).strip() != "" else 20
-    except Exception:
-        wait_seconds = 20
-    if update_enabled:
-        logger.info(t("log.shoko_update_series_stats"))
-        try:
-            shoko.update_series_stats()
-        except Exception as e:
-            logger.warning(t("log.shoko_update_series_stats_failed"), e)
-        if wait_seconds > 0:
-            logger.info(t("log.waiting_after_shoko_update"), wait_seconds)
-            time.sleep(wait_seconds)
-
-    logger.info(t("log.fetching_missing"))
-    episodes = shoko.get_missing_episodes(
-        page_size=int(cfg["shoko"].get("page_size", 100)),
-        include_data_from=cfg["shoko"].get("include_data_from", ["AniDB"]),
-        collecting_only=bool(cfg["shoko"].get("collecting_only", False)),
-        include_xrefs=True,
-    )
-
-    logger.info(t("log.missing_found_count"), len(episodes))
-
+        # Request Shoko to update series stats and wait a bit to ensure fresh data (configurable).
+        # With completion tracking Shoko is refreshed per finished download instead.
+        # Workers sharing the cache leave the refresh to the one holding its lease.
+        if cfg.update_series_stats and tracker is None:
+            if leases and not leases.claim_global("update_series_stats"):
+                logger.info(lazy_t("log.shoko_update_series_stats_leased"))
+            else:
+                logger.info(lazy_t("log.shoko_update_series_stats"))
+                try:
+                    shoko.update_series_stats()
+                except Exception as e:
+                    logger.warning(lazy_t("log.shoko_update_series_stats_failed"), e)
+            if cfg.update_wait_seconds > 0:
+                logger.info(lazy_t("log.waiting_after_shoko_update"), cfg.update_wait_seconds)
+                time.sleep(cfg.update_wait_seconds)
+
+        logger.info(lazy_t("log.fetching_missing"))
+        # Slim records are built while pages stream in; the full episode JSON is never held
+        episodes = list(shoko.iter_missing_episodes(
+            page_size=cfg.page_size,
+            include_data_from=list(cfg.include_data_from),
+            collecting_only=cfg.collecting_only,
+        ))
+        if tracker:
+            # Downloaded and complete, but not imported by Shoko yet: nothing to search for
+            resolved = cache.resolved_episodes([ep.episode_id for ep in episodes])
+            if resolved:
+                episodes = [ep for ep in episodes if ep.episode_id not in resolved]
+                logger.info(lazy_t("log.episodes_resolved_locally"), len(resolved))
+        # Recently aired first, long-missing last; too fresh to be subbed waits for a later cycle.
+        # The persisted queue ages episodes left out by the budget so they eventually come first.
+        prioritizer = None
+        if cfg.priority_enabled:
+            prioritizer = EpisodePrioritizer(cfg.priority_min_age_hours, cfg.priority_recent_days, cfg.priority_stale_days)
+        fresh, next_available = [], None
+        if cfg.queue_enabled:
+            queue = WorkQueue(cache, prioritizer, aging_hours=cfg.queue_aging_hours, max_per_series=cfg.queue_max_per_series)
+            episodes, fresh, next_available = queue.schedule(episodes)
+        elif prioritizer:
+            episodes, fresh, next_available = prioritizer.rank(episodes)
+        if prioritizer:
+            logger.info(lazy_t("log.episodes_prioritized"), *prioritizer.counts(episodes))
+        if fresh:
+            logger.info(lazy_t("log.episodes_too_fresh"), len(fresh),
+                        time.strftime("%Y-%m-%d %H:%M", time.localtime(next_available)))
+        cycle_id = cache.start_cycle([ep.to_row() for ep in episodes], started_ts=attempt_ts)
+    set_log_context(worker=cache.worker_id, cycle=cycle_id)
+
+    logger.info(lazy_t("log.missing_found_count"), len(episodes))
+    if leases:
+        leases.reset()
+        episodes = leases.order(episodes)
+
+    shoko.reset_stats()
+    index = build_episode_index(episodes, shoko, list(cfg.alias_languages), logger) if (cfg.validate_matches or cfg.batch_enabled) else EpisodeIndex()
+    logger.debug("Episode index built: %d episodes", len(index))
+    validator = index if cfg.validate_matches else EpisodeIndex()
+    # Releases found while searching for another episode, keyed by the episode they resolve to
+    prefound: dict = {}
+
+    nyaa.reset_stats()
+    if cfg.batch_enabled:
+        pending = [ep for ep in episodes if ep.episode_id not in checkpoints]
+        if leases:
+            # Batch-search only this worker's own shard; other series are claimed one by one below
+            pending = [ep for ep in pending if leases.in_shard(ep.series_id) and leases.claim(ep.series_id)]
+        batch_search_series(pending, index, shoko, nyaa, prefound, cfg, logger)
+        # Persist batch picks so a resumed cycle keeps every episode on the same release
+        for ep_id, release in prefound.items():
+            if release.magnet or release.link:
+                cache.checkpoint_episode(ep_id, STAGE_SELECTED, checkpoint_release(release))
+    # Magnets already sent this cycle (a batch release covers several episodes)
+    added_magnets: set = {
+        release.get("magnet") for stage, release in checkpoints.values()
+        if stage in (STAGE_ADDED, STAGE_NOTIFIED) and release
+    }
     processed = 0
     added_count = 0
     not_found_count = 0
+    deferred = 0
+    budget_reason = None
     for ep in episodes:
         if processed >= max_items:
             break
+        # Budgets beyond the item count: search requests and wall time
+        if cfg.max_requests and nyaa.stats["requests"] >= cfg.max_requests:
+            budget_reason = f"{nyaa.stats['requests']} requests"
+            break
+        if cfg.max_minutes and time.monotonic() - cycle_start >= cfg.max_minutes * 60:
+            budget_reason = f"{cfg.max_minutes:g} min"
+            break
 
-        shoko_ep_id = (ep.get("IDs") or {}).get("ID") or ep.get("ID")
-        shoko_series_id = (ep.get("IDs") or {}).get("ParentSeries")
-        ep_num = (ep.get("AniDB") or {}).get("EpisodeNumber")
+        shoko_ep_id = ep.episode_id
+        shoko_series_id = ep.series_id
+        set_log_context(series=shoko_series_id, episode=shoko_ep_id)
+        if leases and not leases.claim(shoko_series_id):
+            continue
+        ep_num = ep.episode_number
         series_title = shoko.get_series_name(shoko_series_id)
         season = None  # Non fourni directement; on s'appuie sur requêtes E## + VOSTFR
 
         if not series_title or not ep_num:
-            logger.debug(t("log.insufficient_info"), series_title, ep_num, shoko_ep_id)
+            logger.debug(lazy_t("log.insufficient_info"), series_title, ep_num, shoko_ep_id)
             continue
 
-        queries = build_queries_for_episode(series_title, season, ep_num)
-
-        disp_season = int(season) if season else infer_season_from_title(series_title, default=1)
-        logger.info(t("log.searching_for"), series_title, f"{int(disp_season):02d}", int(ep_num), shoko_ep_id)
-
-        results = nyaa.search_tsundere(queries, early_exit=early_exit)
-        if not results:
-            logger.info(t("log.no_results"), queries[0])
+        stage, best = checkpoints.get(shoko_ep_id, (None, None))
+        if stage == STAGE_SEARCHED:
             not_found_count += 1
             processed += 1
             continue
+        if stage == STAGE_NOTIFIED:
+            processed += 1
+            continue
 
-        # Prendre le meilleur résultat selon préférences
-        best = results[0]
-        magnet = best.get("magnet") or best.get("link")
+        disp_season = int(season) if season else infer_season_from_title(series_title, default=1)
+        if not best:
+            variants = build_query_variants(series_title, season, ep_num)
+            if planner:
+                variants = planner.plan(shoko_series_id, variants)
+            queries = [q for _, q in variants]
+
+            logger.info(lazy_t("log.searching_for"), series_title, f"{int(disp_season):02d}", int(ep_num), shoko_ep_id)
+
+            # A series listed into the release catalog recently is searched there, without requests
+            from_catalog = nyaa.catalog_answers(shoko_series_id)
+            if shoko_ep_id in prefound:
+                logger.info(lazy_t("log.resolved_from_index"), prefound[shoko_ep_id].title)
+                raw = [prefound.pop(shoko_ep_id)]
+                results = select_matching(raw, validator, shoko_ep_id, prefound)
+            elif not from_catalog and not nyaa.searchable():
+                # Every search host's circuit is open: keep the episode for the next cycle, don't burn queries
+                deferred += 1
+                continue
+            else:
+                raw, results = [], []
+                # Try the learned feed alone with the learned variant before fanning out
+                preferred_feed = planner.preferred_feed(shoko_series_id, nyaa.feeds) if planner and early_exit else None
+                if preferred_feed:
+                    raw = nyaa.search_tsundere(queries[:1], early_exit=True, feeds=[preferred_feed], limit=cfg.max_candidates,
+                                               series_id=shoko_series_id)
+                    results = select_matching(raw, validator, shoko_ep_id, prefound)
+                if not results:
+                    raw = nyaa.search_tsundere(queries, early_exit=early_exit, limit=cfg.max_candidates,
+                                               series_id=shoko_series_id)
+                    results = select_matching(raw, validator, shoko_ep_id, prefound)
+                if not from_catalog and not raw and not nyaa.searchable():
+                    # The circuit opened during this search: an outage, not a miss to learn from
+                    deferred += 1
+                    continue
+                # Catalog answers say nothing about which query variant the feeds would have matched
+                if planner and not from_catalog:
+                    best_hit = results[0] if results else None
+                    planner.record(shoko_series_id, variants, tried_queries(queries, raw, early_exit),
+                                   best_hit.query if best_hit else None, best_hit.feed if best_hit else None)
+            if not raw:
+                logger.info(lazy_t("log.no_results"), queries[0])
+            elif not results:
+                logger.info(lazy_t("log.no_matching_release"), len(raw), series_title, int(ep_num))
+            elif not (results[0].magnet or results[0].link):
+                logger.debug(lazy_t("log.no_link_for_title"), results[0].title)
+            else:
+                # Prendre le meilleur résultat selon préférences
+                best = checkpoint_release(results[0])
+            if not best:
+                cache.checkpoint_episode(shoko_ep_id, STAGE_SEARCHED)
+                not_found_count += 1
+                processed += 1
+                continue
+            cache.checkpoint_episode(shoko_ep_id, STAGE_SELECTED, best)
+
+        magnet = best["magnet"]
         title = best.get("title")
         parsed = best.get("parsed") or {}
 
-        if not magnet:
-            logger.debug(t("log.no_link_for_title"), title)
-            not_found_count += 1
-            processed += 1
-            continue
-
         # Category: SERIES Sxx in uppercase (optional)
         s_for_cat = int(season) if season else infer_season_from_title(series_title, default=1)
-        category_enabled = True if cfg["qbittorrent"].get("category_enabled", None) is None else to_bool(cfg["qbittorrent"].get("category_enabled"), True)
-        category = f"{safe_name(series_title).upper()} S{s_for_cat:02d}" if category_enabled else None
-        # Build customizable save path from template
-        tmpl = cfg["qbittorrent"].get("path_template") or "{save_root}/{series}"
-        save_root = cfg["qbittorrent"].get("save_root", "/data/anime")
-        mapping = {
-            'save_root': save_root,
-            'series': safe_name(series_title),
-            'season': str(season or ""),
-            'season2': f"{int(season):02d}" if season else "",
-            'episode': str(ep_num or ""),
-            'episode2': f"{int(ep_num):02d}" if ep_num else "",
-            'quality': parsed.get('quality') or "",
-            'group': parsed.get('group') or "",
-            'source': parsed.get('source') or "",
-        }
-        save_path = render_path_template(tmpl, mapping)
-        # Tag: single tag (optional, customizable)
-        tag_enabled = True if cfg["qbittorrent"].get("tag_enabled", None) is None else to_bool(cfg["qbittorrent"].get("tag_enabled"), True)
-        tag_value = str(cfg["qbittorrent"].get("tag_value", "ShokoAT")) if tag_enabled else ""
-        tags = tag_value if tag_enabled and tag_value else ""
-
-        if cache.is_episode_downloaded(shoko_ep_id):
-            logger.info(t("log.already_downloaded_cache"), title)
-            processed += 1
-            continue
+        if stage != STAGE_ADDED:
+            category = f"{safe_name(series_title).upper()} S{s_for_cat:02d}" if cfg.category_enabled else None
+            # Build customizable save path from the compiled template
+            mapping = {
+                'save_root': cfg.save_root,
+                'series': safe_name(series_title),
+                'season': str(season or ""),
+                'season2': f"{int(season):02d}" if season else "",
+                'episode': str(ep_num or ""),
+                'episode2': f"{int(ep_num):02d}" if ep_num else "",
+                'quality': parsed.get('quality') or "",
+                'group': parsed.get('group') or "",
+                'source': parsed.get('source') or "",
+            }
+            save_path = cfg.path_template.render(mapping)
+            tags = cfg.tags
+
+            if cache.is_episode_downloaded(shoko_ep_id):
+                logger.info(lazy_t("log.already_downloaded_cache"), title)
+                cache.checkpoint_episode(shoko_ep_id, STAGE_NOTIFIED)
+                processed += 1
+                continue
+
+            if magnet in added_magnets:
+                logger.info(lazy_t("log.covered_by_batch"), title)
+                cache.mark_episode_downloaded(shoko_ep_id, shoko_series_id, magnet, title,
+                                              info_hash=info_hash(magnet) if tracker else None)
+                cache.checkpoint_episode(shoko_ep_id, STAGE_NOTIFIED)
+                added_count += 1
+                processed += 1
+                continue
+
+            logger.info(lazy_t("log.adding_qbit"), title)
+            try:
+                qbit.add_magnet(magnet, save_path=save_path, category=category, tags=tags)
+                cache.mark_episode_downloaded(shoko_ep_id, shoko_series_id, magnet, title,
+                                              info_hash=info_hash(magnet) if tracker else None)
+                cache.checkpoint_episode(shoko_ep_id, STAGE_ADDED)
+                added_magnets.add(magnet)
+            except Exception as e:
+                logger.error(lazy_t("log.qbit_add_fail"), e)
+                notifier.notify_error(t("notify.qbit_add_fail_title", title=title), str(e))
+                processed += 1
+                continue
+        added_count += 1
 
-        logger.info(t("log.adding_qbit"), title)
+        # Send Discord notification with episode details
         try:
-            qbit.add_magnet(magnet, save_path=save_path, category=category, tags=tags)
-            cache.mark_episode_downloaded(shoko_ep_id, shoko_series_id, magnet, title)
-            added_count += 1
-            
-            # Send Discord notification with episode details
-            try:
-                episode_details = shoko.get_episode_details(shoko_ep_id, include_data_from=["AniDB", "TmDB"])
-                discord.notify_download(
-                    series_title=series_title,
-                    season=s_for_cat,
-                    episode=int(ep_num),
-                    release_title=title,
-                    episode_details=episode_details
-                )
-            except Exception as discord_err:
-                logger.warning(t("log.discord_notification_failed"), discord_err)
-        except Exception as e:
-            logger.error(t("log.qbit_add_fail"), e)
-            notifier.notify_error(t("notify.qbit_add_fail_title", title=title), str(e))
+            episode_details = shoko.get_episode_details(shoko_ep_id, include_data_from=["AniDB", "TmDB"])
+            discord.notify_download(
+                series_title=series_title,
+                season=s_for_cat,
+                episode=int(ep_num),
+                release_title=title,
+                episode_details=episode_details
+            )
+        except Exception as discord_err:
+            logger.warning(lazy_t("log.discord_notification_failed"), discord_err)
+        cache.checkpoint_episode(shoko_ep_id, STAGE_NOTIFIED)
 
         processed += 1
-        time.sleep(nyaa.rate_limit_seconds)
 
-    logger.info(t("log.processing_done_count"), processed)
-    logger.info(t("log.cycle_summary"), len(episodes), added_count, not_found_count)
+    set_log_context(series=None, episode=None)
+    cache.finish_cycle()
+    if leases:
+        leases.reset()
+    logger.info(lazy_t("log.processing_done_count"), processed)
+    logger.info(lazy_t("log.cycle_summary"), len(episodes), added_count, not_found_count)
+    if leases:
+        logger.info(lazy_t("log.series_leased_elsewhere"), leases.worker_id, leases.refused)
+    if budget_reason:
+        logger.info(lazy_t("log.budget_exhausted"), budget_reason)
+    if deferred:
+        logger.warning(lazy_t("log.search_deferred"), deferred)
+    for host, state in get_circuit_breakers().snapshot().items():
+        if state["trips"] or state["state"] != "closed":
+            logger.info(lazy_t("log.circuit_summary"), host, state["state"], state["trips"], state["rejected"], state["retry_in"])
+    if processed:
+        logger.info(lazy_t("log.queries_per_episode"), nyaa.stats["queries"] / processed, nyaa.stats["requests"] / processed)
+        if nyaa.stats["hedged"] or nyaa.stats["cancelled"]:
+            logger.info(lazy_t("log.fanout_stats"), nyaa.stats["hedged"], nyaa.stats["cancelled"])
+    warmed, prefetch_hits = cache.take_prefetch_stats()
+    if warmed:
+        logger.info(lazy_t("log.prefetch_hit_rate"), prefetch_hits, warmed, 100.0 * prefetch_hits / warmed)
+    if nyaa.stats["coalesced"] or shoko.stats["coalesced"]:
+        logger.info(lazy_t("log.coalesced_requests"), nyaa.stats["coalesced"], shoko.stats["coalesced"])
+    if cfg.catalog_fresh_minutes:
+        dropped = cache.prune_catalog(cfg.catalog_max_rows, cfg.catalog_max_age_days)
+        logger.info(lazy_t("log.catalog_stats"), nyaa.stats["catalog"], dropped)
 
 
 def main():
@@ -235,92 +639,145 @@ def main():
             return DEFAULT_CFG_IN_IMAGE if DEFAULT_CFG_IN_IMAGE.exists() else req
         return req
 
-    pre_cfg_path = resolve_config_path(pre_args.config)
-    cfg = load_config(pre_cfg_path)
-    language = pre_args.lang or str(cfg.get("general", {}).get("language", "fr"))
-    set_locale(language)
+    # Config is loaded once; --config is the same in both parser passes
+    app_cfg = load_app_config(resolve_config_path(pre_args.config))
+    set_locale(pre_args.lang or app_cfg.language)
 
     parser = argparse.ArgumentParser(description=t("cli.description"))
     parser.add_argument("--config", default="config.yaml", help=t("cli.config_help"))
     parser.add_argument("--limit", type=int, default=None, help=t("cli.limit_help"))
     parser.add_argument("--dry-run", action="store_true", help=t("cli.dry_run_help"))
     parser.add_argument("--lang", default=None, help=t("cli.lang_help"))
+    archive_group = parser.add_mutually_exclusive_group()
+    archive_group.add_argument("--record", metavar="ARCHIVE", default=None, help=t("cli.record_help"))
+    archive_group.add_argument("--replay", metavar="ARCHIVE", default=None, help=t("cli.replay_help"))
+    parser.add_argument("--replay-latency", type=float, default=0.0, help=t("cli.replay_latency_help"))
     args = parser.parse_args()
-
-    # Re-load config with final resolution
-    cfg_path = resolve_config_path(args.config)
-    cfg = load_config(cfg_path)
-
-    log_level = getattr(logging, str(cfg.get("general", {}).get("log_level", "INFO")).upper(), logging.INFO)
-    setup_logging(level=log_level)
+    archive_path = Path(args.record or args.replay) if (args.record or args.replay) else None
+
+    # CLI flags override config/env (also applied to hot-reloaded configs)
+    def apply_cli(loaded: AppConfig) -> AppConfig:
+        overridden = dataclasses.replace(
+            loaded,
+            dry_run=args.dry_run or loaded.dry_run,
+            max_items=args.limit or loaded.max_items,
+        )
+        if archive_path:
+            # Record/replay runs a single cycle against a fresh cache so every call goes through the archive
+            overridden = dataclasses.replace(overridden, schedule_hours=0,
+                                             cache_path=archive_path.with_name(archive_path.name + ".cache.db"))
+        return overridden
+
+    app_cfg = apply_cli(app_cfg)
+    if archive_path:
+        for suffix in ("", "-wal", "-shm"):
+            app_cfg.cache_path.with_name(app_cfg.cache_path.name + suffix).unlink(missing_ok=True)
+    cfg = app_cfg.raw
+
+    setup_logging(level=app_cfg.log_level, fmt=app_cfg.log_format)
     logger = logging.getLogger("main")
 
-    # DRY-RUN: CLI flag overrides config/env; default True if unset
-    dry_run_cfg = cfg.get("general", {}).get("dry_run", None)
-    dry_run = args.dry_run or to_bool(dry_run_cfg, default=True)
-    max_items = args.limit or int(cfg.get("general", {}).get("max_items", 10))
-    
-    # EARLY_EXIT: default True if unset
-    early_exit_cfg = cfg.get("general", {}).get("early_exit", None)
-    early_exit = to_bool(early_exit_cfg, default=True)
-
-    # Scheduler interval in hours (default 24h if unset/empty)
-    sched_hours_raw = cfg.get("general", {}).get("schedule_hours", None)
-    try:
-        schedule_hours = int(str(sched_hours_raw).strip()) if str(sched_hours_raw).strip() != "" else 24
-    except Exception:
-        schedule_hours = 24
-
-    cache_path = Path(cfg.get("cache", {}).get("path", ".cache/shoko_auto_torrent.db"))
-    ensure_cache_db(cache_path)
-    cache = Cache(cache_path, ttl_hours=int(cfg.get("cache", {}).get("ttl_hours", 24)))
-
-    notifier = Notifier(cfg.get("notify", {}))
-    
-    discord = DiscordNotifier(
-        webhook_url=cfg.get("notify", {}).get("discord_webhook_url"),
-        dry_run=dry_run
-    )
-
-    shoko = ShokoClient(
-        base_url=cfg["shoko"]["base_url"],
-        api_key=cfg["shoko"]["api_key"],
-    )
-
-    nyaa = NyaaSearcher(
-        users=cfg["search"]["nyaa"].get("users", ["Tsundere-Raws"]),
-        rss_urls=cfg["search"]["nyaa"].get("rss_urls", []),
-        preferred=cfg["search"]["nyaa"].get("preferred", {}),
-        rate_limit_seconds=int(cfg["search"]["nyaa"].get("rate_limit_seconds", 3)),
-        cache=cache,
-    )
-
-    qbit = QbitClient(
-        url=cfg["qbittorrent"]["url"],
-        username=cfg["qbittorrent"].get("username", ""),
-        password=cfg["qbittorrent"].get("password", ""),
-        dry_run=dry_run,
-        verify_cert=bool(cfg["qbittorrent"].get("verify_cert", True)),
-        prefer_http=bool(cfg["qbittorrent"].get("prefer_http", False)),
-    )
-
-    logger.info(t("log.scheduler_enabled"), schedule_hours)
+    ensure_cache_db(app_cfg.cache_path)
+    # Workers sharing the cache DB coordinate through per-series leases (coordination section)
+    coord_cfg = cfg.get("coordination") or {}
+    coordinated = to_bool(coord_cfg.get("enabled", None), default=False)
+    worker_id = str(coord_cfg.get("worker_id") or socket.gethostname()) if coordinated else "default"
+    cache = Cache(app_cfg.cache_path, ttl_hours=app_cfg.cache_ttl_hours, worker_id=worker_id)
+    leases = None
+    if coordinated:
+        leases = SeriesLeases(
+            cache,
+            shard_index=int(coord_cfg.get("shard_index", 0) or 0),
+            shard_count=int(coord_cfg.get("shard_count", 1) or 1),
+            lease_seconds=int(coord_cfg.get("lease_seconds", 900) or 900),
+            steal=to_bool(coord_cfg.get("steal", None), default=True),
+        )
+        logger.info(lazy_t("log.worker_coordination"), worker_id, leases.shard_index + 1, leases.shard_count)
+
+    qbit, shoko, nyaa, notifier, discord, planner = build_clients(app_cfg, cache)
+    # Completed downloads trigger targeted Shoko refreshes (completion section); nothing is added on dry runs
+    completion_cfg = cfg.get("completion") or {}
+    tracker = None
+    if to_bool(completion_cfg.get("enabled", None), default=False) and not app_cfg.dry_run:
+        tracker = CompletionTracker(
+            qbit, shoko, cache,
+            refresh=str(completion_cfg.get("shoko_refresh") or "series").strip().lower(),
+            import_folder_id=int(completion_cfg.get("import_folder_id", 0) or 0) or None,
+            poll_seconds=float(completion_cfg.get("poll_seconds", 60) or 60),
+        )
+    logger.info(lazy_t("log.search_providers"), ", ".join(f"{p.name} ({p.kind})" for p in nyaa.providers))
+    cycle_cfg = apply_app_config(app_cfg, nyaa, shoko, planner)
+    prefetch_cfg = cfg["search"].get("prefetch") or {}
+    prefetcher = None
+    prefetch_lead = float(prefetch_cfg.get("lead_minutes", 30) or 0) * 60
+    if to_bool(prefetch_cfg.get("enabled", None), default=False):
+        prefetcher = Prefetcher(nyaa, shoko, cache, planner=planner, recent_days=cycle_cfg.priority_recent_days,
+                                variants=int(prefetch_cfg.get("variants", 1) or 1),
+                                max_queries=int(prefetch_cfg.get("max_queries", 40) or 0))
+    watcher = ConfigWatcher(app_cfg.path, overrides=apply_cli)
+    poll_seconds = max(1, int(app_cfg.section("general").get("config_poll_seconds", 30) or 30))
+
+    archive = None
+    if archive_path:
+        from utils.http_replay import install_archive
+        archive = install_archive(archive_path, "record" if args.record else "replay", latency=args.replay_latency)
+        # qbittorrentapi does not use httpx: record/replay it at the method level
+        archive.wrap_calls(qbit, "qbit", ("ensure_connected", "add_magnet", "sync_maindata"))
+
+    def wait_for_next_cycle(start_ts: float) -> bool:
+        """
+        Sleep until one schedule period after `start_ts`, swapping in a recompiled config
+        whenever the file changes. Returns False if a reload disabled scheduling.
+        """
+        nonlocal app_cfg, cycle_cfg
+        sleep_s = max(0, int(start_ts + app_cfg.schedule_hours * 3600 - time.time()))
+        logger.info(lazy_t("log.next_run_in"), sleep_s, sleep_s / 3600)
+        while True:
+            remaining = start_ts + app_cfg.schedule_hours * 3600 - time.time()
+            if remaining <= 0:
+                return True
+            time.sleep(min(poll_seconds, remaining))
+            if tracker and tracker.due():
+                poll_completions(tracker, logger)
+            if prefetcher and start_ts + app_cfg.schedule_hours * 3600 - time.time() <= prefetch_lead:
+                try:
+                    prefetcher.run()
+                except Exception as e:
+                    logger.warning(lazy_t("log.prefetch_failed"), e)
+            app_cfg, cycle_cfg, reloaded = reload_config(watcher, app_cfg, cycle_cfg, nyaa, shoko, planner, logger,
+                                                         qbit=qbit, discord=discord)
+            if reloaded:
+                logger.info(lazy_t("log.config_reloaded"), app_cfg.path)
+                if app_cfg.schedule_hours <= 0:
+                    return False
+
+    logger.info(lazy_t("log.scheduler_enabled"), app_cfg.schedule_hours)
     try:
+        # Keep the cadence across restarts: an interrupted cycle resumes right away,
+        # a finished one is followed by the next one a full period after it started
+        last = cache.get_cycle()
+        if app_cfg.schedule_hours > 0 and last and last[1] is not None and not wait_for_next_cycle(last[0]):
+            return
         while True:
-            start_ts = int(time.time())
+            attempt_ts = time.time()
             try:
-                run_cycle(cfg, logger, qbit, shoko, nyaa, cache, notifier, discord, max_items=max_items, early_exit=early_exit)
+                run_cycle(cycle_cfg, logger, qbit, shoko, nyaa, cache, notifier, discord, planner=planner, leases=leases,
+                          tracker=tracker, attempt_ts=attempt_ts)
             except Exception as e:
-                logger.exception(t("log.cycle_error"), e)
+                logger.exception(lazy_t("log.cycle_error"), e)
                 notifier.notify_error(t("notify.cycle_error_title"), str(e))
-            if schedule_hours <= 0:
+            if app_cfg.schedule_hours <= 0:
+                break
+            if prefetcher:
+                prefetcher.reset()
+            if not wait_for_next_cycle(next_period_start(cache, attempt_ts)):
                 break
-            elapsed = int(time.time()) - start_ts
-            sleep_s = max(0, schedule_hours * 3600 - elapsed)
-            logger.info(t("log.next_run_in"), sleep_s, sleep_s / 3600)
-            time.sleep(sleep_s)
     except KeyboardInterrupt:
-        logger.info(t("log.shutdown_requested"))
+        logger.info(lazy_t("log.shutdown_requested"))
+    finally:
+        close_clients(logger, nyaa, shoko, discord, notifier)
+    if archive:
+        logger.info(lazy_t("log.archive_stats"), archive.path, archive.stats["recorded"], archive.stats["replayed"], archive.stats["missed"])
 
 
 if __name__ == "__main__":
@@ -3,20 +3,53 @@ import logging
 import sqlite3
 import time
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+# Per-episode checkpoint stages of a cycle, in order
+STAGE_SEARCHED = "searched"  # searched, nothing usable found
+STAGE_SELECTED = "selected"  # release chosen, not yet sent to qBittorrent
+STAGE_ADDED = "added"        # sent to qBittorrent, notification pending
+STAGE_NOTIFIED = "notified"  # done
 
 
 class Cache:
-    def __init__(self, db_path: Path, ttl_hours: int = 24):
+    """
+    SQLite-backed state. Several workers may share the same DB file: search results,
+    downloads, planner stats and the episode queue are shared, cycle checkpoints are
+    kept per worker and series are handed out through expiring leases.
+    """
+
+    def __init__(self, db_path: Path, ttl_hours: int = 24, worker_id: str = "default"):
         self.db_path = Path(db_path)
         self.ttl_seconds = ttl_hours * 3600
+        self.worker_id = worker_id
+        # Search cache keys warmed by prefetch and not read yet, and the counters behind the hit rate
+        self._prefetched: set = set()
+        self.prefetch_stats = {'warmed': 0, 'hits': 0}
+        # Whether the release catalog has its FTS5 index (SQLite builds without FTS5 fall back to LIKE)
+        self.catalog_fts = False
         self._init_db()
         self.logger = logging.getLogger(__name__)
 
+    def _connect(self) -> sqlite3.Connection:
+        # Wait for writers from other workers instead of failing with "database is locked"
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        # In WAL mode NORMAL syncs at checkpoints instead of on every commit: a power loss can drop the last commits, not corrupt the DB
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         try:
             cur = conn.cursor()
+            # Readers no longer block the writer; the mode is stored in the DB file
+            cur.execute("PRAGMA journal_mode=WAL")
+            # Cycle checkpoints were kept for a single worker before; they are transient, so drop that layout
+            cur.execute("PRAGMA table_info(cycle_state)")
+            columns = {row[1] for row in cur.fetchall()}
+            if columns and "worker" not in columns:
+                cur.execute("DROP TABLE cycle_state")
+                cur.execute("DROP TABLE IF EXISTS cycle_episodes")
             cur.execute(
                 """
                 CREATE TABLE IF NOT EXISTS search_cache (
@@ -37,13 +70,143 @@ class Cache:
                 )
                 """
             )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_stats (
+                  series_id INTEGER NOT NULL,
+                  variant TEXT NOT NULL,
+                  hits INTEGER NOT NULL DEFAULT 0,
+                  misses INTEGER NOT NULL DEFAULT 0,
+                  ts INTEGER NOT NULL,
+                  PRIMARY KEY (series_id, variant)
+                )
+                """
+            )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS feed_stats (
+                  series_id INTEGER NOT NULL,
+                  feed TEXT NOT NULL,
+                  hits INTEGER NOT NULL DEFAULT 0,
+                  ts INTEGER NOT NULL,
+                  PRIMARY KEY (series_id, feed)
+                )
+                """
+            )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cycle_state (
+                  worker TEXT PRIMARY KEY,
+                  started_ts INTEGER NOT NULL,
+                  finished_ts INTEGER,
+                  episodes TEXT NOT NULL
+                )
+                """
+            )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cycle_episodes (
+                  worker TEXT NOT NULL,
+                  episode_id INTEGER NOT NULL,
+                  stage TEXT NOT NULL,
+                  release TEXT,
+                  ts INTEGER NOT NULL,
+                  PRIMARY KEY (worker, episode_id)
+                )
+                """
+            )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS leases (
+                  key TEXT PRIMARY KEY,
+                  worker TEXT NOT NULL,
+                  expires_ts INTEGER NOT NULL
+                )
+                """
+            )
+            # Every currently missing episode with its search history, across cycles
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS episode_queue (
+                  episode_id INTEGER PRIMARY KEY,
+                  series_id INTEGER,
+                  first_seen_ts INTEGER NOT NULL,
+                  last_attempt_ts INTEGER,
+                  attempts INTEGER NOT NULL DEFAULT 0,
+                  misses INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            # Torrents we added, followed in qBittorrent until they complete (one row per episode they cover)
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tracked_torrents (
+                  info_hash TEXT NOT NULL,
+                  episode_id INTEGER NOT NULL,
+                  series_id INTEGER,
+                  added_ts INTEGER NOT NULL,
+                  completed_ts INTEGER,
+                  PRIMARY KEY (info_hash, episode_id)
+                )
+                """
+            )
+            # Every parsed release seen in a feed page, deduplicated on title + magnet ('' when the item had none);
+            # `tokens` is the title's search tokens (title_tokens), padded with spaces
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS release_catalog (
+                  id INTEGER PRIMARY KEY,
+                  title TEXT NOT NULL,
+                  magnet TEXT NOT NULL,
+                  link TEXT,
+                  norm_title TEXT,
+                  season INTEGER,
+                  episode INTEGER,
+                  episode_end INTEGER,
+                  parsed TEXT NOT NULL,
+                  feed TEXT,
+                  uploader TEXT,
+                  published_ts INTEGER,
+                  seen_ts INTEGER NOT NULL,
+                  tokens TEXT NOT NULL,
+                  UNIQUE (title, magnet)
+                )
+                """
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS release_catalog_episode ON release_catalog(norm_title, season, episode)")
+            cur.execute("CREATE INDEX IF NOT EXISTS release_catalog_seen ON release_catalog(seen_ts)")
+            # Series whose feed listing was read to its end, and when: the catalog answers for them until it ages
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS catalog_series (
+                  series_id INTEGER PRIMARY KEY,
+                  listed_ts INTEGER NOT NULL
+                )
+                """
+            )
+            try:
+                cur.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS release_fts "
+                    "USING fts5(tokens, content='release_catalog', content_rowid='id')"
+                )
+                cur.execute(
+                    "CREATE TRIGGER IF NOT EXISTS release_catalog_ai AFTER INSERT ON release_catalog BEGIN "
+                    "INSERT INTO release_fts(rowid, tokens) VALUES (new.id, new.tokens); END"
+                )
+                cur.execute(
+                    "CREATE TRIGGER IF NOT EXISTS release_catalog_ad AFTER DELETE ON release_catalog BEGIN "
+                    "INSERT INTO release_fts(release_fts, rowid, tokens) VALUES ('delete', old.id, old.tokens); END"
+                )
+                self.catalog_fts = True
+            except sqlite3.OperationalError:
+                pass
             conn.commit()
         finally:
             conn.close()
 
-    def get_search_cache(self, key: str) -> Optional[str]:
+    def _read_search_cache(self, key: str) -> Optional[str]:
         now = int(time.time())
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         try:
             cur = conn.cursor()
             cur.execute("SELECT value, ts FROM search_cache WHERE key=?", (key,))
@@ -57,9 +220,25 @@ class Cache:
         finally:
             conn.close()
 
-    def set_search_cache(self, key: str, value: str):
+    def get_search_cache(self, key: str) -> Optional[str]:
+        value = self._read_search_cache(key)
+        if value is not None and key in self._prefetched:
+            self._prefetched.discard(key)
+            self.prefetch_stats['hits'] += 1
+        return value
+
+    def has_search_cache(self, key: str) -> bool:
+        """Fresh entry present; unlike get_search_cache, not counted as a prefetch hit."""
+        return self._read_search_cache(key) is not None
+
+    def set_search_cache(self, key: str, value: str, prefetched: bool = False):
         now = int(time.time())
-        conn = sqlite3.connect(self.db_path)
+        if prefetched:
+            self._prefetched.add(key)
+            self.prefetch_stats['warmed'] += 1
+        else:
+            self._prefetched.discard(key)
+        conn = self._connect()
         try:
             cur = conn.cursor()
             cur.execute(
@@ -70,8 +249,15 @@ class Cache:
         finally:
             conn.close()
 
+    def take_prefetch_stats(self) -> Tuple[int, int]:
+        """(pages warmed, pages read by a search) since the last call; unread warmed pages count as misses."""
+        stats = (self.prefetch_stats['warmed'], self.prefetch_stats['hits'])
+        self.prefetch_stats.update(warmed=0, hits=0)
+        self._prefetched.clear()
+        return stats
+
     def is_episode_downloaded(self, episode_id: int) -> bool:
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         try:
             cur = conn.cursor()
             cur.execute("SELECT 1 FROM downloads WHERE episode_id=?", (episode_id,))
@@ -79,15 +265,391 @@ class Cache:
         finally:
             conn.close()
 
-    def mark_episode_downloaded(self, episode_id: int, series_id: int, magnet: str, title: str):
+    def mark_episode_downloaded(self, episode_id: int, series_id: int, magnet: str, title: str,
+                                info_hash: Optional[str] = None):
+        """Record a download; with `info_hash` the torrent is also tracked until it completes."""
         now = int(time.time())
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         try:
             cur = conn.cursor()
             cur.execute(
                 "REPLACE INTO downloads(episode_id, series_id, magnet, title, ts) VALUES(?,?,?,?,?)",
                 (episode_id, series_id, magnet, title, now),
             )
+            if info_hash:
+                cur.execute(
+                    "INSERT OR IGNORE INTO tracked_torrents(info_hash, episode_id, series_id, added_ts) VALUES(?,?,?,?)",
+                    (info_hash, episode_id, series_id, now),
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def pending_torrents(self) -> Dict[str, List[Tuple[int, Optional[int]]]]:
+        """Return {info_hash: [(episode_id, series_id), ...]} of tracked torrents not yet complete."""
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT info_hash, episode_id, series_id FROM tracked_torrents WHERE completed_ts IS NULL")
+            pending: Dict[str, List[Tuple[int, Optional[int]]]] = {}
+            for info_hash, episode_id, series_id in cur.fetchall():
+                pending.setdefault(info_hash, []).append((episode_id, series_id))
+            return pending
+        finally:
+            conn.close()
+
+    def complete_torrents(self, info_hashes: List[str]):
+        """Mark torrents complete; their episodes leave the episode queue (resolved locally)."""
+        if not info_hashes:
+            return
+        now = int(time.time())
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.executemany("UPDATE tracked_torrents SET completed_ts=? WHERE info_hash=? AND completed_ts IS NULL",
+                            [(now, h) for h in info_hashes])
+            cur.executemany(
+                "DELETE FROM episode_queue WHERE episode_id IN (SELECT episode_id FROM tracked_torrents WHERE info_hash=?)",
+                [(h,) for h in info_hashes],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def untrack_torrents(self, info_hashes: List[str]):
+        """Stop following torrents that are no longer in qBittorrent."""
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.executemany("DELETE FROM tracked_torrents WHERE info_hash=? AND completed_ts IS NULL",
+                            [(h,) for h in info_hashes])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def resolved_episodes(self, missing_ids: List[int]) -> set:
+        """
+        Episodes of `missing_ids` whose torrent completed but that Shoko still lists
+        as missing (not imported yet). Completed rows of episodes Shoko no longer
+        lists are dropped.
+        """
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("CREATE TEMP TABLE current_missing(episode_id INTEGER PRIMARY KEY)")
+            cur.executemany("INSERT OR IGNORE INTO current_missing VALUES(?)", [(i,) for i in missing_ids])
+            cur.execute(
+                "DELETE FROM tracked_torrents WHERE completed_ts IS NOT NULL "
+                "AND episode_id NOT IN (SELECT episode_id FROM current_missing)"
+            )
+            cur.execute("SELECT DISTINCT episode_id FROM tracked_torrents WHERE completed_ts IS NOT NULL")
+            resolved = {row[0] for row in cur.fetchall()}
+            conn.commit()
+            return resolved
+        finally:
+            conn.close()
+
+    def add_catalog_releases(self, rows: List[tuple]) -> int:
+        """
+        Add releases to the catalog: rows of (title, magnet, link, norm_title, season,
+        episode, episode_end, parsed, feed, uploader, published_ts, tokens). A release
+        already present only has its last-seen time moved forward, at most daily, so
+        re-reading a cached page writes nothing. Returns the rows added.
+        """
+        if not rows:
+            return 0
+        now = int(time.time())
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.executemany(
+                "INSERT OR IGNORE INTO release_catalog(title, magnet, link, norm_title, season, episode, episode_end, "
+                "parsed, feed, uploader, published_ts, seen_ts, tokens) VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                [(title, magnet or "", link, norm_title, season, episode, episode_end, json.dumps(parsed), feed,
+                  uploader, published_ts, now, f" {tokens} ")
+                 for (title, magnet, link, norm_title, season, episode, episode_end, parsed, feed, uploader,
+                      published_ts, tokens) in rows],
+            )
+            added = cur.rowcount
+            cur.executemany(
+                "UPDATE release_catalog SET seen_ts=? WHERE title=? AND magnet=? AND seen_ts<?",
+                [(now, row[0], row[1] or "", now - 86400) for row in rows],
+            )
+            conn.commit()
+            return added
+        finally:
+            conn.close()
+
+    def catalog_episode(self, norm_title: str, season: Optional[int], episode: int) -> List[tuple]:
+        """
+        Catalog releases of a series (catalog_title) holding `episode`, single episodes
+        and batch ranges; season None matches any season. Rows of
+        (title, magnet, link, parsed, feed), newest first.
+        """
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            where = "norm_title=? AND episode<=? AND COALESCE(episode_end, episode)>=?"
+            params: tuple = (norm_title, episode, episode)
+            if season is not None:
+                where = "norm_title=? AND season=? AND episode<=? AND COALESCE(episode_end, episode)>=?"
+                params = (norm_title, season, episode, episode)
+            cur.execute(
+                f"SELECT title, magnet, link, parsed, feed FROM release_catalog WHERE {where} "
+                "ORDER BY COALESCE(published_ts, seen_ts) DESC", params,
+            )
+            return [(title, magnet or None, link, json.loads(parsed), feed) for title, magnet, link, parsed, feed in cur.fetchall()]
+        finally:
+            conn.close()
+
+    def catalog_match(self, tokens: List[str], limit: int = 200) -> List[tuple]:
+        """Catalog releases whose title holds every token (see title_tokens), as catalog_episode rows."""
+        tokens = [t for t in tokens if t.isalnum()]
+        if not tokens:
+            return []
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            if self.catalog_fts:
+                cur.execute(
+                    "SELECT c.title, c.magnet, c.link, c.parsed, c.feed FROM release_fts f "
+                    "JOIN release_catalog c ON c.id=f.rowid WHERE release_fts MATCH ? "
+                    "ORDER BY COALESCE(c.published_ts, c.seen_ts) DESC LIMIT ?",
+                    (" ".join(f'"{t}"' for t in tokens), limit),
+                )
+            else:
+                cur.execute(
+                    "SELECT title, magnet, link, parsed, feed FROM release_catalog WHERE "
+                    + " AND ".join("tokens LIKE ?" for _ in tokens)
+                    + " ORDER BY COALESCE(published_ts, seen_ts) DESC LIMIT ?",
+                    (*(f"% {t} %" for t in tokens), limit),
+                )
+            return [(title, magnet or None, link, json.loads(parsed), feed) for title, magnet, link, parsed, feed in cur.fetchall()]
+        finally:
+            conn.close()
+
+    def mark_catalog_listed(self, series_id: int):
+        """Record that a series' feed listing was just read to its end into the catalog."""
+        now = int(time.time())
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("REPLACE INTO catalog_series(series_id, listed_ts) VALUES(?,?)", (series_id, now))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def catalog_fresh(self, series_id: int, max_age_seconds: float) -> bool:
+        """Whether the series was listed into the catalog within `max_age_seconds`."""
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT listed_ts FROM catalog_series WHERE series_id=?", (series_id,))
+            row = cur.fetchone()
+            return row is not None and time.time() - row[0] <= max_age_seconds
+        finally:
+            conn.close()
+
+    def prune_catalog(self, max_rows: int = 0, max_age_days: float = 0) -> int:
+        """
+        Drop releases not seen for `max_age_days`, then the least recently seen beyond
+        `max_rows` (0: no limit). Listings are forgotten when anything was dropped,
+        since a listed series could have lost releases. Returns the rows dropped.
+        """
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            dropped = 0
+            if max_age_days:
+                cur.execute("DELETE FROM release_catalog WHERE seen_ts<?", (int(time.time() - max_age_days * 86400),))
+                dropped += cur.rowcount
+            if max_rows:
+                cur.execute(
+                    "DELETE FROM release_catalog WHERE id IN "
+                    "(SELECT id FROM release_catalog ORDER BY seen_ts DESC, id DESC LIMIT -1 OFFSET ?)", (max_rows,)
+                )
+                dropped += cur.rowcount
+            if dropped:
+                cur.execute("DELETE FROM catalog_series")
+            conn.commit()
+            return dropped
+        finally:
+            conn.close()
+
+    def get_query_stats(self, series_id: int) -> Dict[str, Tuple[int, int]]:
+        """Return {variant: (hits, misses)} recorded for a series."""
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT variant, hits, misses FROM query_stats WHERE series_id=?", (series_id,))
+            return {variant: (hits, misses) for variant, hits, misses in cur.fetchall()}
+        finally:
+            conn.close()
+
+    def get_feed_stats(self, series_id: int) -> Dict[str, int]:
+        """Return {feed url: hits} recorded for a series."""
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT feed, hits FROM feed_stats WHERE series_id=?", (series_id,))
+            return {feed: hits for feed, hits in cur.fetchall()}
+        finally:
+            conn.close()
+
+    def record_query_outcome(self, series_id: int, hit_variant: Optional[str], missed_variants: List[str], feed: Optional[str] = None):
+        now = int(time.time())
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            if hit_variant:
+                cur.execute(
+                    "INSERT INTO query_stats(series_id, variant, hits, misses, ts) VALUES(?,?,1,0,?) "
+                    "ON CONFLICT(series_id, variant) DO UPDATE SET hits=hits+1, ts=excluded.ts",
+                    (series_id, hit_variant, now),
+                )
+            for variant in missed_variants:
+                cur.execute(
+                    "INSERT INTO query_stats(series_id, variant, hits, misses, ts) VALUES(?,?,0,1,?) "
+                    "ON CONFLICT(series_id, variant) DO UPDATE SET misses=misses+1, ts=excluded.ts",
+                    (series_id, variant, now),
+                )
+            if feed:
+                cur.execute(
+                    "INSERT INTO feed_stats(series_id, feed, hits, ts) VALUES(?,?,1,?) "
+                    "ON CONFLICT(series_id, feed) DO UPDATE SET hits=hits+1, ts=excluded.ts",
+                    (series_id, feed, now),
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def start_cycle(self, episodes: list, started_ts: Optional[float] = None) -> int:
+        """
+        Persist the missing list of a new cycle and clear the previous cycle's checkpoints.
+        `started_ts` (epoch seconds, default: now) is when the cycle attempt began.
+        """
+        now = int(time.time() if started_ts is None else started_ts)
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM cycle_episodes WHERE worker=?", (self.worker_id,))
+            cur.execute(
+                "REPLACE INTO cycle_state(worker, started_ts, finished_ts, episodes) VALUES(?,?,NULL,?)",
+                (self.worker_id, now, json.dumps(episodes)),
+            )
+            conn.commit()
+            return now
+        finally:
+            conn.close()
+
+    def finish_cycle(self):
+        """Mark the cycle finished and release the series leases this worker holds."""
+        now = int(time.time())
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("UPDATE cycle_state SET finished_ts=? WHERE worker=?", (now, self.worker_id))
+            cur.execute("DELETE FROM leases WHERE worker=? AND key LIKE 'series:%'", (self.worker_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_cycle(self) -> Optional[Tuple[int, Optional[int]]]:
+        """Return (started_ts, finished_ts) of the last cycle; finished_ts is None if it was interrupted."""
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT started_ts, finished_ts FROM cycle_state WHERE worker=?", (self.worker_id,))
+            row = cur.fetchone()
+            return (row[0], row[1]) if row else None
+        finally:
+            conn.close()
+
+    def get_cycle_episodes(self) -> list:
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT episodes FROM cycle_state WHERE worker=?", (self.worker_id,))
+            row = cur.fetchone()
+            return json.loads(row[0]) if row else []
+        finally:
+            conn.close()
+
+    def get_episode_checkpoints(self) -> Dict[int, Tuple[str, Optional[dict]]]:
+        """Return {episode_id: (stage, release)} for the current cycle."""
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT episode_id, stage, release FROM cycle_episodes WHERE worker=?", (self.worker_id,))
+            return {ep: (stage, json.loads(release) if release else None) for ep, stage, release in cur.fetchall()}
+        finally:
+            conn.close()
+
+    def checkpoint_episode(self, episode_id: int, stage: str, release: Optional[dict] = None):
+        """
+        Record an episode's stage; the chosen release is kept when a later stage omits it.
+        The search stages also count as an attempt in the episode queue (same commit).
+        """
+        now = int(time.time())
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO cycle_episodes(worker, episode_id, stage, release, ts) VALUES(?,?,?,?,?) "
+                "ON CONFLICT(worker, episode_id) DO UPDATE SET stage=excluded.stage, "
+                "release=COALESCE(excluded.release, release), ts=excluded.ts",
+                (self.worker_id, episode_id, stage, json.dumps(release) if release is not None else None, now),
+            )
+            if stage in (STAGE_SEARCHED, STAGE_SELECTED):
+                cur.execute(
+                    "UPDATE episode_queue SET last_attempt_ts=?, attempts=attempts+1, misses=misses+? WHERE episode_id=?",
+                    (now, 1 if stage == STAGE_SEARCHED else 0, episode_id),
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def sync_episode_queue(self, episodes: List[Tuple[int, Optional[int]]]) -> Dict[int, Tuple[int, int, int]]:
+        """
+        Make the queue hold exactly the given (episode_id, series_id) pairs: new ones
+        are added, episodes no longer missing are dropped. Returns
+        {episode_id: (waiting_since_ts, attempts, misses)}, waiting since the last
+        search attempt or, if never searched, since the episode was first seen.
+        """
+        now = int(time.time())
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("CREATE TEMP TABLE current_missing(episode_id INTEGER PRIMARY KEY, series_id INTEGER)")
+            cur.executemany("INSERT OR IGNORE INTO current_missing VALUES(?,?)", episodes)
+            cur.execute("DELETE FROM episode_queue WHERE episode_id NOT IN (SELECT episode_id FROM current_missing)")
+            cur.execute(
+                "INSERT OR IGNORE INTO episode_queue(episode_id, series_id, first_seen_ts) "
+                "SELECT episode_id, series_id, ? FROM current_missing", (now,)
+            )
+            cur.execute("SELECT episode_id, COALESCE(last_attempt_ts, first_seen_ts), attempts, misses FROM episode_queue")
+            state = {row[0]: (row[1], row[2], row[3]) for row in cur.fetchall()}
+            conn.commit()
+            return state
+        finally:
+            conn.close()
+
+    def claim_lease(self, key: str, ttl_seconds: int, now: Optional[float] = None) -> bool:
+        """
+        Take or extend the lease on `key` for this worker; fails while another worker
+        holds it. `now` (epoch seconds, default: the current time) is the caller's clock.
+        """
+        now = int(time.time() if now is None else now)
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO leases(key, worker, expires_ts) VALUES(?,?,?) "
+                "ON CONFLICT(key) DO UPDATE SET worker=excluded.worker, expires_ts=excluded.expires_ts "
+                "WHERE leases.worker=excluded.worker OR leases.expires_ts<?",
+                (key, self.worker_id, now + ttl_seconds, now),
+            )
             conn.commit()
+            return cur.rowcount > 0
         finally:
             conn.close()
@@ -0,0 +1,106 @@
+import base64
+import logging
+import re
+import time
+from typing import Dict, Optional
+
+RE_BTIH = re.compile(r"xt=urn:btih:([0-9a-zA-Z]+)")
+# Refresh actions run on Shoko once a download completes
+REFRESH_ACTIONS = ("series", "import_folder", "none")
+
+
+def info_hash(magnet: Optional[str]) -> Optional[str]:
+    """Lowercase hex v1 info hash of a magnet link (hex or base32 btih), as qBittorrent reports it."""
+    m = RE_BTIH.search(magnet or "")
+    if not m:
+        return None
+    value = m.group(1)
+    if len(value) == 40:
+        return value.lower()
+    if len(value) == 32:
+        try:
+            return base64.b32decode(value.upper()).hex()
+        except ValueError:
+            return None
+    return None
+
+
+class CompletionTracker:
+    """
+    Follows the torrents we added (`tracked_torrents`) through qBittorrent's
+    incremental `sync/maindata`: each poll sends the previous `rid` and only
+    receives what changed. When a torrent completes its episodes are marked
+    resolved locally and Shoko is asked to refresh just those series (or to scan
+    one import folder), instead of a global UpdateSeriesStats every cycle.
+    """
+
+    def __init__(self, qbit, shoko, cache, refresh: str = "series", import_folder_id: Optional[int] = None,
+                 poll_seconds: float = 60, clock=time.monotonic):
+        if refresh not in REFRESH_ACTIONS:
+            raise ValueError(f"Unknown completion refresh action '{refresh}'")
+        if refresh == "import_folder" and not import_folder_id:
+            raise ValueError("completion.import_folder_id is required with shoko_refresh: import_folder")
+        self.qbit = qbit
+        self.shoko = shoko
+        self.cache = cache
+        self.refresh = refresh
+        self.import_folder_id = import_folder_id
+        self.poll_seconds = max(0.0, float(poll_seconds))
+        self._clock = clock
+        self._last_poll: Optional[float] = None
+        self.rid = 0
+        # info hash -> last known progress (0..1) of tracked torrents, kept up to date from the deltas
+        self._progress: Dict[str, float] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def due(self) -> bool:
+        return self._last_poll is None or self._clock() - self._last_poll >= self.poll_seconds
+
+    def poll(self) -> int:
+        """Apply one sync delta; returns how many episodes were resolved."""
+        self._last_poll = self._clock()
+        pending = self.cache.pending_torrents()
+        if not pending:
+            return 0
+        data = self.qbit.sync_maindata(self.rid)
+        self.rid = int(data.get("rid") or 0)
+        full = bool(data.get("full_update"))
+        if full:
+            self._progress.clear()
+        for h, fields in (data.get("torrents") or {}).items():
+            if h in pending and "progress" in fields:
+                self._progress[h] = float(fields["progress"])
+        for h in data.get("torrents_removed") or []:
+            self._progress.pop(h, None)
+
+        unknown = [h for h in pending if h not in self._progress]
+        if unknown and full:
+            # Not in a full list: removed from qBittorrent (or never added), nothing to wait for
+            self.logger.debug("Untracking %d torrent(s) missing from qBittorrent", len(unknown))
+            self.cache.untrack_torrents(unknown)
+        elif unknown:
+            # Deltas only describe torrents that changed; ask for the full list next time
+            self.rid = 0
+
+        done = [h for h in pending if self._progress.get(h, 0.0) >= 1.0]
+        if not done:
+            return 0
+        from utils.i18n import lazy_t
+        self.cache.complete_torrents(done)
+        for h in done:
+            self._progress.pop(h, None)
+        episodes = [ep for h in done for ep in pending[h]]
+        self.logger.info(lazy_t("log.downloads_completed"), len(done), len(episodes))
+        self._refresh_shoko({series_id for _, series_id in episodes if series_id})
+        return len(episodes)
+
+    def _refresh_shoko(self, series_ids: set):
+        try:
+            if self.refresh == "import_folder":
+                self.shoko.scan_import_folder(self.import_folder_id)
+            elif self.refresh == "series":
+                for series_id in sorted(series_ids):
+                    self.shoko.refresh_series(series_id)
+        except Exception as e:
+            from utils.i18n import lazy_t
+            self.logger.warning(lazy_t("log.shoko_refresh_failed"), e)
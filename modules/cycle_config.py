@@ -0,0 +1,136 @@
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from modules.parser import ReleaseScorer
+from utils.config import AppConfig, to_bool, to_int
+from utils.pathing import PathTemplate, compile_path_template
+
+# Friendly names accepted in search.alt_title_languages, mapped to AniDB language codes
+ALT_TITLE_LANGUAGE_CODES = {
+    "romaji": "x-jat",
+    "japanese": "ja",
+    "english": "en",
+    "french": "fr",
+}
+
+
+def alias_language_codes(languages) -> Tuple[str, ...]:
+    return tuple(ALT_TITLE_LANGUAGE_CODES.get(str(l).strip().lower(), str(l).strip().lower()) for l in (languages or []))
+
+
+@dataclass(frozen=True)
+class CycleConfig:
+    """
+    Everything run_cycle needs, resolved once per config load: flags parsed,
+    env overrides applied, the save path template compiled and the release
+    scorer built. A reload produces a new instance swapped in between cycles.
+    """
+    max_items: int
+    # Further cycle budgets, 0 = unlimited: search requests sent and wall time
+    max_requests: int
+    max_minutes: float
+    early_exit: bool
+    # Interrupted cycles younger than this resume from their checkpoints (0 disables)
+    resume_max_age_hours: int
+    # Shoko
+    update_series_stats: bool
+    update_wait_seconds: int
+    page_size: int
+    include_data_from: Tuple[str, ...]
+    collecting_only: bool
+    # Episode order by air date (see modules/episode_priority.py)
+    priority_enabled: bool
+    priority_min_age_hours: float
+    priority_recent_days: float
+    priority_stale_days: float
+    # Persisted episode queue (aging across cycles, per-series cap)
+    queue_enabled: bool
+    queue_aging_hours: float
+    queue_max_per_series: int
+    # Search
+    validate_matches: bool
+    max_candidates: Optional[int]
+    alias_languages: Tuple[str, ...]
+    batch_enabled: bool
+    batch_min_missing: int
+    batch_max_pages: int
+    batch_min_coverage: float
+    # Concurrent query variants (0 = sequential), stop score (None = best possible) and hedge delay (0 = off)
+    fanout_queries: int
+    fanout_stop_score: Optional[int]
+    fanout_hedge_after: float
+    # Release catalog: listing freshness (0 = catalog off) and retention (0 = unbounded)
+    catalog_fresh_minutes: float
+    catalog_max_rows: int
+    catalog_max_age_days: float
+    scorer: ReleaseScorer
+    # qBittorrent
+    category_enabled: bool
+    tags: str
+    save_root: str
+    path_template: PathTemplate
+
+    @classmethod
+    def compile(cls, app_cfg: AppConfig) -> "CycleConfig":
+        general = app_cfg.section("general")
+        shoko = app_cfg.section("shoko")
+        search = app_cfg.section("search")
+        batch = search.get("batch") or {}
+        fanout = search.get("fanout") or {}
+        catalog = search.get("catalog") or {}
+        priority = search.get("priority") or {}
+        queue = search.get("queue") or {}
+        qbit = app_cfg.section("qbittorrent")
+
+        # Prioritize environment variables over config file to prevent stale volume issues
+        update_env = os.environ.get("SHOKO_UPDATE_SERIES_STATS")
+        update_raw = update_env if update_env is not None else general.get("shoko_update_series_stats", None)
+        wait_env = os.environ.get("SHOKO_UPDATE_WAIT_SECONDS")
+        wait_raw = wait_env if wait_env is not None else general.get("shoko_update_wait_seconds", None)
+
+        # Tag: single tag (optional, customizable)
+        tag_enabled = to_bool(qbit.get("tag_enabled", None), default=True)
+        tag_value = str(qbit.get("tag_value", "ShokoAT") or "") if tag_enabled else ""
+
+        return cls(
+            max_items=app_cfg.max_items,
+            max_requests=to_int(general.get("max_requests", None), 0),
+            max_minutes=float(general.get("max_minutes", 0) or 0),
+            early_exit=app_cfg.early_exit,
+            resume_max_age_hours=to_int(general.get("resume_max_age_hours", None), 12),
+            update_series_stats=to_bool(update_raw, default=True),
+            update_wait_seconds=to_int(wait_raw, 20),
+            page_size=to_int(shoko.get("page_size", None), 100),
+            include_data_from=tuple(shoko.get("include_data_from", ("AniDB",)) or ()),
+            collecting_only=to_bool(shoko.get("collecting_only", None), default=False),
+            priority_enabled=to_bool(priority.get("enabled", None), default=False),
+            priority_min_age_hours=float(priority.get("min_age_hours", 12)),
+            priority_recent_days=float(priority.get("recent_days", 14)),
+            # 0 never demotes
+            priority_stale_days=float(priority.get("stale_days", 180) or 0),
+            queue_enabled=to_bool(queue.get("enabled", None), default=False),
+            queue_aging_hours=float(queue.get("aging_hours", 24) or 0),
+            queue_max_per_series=to_int(queue.get("max_per_series", None), 0),
+            validate_matches=to_bool(search.get("validate_matches", None), default=False),
+            # 0 keeps every result
+            max_candidates=to_int(search.get("max_candidates", None), 20) or None,
+            alias_languages=alias_language_codes(search.get("alt_title_languages", ())),
+            batch_enabled=to_bool(batch.get("enabled", None), default=False),
+            batch_min_missing=to_int(batch.get("min_missing", None), 3),
+            batch_max_pages=to_int(batch.get("max_pages", None), 2),
+            batch_min_coverage=float(batch.get("min_coverage", 0.5)),
+            fanout_queries=max(1, to_int(fanout.get("parallel_queries", None), 3)) if to_bool(fanout.get("enabled", None), default=False) else 0,
+            # 0 stops only on the best score the preferences can give
+            fanout_stop_score=to_int(fanout.get("stop_score", None), 0) or None,
+            fanout_hedge_after=float(fanout.get("hedge_after_seconds", 2.0) or 0),
+            catalog_fresh_minutes=float(catalog.get("fresh_minutes", 120) or 0) if to_bool(catalog.get("enabled", None), default=False) else 0.0,
+            catalog_max_rows=to_int(catalog.get("max_rows", None), 50000),
+            catalog_max_age_days=float(catalog.get("max_age_days", 60) or 0),
+            scorer=ReleaseScorer((search.get("nyaa") or {}).get("preferred", {})),
+            category_enabled=to_bool(qbit.get("category_enabled", None), default=True),
+            tags=tag_value,
+            save_root=str(qbit.get("save_root", "/data/anime")),
+            # Raises ValueError on unknown placeholders so bad templates fail at startup/reload
+            path_template=compile_path_template(qbit.get("path_template") or "{save_root}/{series}").validate(),
+        )
@@ -1,8 +1,8 @@
 import logging
 from typing import Dict, Optional
 
-import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from utils.ratelimit import get_rate_limiter
+from utils.retry import http_retry
 
 
 class DiscordNotifier:
@@ -13,17 +13,29 @@ class DiscordNotifier:
         self.dry_run = dry_run
         self.logger = logging.getLogger(__name__)
         self.enabled = bool(webhook_url and webhook_url.strip())
+        # Keep-alive client, created on the first notification and kept until close()
+        self._client = None
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8), reraise=False,
-           retry=retry_if_exception_type((httpx.HTTPError,)))
+    def _http(self):
+        if self._client is None:
+            import httpx
+            from utils.http_replay import http_transport
+            self._client = httpx.Client(timeout=10, transport=http_transport())
+        return self._client
+    
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+    
+    @http_retry(reraise=False)
     def _send_webhook(self, payload: Dict) -> None:
         """Send Discord webhook with retry logic."""
         if not self.enabled:
             return
-        
-        with httpx.Client(timeout=10) as client:
-            response = client.post(self.webhook_url, json=payload)
-            response.raise_for_status()
+        get_rate_limiter().acquire(self.webhook_url)
+        response = self._http().post(self.webhook_url, json=payload)
+        response.raise_for_status()
     
     def notify_download(
         self,
@@ -47,7 +59,7 @@ class DiscordNotifier:
             return
         
         if self.dry_run:
-            self.logger.info(f"[DRY-RUN] Would send Discord notification: {series_title} S{season:02d}E{episode:02d}")
+            self.logger.info("[DRY-RUN] Would send Discord notification: %s S%02dE%02d", series_title, season, episode)
             return
         
         # Build embed
@@ -131,6 +143,6 @@ class DiscordNotifier:
         
         try:
             self._send_webhook(payload)
-            self.logger.info(f"Discord notification sent: {series_title} S{season:02d}E{episode:02d}")
+            self.logger.info("Discord notification sent: %s S%02dE%02d", series_title, season, episode)
         except Exception as e:
-            self.logger.error(f"Failed to send Discord notification: {e}")
+            self.logger.error("Failed to send Discord notification: %s", e)
@@ -0,0 +1,112 @@
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from modules.parser import infer_season_from_title, normalize_series_title, sanitize_title_for_nyaa, shorten_title
+
+# Sentinel stored when two different episodes collide on the same key
+_AMBIGUOUS = -1
+
+
+def title_key(title: Optional[str]) -> str:
+    """
+    Normalize a title into a lookup key: sanitized, casefolded, and with any
+    remaining separators (hyphens, underscores, brackets) collapsed to spaces.
+    """
+    if not title:
+        return ""
+    s = sanitize_title_for_nyaa(title).casefold()
+    s = re.sub(r"[\W_]+", " ", s)
+    return s.strip()
+
+
+def title_variants(title: str) -> Set[str]:
+    """Keys for every title variant the query builder may have searched for."""
+    cleaned = normalize_series_title(title)
+    sanitized = sanitize_title_for_nyaa(cleaned)
+    shortened = shorten_title(sanitized, max_words=5)
+    keys = {title_key(title), title_key(cleaned), title_key(sanitized), title_key(shortened)}
+    keys.discard("")
+    return keys
+
+
+class EpisodeIndex:
+    """
+    Reverse lookup built once per cycle from the Shoko missing list.
+    Maps (title key, season, episode) to the Shoko episode ID so any parsed
+    release can be resolved in O(1) and validated against the series it claims.
+    A season of None is indexed too, for E## releases that carry no season.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, Optional[int], int], int] = {}
+        # (title key, season) -> {episode number: episode ID}, used to resolve batches and season packs
+        self._seasons: Dict[Tuple[str, int], Dict[int, int]] = {}
+        self._episodes: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._episodes)
+
+    def __contains__(self, episode_id: int) -> bool:
+        return episode_id in self._episodes
+
+    def _put(self, key: Tuple[str, Optional[int], int], episode_id: int):
+        current = self._entries.get(key)
+        if current is None:
+            self._entries[key] = episode_id
+        elif current != episode_id:
+            self._entries[key] = _AMBIGUOUS
+
+    def add_episode(self, episode_id: int, titles: Iterable[str], episode: int, season: Optional[int] = None):
+        """Index one missing episode under every variant of every known series title."""
+        titles = [t for t in titles if t]
+        if not episode_id or not titles or not episode:
+            return
+        ep = int(episode)
+        default_season = int(season) if season else infer_season_from_title(titles[0], default=1)
+        for title in titles:
+            s = int(season) if season else infer_season_from_title(title, default=default_season)
+            for key in title_variants(title):
+                self._put((key, s, ep), episode_id)
+                self._put((key, None, ep), episode_id)
+                season_eps = self._seasons.setdefault((key, s), {})
+                if season_eps.get(ep, episode_id) != episode_id:
+                    season_eps[ep] = _AMBIGUOUS
+                else:
+                    season_eps[ep] = episode_id
+        self._episodes.add(episode_id)
+
+    def resolve(self, parsed: Optional[Dict]) -> Optional[int]:
+        """Return the Shoko episode ID a single-episode release belongs to, or None."""
+        if not parsed or parsed.get('batch') or not parsed.get('episode'):
+            return None
+        key = title_key(parsed.get('title'))
+        if not key:
+            return None
+        found = self._entries.get((key, parsed.get('season'), int(parsed['episode'])))
+        if found is None or found == _AMBIGUOUS:
+            return None
+        return found
+
+    def resolve_all(self, parsed: Optional[Dict]) -> List[int]:
+        """
+        Return every missing Shoko episode ID a release covers: one for a single
+        episode, the indexed episodes inside the range for a batch, or all indexed
+        episodes of the season for a season pack.
+        """
+        if not parsed:
+            return []
+        if not parsed.get('batch'):
+            found = self.resolve(parsed)
+            return [found] if found is not None else []
+        key = title_key(parsed.get('title'))
+        if not key or parsed.get('season') is None:
+            return []
+        season_eps = self._seasons.get((key, int(parsed['season']))) or {}
+        start, end = parsed.get('episode'), parsed.get('episode_end')
+        return [
+            episode_id for ep, episode_id in sorted(season_eps.items())
+            if episode_id != _AMBIGUOUS and (start is None or start <= ep <= (end or start))
+        ]
+
+    def matches(self, parsed: Optional[Dict], episode_id: int) -> bool:
+        return episode_id in self.resolve_all(parsed)
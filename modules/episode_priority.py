@@ -0,0 +1,84 @@
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+# Tiers, best first
+RECENT = 0
+OLDER = 1
+UNDATED = 2
+STALE = 3
+
+
+def air_timestamp(air_date: Optional[str]) -> Optional[float]:
+    """Epoch seconds of an AniDB air date ('2024-01-01' or ISO datetime, UTC); None if missing or invalid."""
+    if not air_date:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(air_date).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class EpisodePrioritizer:
+    """
+    Orders missing episodes by where a search is most likely to hit, using the
+    AniDB air date from the Shoko payload: episodes aired within `recent_days`
+    first (newest first), then older ones, then undated ones, then those aired
+    more than `stale_days` ago (long missing, probably never released in the
+    wanted language). Episodes aired less than `min_age_hours` ago (or not yet)
+    are too fresh to be subbed and are deferred to a later cycle.
+    """
+
+    def __init__(self, min_age_hours: float = 12, recent_days: float = 14, stale_days: float = 180, clock=time.time):
+        self.min_age = float(min_age_hours) * 3600
+        self.recent = float(recent_days) * 86400
+        self.stale = float(stale_days) * 86400 if stale_days else None
+        self._clock = clock
+
+    def tier(self, aired: Optional[float], now: float) -> int:
+        if aired is None:
+            return UNDATED
+        age = now - aired
+        if age <= self.recent:
+            return RECENT
+        if self.stale is not None and age > self.stale:
+            return STALE
+        return OLDER
+
+    def rank(self, episodes: list, waits: Optional[Dict[int, float]] = None,
+             aging_hours: float = 0) -> Tuple[list, list, Optional[float]]:
+        """
+        (episodes to search in priority order, deferred episodes, epoch second
+        the first deferred one is expected to be available or None). With `waits`
+        (seconds each episode has been waiting for a search) each full `aging_hours`
+        of waiting moves an episode up one tier, so nothing starves. Stable within
+        equal keys.
+        """
+        now = self._clock()
+        waits = waits or {}
+        aging = float(aging_hours) * 3600
+        ranked, deferred = [], []
+        next_available = None
+        for n, ep in enumerate(episodes):
+            aired = air_timestamp(ep.air_date)
+            if aired is not None and now - aired < self.min_age:
+                deferred.append(ep)
+                available = aired + self.min_age
+                next_available = available if next_available is None else min(next_available, available)
+                continue
+            # Whole steps only, so air date still orders episodes of the same tier and age
+            boost = int(waits.get(ep.episode_id, 0) // aging) if aging else 0
+            ranked.append((self.tier(aired, now) - boost, -(aired or 0), n, ep))
+        ranked.sort(key=lambda item: item[:3])
+        return [ep for *_, ep in ranked], deferred, next_available
+
+    def counts(self, episodes: list) -> List[int]:
+        """Episodes per tier (recent, older, undated, stale), for the cycle log."""
+        now = self._clock()
+        out = [0, 0, 0, 0]
+        for ep in episodes:
+            out[self.tier(air_timestamp(ep.air_date), now)] += 1
+        return out
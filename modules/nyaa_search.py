@@ -1,177 +1,455 @@
 import asyncio
+import heapq
 import logging
-import time
-from typing import Dict, List, Optional, Sequence
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
 
-import feedparser
-import httpx
-from bs4 import BeautifulSoup
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from modules.parser import ReleaseScorer, catalog_title, parse_release_title
+from modules.search_providers import FeedEntry, NyaaProvider, SearchProvider, title_tokens
+from utils.circuit import CircuitOpenError, get_circuit_breakers
+from utils.loop_thread import LoopThread
+from utils.ratelimit import get_rate_limiter
+from utils.singleflight import AsyncSingleFlight
 
-from modules.parser import parse_release_title, score_release
+# The feed/HTTP libraries are imported on first use to keep startup fast
+
+
+_QUALITY_RANK = {'2160p': 2, '1080p': 1}
+
+
+def covers_episode(parsed: Dict, episode: int) -> bool:
+    """Whether a parsed release holds `episode` (single episode or batch range)."""
+    first = parsed.get('episode')
+    if first is None:
+        return False
+    return first <= episode <= (parsed.get('episode_end') or first)
+
+
+def release_sort_key(score: int, parsed: Dict, title: str) -> Tuple[int, int, int, str]:
+    """Higher is better: score, then version, then quality, then title."""
+    return (score, parsed.get('version') or 1, _QUALITY_RANK.get((parsed.get('quality') or '').lower(), 0), title)
+
+
+class Release:
+    """
+    One search result. The sort key is computed once at creation and `key`
+    (title + magnet) is interned so deduplication compares by identity.
+    """
+    __slots__ = ('title', 'magnet', 'link', 'score', 'parsed', 'query', 'feed', 'key', 'sort_key')
+
+    def __init__(self, title: str, magnet: Optional[str], link: Optional[str], score: int, parsed: Dict,
+                 query: Optional[str] = None, feed: Optional[str] = None):
+        self.title = title
+        self.magnet = magnet
+        self.link = link
+        self.score = score
+        self.parsed = parsed
+        self.query = query
+        self.feed = feed
+        self.key = sys.intern(f"{title}\n{magnet or ''}")
+        self.sort_key = release_sort_key(score, parsed, title)
+
+    def __repr__(self):
+        return f"Release({self.title!r}, score={self.score})"
 
 
 class NyaaSearcher:
-    def __init__(self, users: Sequence[str], rss_urls: Optional[Sequence[str]], preferred: Dict, rate_limit_seconds: int = 3, cache=None):
+    """
+    Searches every configured provider (Nyaa RSS by default, see
+    modules/search_providers.py) concurrently and ranks their results together.
+    """
+
+    def __init__(self, users: Sequence[str], rss_urls: Optional[Sequence[str]], preferred: Dict, rate_limit_seconds: int = 3,
+                 cache=None, providers: Optional[Sequence[SearchProvider]] = None):
         self.users = list(users or [])
-        self.rss_urls = list(rss_urls or [])
-        # Generate rss urls from users if not provided
-        if not self.rss_urls:
-            self.rss_urls = [f"https://nyaa.si/?page=rss&u={u}" for u in self.users]
+        if providers is None:
+            providers = [NyaaProvider.from_users(self.users, rss_urls, cache=cache)]
+        self.providers = list(providers)
+        # Feed id -> provider; feed ids are what the planner learns and search_tsundere(feeds=...) restricts to
+        self._feed_providers: Dict[str, SearchProvider] = {f: p for p in self.providers for f in p.feeds}
+        self.rss_urls = [f for p in self.providers if isinstance(p, NyaaProvider) for f in p.feeds]
         self.preferred = preferred or {}
+        self.scorer = ReleaseScorer(self.preferred)
         self.rate_limit_seconds = rate_limit_seconds
+        self.limiter = get_rate_limiter()
+        # Legacy fixed spacing becomes the default bucket for feed hosts not configured in rate_limits
+        if rate_limit_seconds and rate_limit_seconds > 0:
+            for url in self.rss_urls:
+                self.limiter.ensure(url, rate=1.0 / rate_limit_seconds, burst=1)
         self.cache = cache
         self.logger = logging.getLogger(__name__)
+        # Counters for the current cycle (reset by reset_stats), shared with the providers
+        self.stats = {'queries': 0, 'requests': 0, 'hedged': 0, 'cancelled': 0, 'coalesced': 0, 'failed': 0, 'catalog': 0}
+        # Identical feed requests in flight at the same time share one fetch
+        self._flights = AsyncSingleFlight()
+        # Searches run on one background loop, so the providers keep their HTTP clients between them
+        self._loop = LoopThread("nyaa-search")
+        self.set_fanout()
+        self.set_catalog()
+        self._flights.stats = self.stats
+        for provider in self.providers:
+            provider.stats = self.stats
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8), reraise=True,
-           retry=retry_if_exception_type((httpx.HTTPError,)))
-    def _http_get_text(self, url: str) -> str:
-        resp = httpx.get(url, timeout=20)
-        resp.raise_for_status()
-        return resp.text
-
-    def _fetch_rss(self, base_url: str, query: Optional[str] = None) -> feedparser.FeedParserDict:
-        url = base_url
-        if query:
-            url += f"&q={httpx.QueryParams({'q': query})['q']}"
-        cached = self.cache.get_search_cache(url) if self.cache else None
-        if cached:
-            return feedparser.parse(cached)
-        text = self._http_get_text(url)
-        if self.cache:
-            self.cache.set_search_cache(url, text)
-        return feedparser.parse(text)
-
-    def _extract_magnet(self, entry: feedparser.FeedParserDict) -> Optional[str]:
-        # Try feedparser magnet field
-        magnet = entry.get('torrent_magneturi') or entry.get('magnet')
-        if magnet:
-            return magnet
-        # Fallback parse links
-        links = entry.get('links', [])
-        for l in links:
-            href = l.get('href', '')
-            if href.startswith('magnet:?'):
-                return href
-        # Last resort: fetch page and scrape magnet link
-        page_url = entry.get('link')
-        if not page_url:
-            return None
+    @property
+    def feeds(self) -> List[str]:
+        return list(self._feed_providers)
+
+    def searchable(self, feeds: Optional[Sequence[str]] = None) -> bool:
+        """False when every feed's host has an open circuit, i.e. a search could only fail fast."""
+        breakers = get_circuit_breakers()
+        return any(breakers.available(f) for f, _ in self._targets(feeds))
+
+    def provider_urls(self) -> Dict[str, List[str]]:
+        """HTTP endpoints per provider name, for rate_limits.<name>."""
+        return {p.name: p.urls for p in self.providers if p.urls}
+
+    def set_scorer(self, scorer: ReleaseScorer):
+        """Swap preferences (e.g. after a config reload) without rebuilding the searcher."""
+        self.scorer = scorer
+        self.preferred = scorer.preferred
+
+    def reset_stats(self):
+        self.stats.update(queries=0, requests=0, hedged=0, cancelled=0, coalesced=0, failed=0, catalog=0)
+
+    def close(self):
+        """Close the providers' HTTP clients and stop the search loop."""
+        async def close_providers():
+            for provider in self.providers:
+                await provider.aclose()
+
+        self._loop.run(close_providers())
+        self._loop.close()
+
+    def set_catalog(self, fresh_seconds: float = 0):
+        """
+        Enable the release catalog (fresh_seconds > 0): fetched feed entries are
+        kept in the cache DB, and a series whose feed listing was read to its end
+        (search_series) within fresh_seconds is searched in the catalog instead
+        of the feeds.
+        """
+        self.catalog_fresh_seconds = max(0.0, float(fresh_seconds or 0))
+
+    def catalog_answers(self, series_id: Optional[int]) -> bool:
+        """Whether searches for the series are answered from the catalog, without a request."""
+        return bool(self.catalog_fresh_seconds and self.cache and series_id is not None
+                    and self.cache.catalog_fresh(series_id, self.catalog_fresh_seconds))
+
+    def _add_to_catalog(self, provider: SearchProvider, feed: str, entries: List[FeedEntry]):
+        rows = []
+        for entry in entries:
+            parsed = entry.parsed if entry.parsed is not None else parse_release_title(entry.title)
+            if not parsed:
+                continue
+            rows.append((entry.title, entry.magnet, entry.link, catalog_title(parsed.get('title') or ''),
+                         parsed.get('season'), parsed.get('episode'), parsed.get('episode_end'), parsed, feed,
+                         entry.uploader or provider.uploader(feed), entry.published,
+                         " ".join(sorted(title_tokens(entry.title)))))
         try:
-            text = self._http_get_text(page_url)
-            soup = BeautifulSoup(text, 'lxml')
-            a = soup.select_one('a[href^="magnet:"]')
-            return a['href'] if a else None
+            self.cache.add_catalog_releases(rows)
         except Exception as e:
-            from utils.i18n import t
-            self.logger.debug(t("log.scrape_magnet_failed"), e)
-            return None
+            # The catalog only saves requests: a write failure must not fail the search
+            self.logger.debug("Could not add %d release(s) from %s to the catalog: %s", len(rows), feed, e)
 
-    async def _fetch_rss_async(self, base_url: str, query: Optional[str] = None) -> Optional[feedparser.FeedParserDict]:
-        """Async wrapper for RSS fetching."""
-        url = base_url
-        if query:
-            url += f"&q={httpx.QueryParams({'q': query})['q']}"
-        
-        self.logger.debug(f"Fetching RSS: {url}")
-        
-        cached = self.cache.get_search_cache(url) if self.cache else None
-        if cached:
-            self.logger.debug(f"Cache hit for: {url}")
-            return feedparser.parse(cached)
+    async def _fetch_entries(self, provider: SearchProvider, feed: str, query: str, page: int) -> List[FeedEntry]:
+        entries = await provider.fetch(feed, query, page)
+        if self.catalog_fresh_seconds and self.cache:
+            self._add_to_catalog(provider, feed, entries)
+        return entries
+
+    async def _fetch_feed(self, provider: SearchProvider, feed: str, query: str, page: int,
+                          coalesce: bool = True) -> List[FeedEntry]:
+        """
+        One provider feed page; a timeout or failure only drops that feed from the
+        results. Concurrent requests for the same page join the one in flight
+        (the provider writes the search cache before it completes); coalesce=False
+        forces a separate request, for hedging.
+        """
+        from utils.i18n import lazy_t
         try:
-            async with httpx.AsyncClient(timeout=20) as client:
-                resp = await client.get(url)
-                resp.raise_for_status()
-                text = resp.text
-                if self.cache:
-                    self.cache.set_search_cache(url, text)
-                return feedparser.parse(text)
+            if not coalesce:
+                return await self._fetch_entries(provider, feed, query, page)
+            return await self._flights.do((feed, query, page), lambda: self._fetch_entries(provider, feed, query, page))
+        except CircuitOpenError as e:
+            # The breaker logged the outage once; skip the feed without a warning per query
+            self.logger.debug("Skipping %s for '%s': %s", feed, query, e)
+        except asyncio.TimeoutError:
+            self.logger.warning(lazy_t("log.provider_timeout"), provider.name, provider.timeout, query)
         except Exception as e:
-            from utils.i18n import t
-            self.logger.warning(t("log.rss_fetch_failed"), query, base_url, e)
-            return None
+            self.logger.warning(lazy_t("log.rss_fetch_failed"), query, feed, e)
+        self.stats['failed'] += 1
+        return []
+
+    def _targets(self, feeds: Optional[Sequence[str]]) -> List[Tuple[str, SearchProvider]]:
+        return [(f, self._feed_providers[f]) for f in (feeds or self._feed_providers) if f in self._feed_providers]
+
+    async def _releases(self, entries: List[FeedEntry], provider: SearchProvider, query: str, feed: str) -> List[Release]:
+        """Parse (unless the provider already did), filter and score the entries of one feed page."""
+        results: List[Release] = []
+        for entry in entries:
+            parsed = entry.parsed if entry.parsed is not None else parse_release_title(entry.title)
+            if not parsed:
+                continue
+            # Basic language/source filter
+            if not self.scorer.accepts_language(parsed):
+                continue
+            # Score
+            sc = self.scorer.score(parsed)
+            magnet = entry.magnet or await provider.resolve_magnet(entry)
+            results.append(Release(entry.title, magnet, entry.link, sc, parsed, query, feed))
+        return results
 
-    async def _search_query_async(self, query: str) -> List[Dict]:
-        """Search a single query across all RSS feeds in parallel."""
-        tasks = [self._fetch_rss_async(base_url, query) for base_url in self.rss_urls]
-        feeds = await asyncio.gather(*tasks, return_exceptions=False)
+    async def _search_query_async(self, query: str, feeds: Optional[Sequence[str]] = None, page: int = 1) -> List[Release]:
+        """Search a single query across all provider feeds (or the given subset) in parallel."""
+        targets = self._targets(feeds)
+        fetched = await asyncio.gather(*(self._fetch_feed(p, f, query, page) for f, p in targets))
         
-        results: List[Dict] = []
+        results: List[Release] = []
         seen = set()
         
-        for feed in feeds:
-            if not feed:
-                continue
-            for entry in feed.entries:
-                title = entry.get('title', '')
-                parsed = parse_release_title(title)
-                if not parsed:
-                    continue
-                # Basic language/source filter
-                pref_lang = (self.preferred or {}).get('language')
-                parsed_lang = parsed.get('language')
-                # MULTI releases contain all languages, so always accept them
-                if pref_lang and parsed_lang and parsed_lang.upper() != 'MULTI' and pref_lang.lower() not in parsed_lang.lower():
+        for (feed, provider), entries in zip(targets, fetched):
+            for release in await self._releases(entries, provider, query, feed):
+                if release.key in seen:
                     continue
-                # Score
-                sc = score_release(parsed, self.preferred)
-                magnet = self._extract_magnet(entry)
-                key = (title, magnet)
-                if key in seen:
-                    continue
-                seen.add(key)
-                results.append({
-                    'title': title,
-                    'magnet': magnet,
-                    'score': sc,
-                    'parsed': parsed,
-                    'link': entry.get('link')
-                })
+                seen.add(release.key)
+                results.append(release)
+        return results
+
+    async def _search_catalog_async(self, query: str, feeds: Optional[Sequence[str]] = None) -> List[Release]:
+        """
+        Answer a query from the release catalog: an episode query (title + SxxEyy or
+        Exx) through the (title, season, episode) index, anything else by title tokens.
+        """
+        parsed = parse_release_title(query)
+        if parsed and parsed.get('title') and parsed.get('episode') is not None and not parsed.get('batch'):
+            rows = self.cache.catalog_episode(catalog_title(parsed['title']), parsed.get('season'), parsed['episode'])
+        else:
+            rows = self.cache.catalog_match(sorted(title_tokens(query)))
+        targets = dict(self._targets(feeds))
+        by_feed: Dict[str, List[FeedEntry]] = {}
+        for title, magnet, link, release, feed in rows:
+            if feed in targets:
+                by_feed.setdefault(feed, []).append(FeedEntry(title, magnet, link, release))
+        results: List[Release] = []
+        seen = set()
+        for feed, entries in by_feed.items():
+            for release in await self._releases(entries, targets[feed], query, feed):
+                if release.key not in seen:
+                    seen.add(release.key)
+                    results.append(release)
         return results
 
-    def search_tsundere(self, queries: List[str], early_exit: bool = True) -> List[Dict]:
+    def _search_catalog(self, queries: List[str], feeds: Optional[Sequence[str]]):
+        """Like _search_sequential, from the catalog."""
+        self.stats['catalog'] += 1
+        for q in queries:
+            self.logger.debug("Catalog lookup: '%s'", q)
+            yield self._loop.run(self._search_catalog_async(q, feeds))
+
+    def set_fanout(self, parallel_queries: int = 0, stop_score: Optional[int] = None, hedge_after: float = 0.0):
+        """
+        Enable the concurrent search mode (parallel_queries > 0): up to that many
+        query variants in flight, everything cancelled once a release scores
+        stop_score (None: the scorer's best possible score), and feeds still
+        pending after hedge_after seconds get a duplicate request (0: no hedging).
+        """
+        self.fanout_queries = max(0, int(parallel_queries))
+        self.stop_score = stop_score
+        self.hedge_after = max(0.0, float(hedge_after or 0))
+
+    def _has_budget(self, feeds: Sequence[str], needed: int = 1) -> bool:
+        return all(self.limiter.available(f) >= needed for f in feeds)
+
+    async def _fetch_hedged(self, provider: SearchProvider, feed: str, query: str) -> List[FeedEntry]:
+        """
+        Fetch one feed; if it is still pending after hedge_after, race a duplicate
+        request against it. The first non-empty answer wins: a request that failed
+        (or found nothing) leaves the other one running.
+        """
+        first = asyncio.create_task(self._fetch_feed(provider, feed, query, 1))
+        tasks = {first}
+        try:
+            if self.hedge_after:
+                done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+                if not done and self._has_budget([feed]):
+                    self.stats['hedged'] += 1
+                    self.logger.debug("Hedging slow feed %s for '%s'", feed, query)
+                    tasks.add(asyncio.create_task(self._fetch_feed(provider, feed, query, 1, coalesce=False)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    entries = task.result()
+                    if entries:
+                        return entries
+            return []
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _search_fanout_async(self, queries: List[str], early_exit: bool,
+                                   feeds: Optional[Sequence[str]] = None) -> List[Release]:
+        """
+        Run query variants concurrently (see set_fanout). With early_exit the
+        answer is the same as the sequential search (the first variant, in order,
+        that returns results), except that a release reaching the stop score ends
+        the search at once with everything found so far.
+        """
+        targets = self._targets(feeds)
+        if not targets or not queries:
+            return []
+        feed_ids = [f for f, _ in targets]
+        stop_score = self.stop_score if self.stop_score is not None else self.scorer.max_score()
+        # (query index, target index) -> releases; a query is complete once all its feeds answered
+        found: Dict[Tuple[int, int], List[Release]] = {}
+        running: Dict["asyncio.Task", Tuple[int, int]] = {}
+        launched = 0
+        stop = False
+        try:
+            while not stop:
+                # Launch the next variants while the window and the rate budget allow; the first always goes
+                while (launched < len(queries) and len({q for q, _ in running.values()}) < self.fanout_queries
+                       and (not running or self._has_budget(feed_ids, needed=len(feed_ids)))):
+                    query = queries[launched]
+                    self.logger.info("Trying query [%d/%d]: '%s'", launched + 1, len(queries), query)
+                    self.stats['queries'] += 1
+                    for n, (feed, provider) in enumerate(targets):
+                        running[asyncio.create_task(self._fetch_hedged(provider, feed, query))] = (launched, n)
+                    launched += 1
+                if not running:
+                    break
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    qi, n = running.pop(task)
+                    feed, provider = targets[n]
+                    found[qi, n] = await self._releases(task.result(), provider, queries[qi], feed)
+                    if any(r.score >= stop_score for r in found[qi, n]):
+                        self.logger.debug("Stop score %s reached with query '%s'", stop_score, queries[qi])
+                        stop = True
+                if early_exit and not stop:
+                    # The first variant with results wins once every variant before it came back empty
+                    for qi in range(launched):
+                        if any((qi, n) not in found for n in range(len(targets))):
+                            break
+                        if any(found[qi, n] for n in range(len(targets))):
+                            found = {k: v for k, v in found.items() if k[0] == qi}
+                            stop = True
+                            break
+        finally:
+            for task in running:
+                task.cancel()
+            self.stats['cancelled'] += len(running)
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+        return [r for key in sorted(found) for r in found[key]]
+
+    def prefetch(self, query: str, episode: int, feeds: Optional[Sequence[str]] = None) -> Optional[int]:
+        """
+        Warm the search cache with page 1 of a predicted query on every feed,
+        keeping only pages that already hold an accepted release of `episode`.
+        Runs only when every feed host has a free rate-limit token (None
+        otherwise), so prefetching never queues; returns the pages kept.
+        """
+        targets = self._targets(feeds)
+        if not targets or not self._has_budget([f for f, _ in targets]):
+            return None
+
+        def wanted(entries: List[FeedEntry]) -> bool:
+            for entry in entries:
+                parsed = entry.parsed if entry.parsed is not None else parse_release_title(entry.title)
+                if parsed and covers_episode(parsed, episode) and self.scorer.accepts_language(parsed):
+                    return True
+            return False
+
+        async def warm(provider: SearchProvider, feed: str) -> Optional[bool]:
+            try:
+                return await provider.prefetch(feed, query, wanted)
+            except Exception as e:
+                self.logger.debug("Prefetch of '%s' on %s failed: %s", query, feed, e)
+                return None
+
+        async def run():
+            return await asyncio.gather(*(warm(p, f) for f, p in targets))
+
+        return sum(1 for kept in self._loop.run(run()) if kept)
+
+    def _search_sequential(self, queries: List[str], feeds: Optional[Sequence[str]]):
+        """One query at a time, each across all feeds in parallel; the caller stops iterating on early exit."""
+        for i, q in enumerate(queries):
+            self.logger.info("Trying query [%d/%d]: '%s'", i + 1, len(queries), q)
+            self.stats['queries'] += 1
+            yield self._loop.run(self._search_query_async(q, feeds))
+
+    def search_tsundere(self, queries: List[str], early_exit: bool = True, feeds: Optional[Sequence[str]] = None,
+                        limit: Optional[int] = None, series_id: Optional[int] = None) -> List[Release]:
         """
         Search for torrents using multiple queries.
         If early_exit=True, stops at first query that returns results.
+        If feeds is given, only those feeds (see `feeds`) are queried.
+        If limit is given, only the `limit` best releases are kept (bounded heap), best first.
+        If series_id is given and the catalog is fresh for it (see set_catalog), no request is sent.
         """
-        self.logger.info(f"Early exit: {'enabled' if early_exit else 'disabled'}")
-        results: List[Dict] = []
+        self.logger.info("Early exit: %s", "enabled" if early_exit else "disabled")
+        # Min-heap of (sort_key, seq, release): the worst kept candidate is on top
+        heap: List[tuple] = []
         seen = set()
         
-        for i, q in enumerate(queries):
-            if i > 0:
-                time.sleep(self.rate_limit_seconds)
-            
-            self.logger.info(f"Trying query [{i+1}/{len(queries)}]: '{q}'")
-            
-            # Run async search for this query across all RSS feeds in parallel
-            query_results = asyncio.run(self._search_query_async(q))
-            
-            # Deduplicate and add to overall results
+        if self.catalog_answers(series_id):
+            batches = self._search_catalog(queries, feeds)
+        elif self.fanout_queries:
+            batches = [self._loop.run(self._search_fanout_async(queries, early_exit, feeds))]
+        else:
+            batches = self._search_sequential(queries, feeds)
+        for query_results in batches:
+            # Deduplicate and keep the best candidates
             for r in query_results:
-                key = (r['title'], r['magnet'])
-                if key not in seen:
-                    seen.add(key)
-                    results.append(r)
+                if r.key in seen:
+                    continue
+                seen.add(r.key)
+                # -seq: among equal keys the first found ranks higher, as with a stable sort
+                item = (r.sort_key, -len(seen), r)
+                if limit is None or len(heap) < limit:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
             
             # Early exit: if we found results, stop searching
-            if early_exit and results:
-                self.logger.debug(f"Early exit: found {len(results)} result(s) with query '{q}'")
+            if early_exit and heap:
+                self.logger.debug("Early exit: found %d result(s) with query '%s'", len(seen), r.query)
                 break
         
-        # Prefer higher score, then version desc, then quality desc, then title
-        def sort_key(x):
-            parsed = x['parsed']
-            version = parsed.get('version') or 1
-            qual_rank = 0
-            q = (parsed.get('quality') or '').lower()
-            if q == '2160p':
-                qual_rank = 2
-            elif q == '1080p':
-                qual_rank = 1
-            else:
-                qual_rank = 0
-            return (x['score'], version, qual_rank, x['title'])
-        results.sort(key=sort_key, reverse=True)
+        return [r for _, _, r in sorted(heap, reverse=True)]
+
+    def search_series(self, query: str, max_pages: int = 1, series_id: Optional[int] = None) -> List[Release]:
+        """
+        Series-scoped search (e.g. 'Title S01'): one query per feed, following
+        feed pages until a page brings nothing new or max_pages is reached.
+        With the catalog enabled, a listing read to its end without a failed
+        feed makes the catalog fresh for `series_id`; while it is, the search is
+        answered from the catalog.
+        """
+        if self.catalog_answers(series_id):
+            self.stats['catalog'] += 1
+            return self._sort_results(self._loop.run(self._search_catalog_async(query)))
+        results: List[Release] = []
+        seen = set()
+        failed = self.stats['failed']
+        for page in range(1, max(1, max_pages) + 1):
+            self.logger.info("Series query page %d: '%s'", page, query)
+            self.stats['queries'] += 1
+            new = 0
+            for r in self._loop.run(self._search_query_async(query, page=page)):
+                if r.key not in seen:
+                    seen.add(r.key)
+                    results.append(r)
+                    new += 1
+            if not new:
+                if self.catalog_fresh_seconds and self.cache and series_id is not None and self.stats['failed'] == failed:
+                    self.cache.mark_catalog_listed(series_id)
+                break
+        return self._sort_results(results)
+
+    @staticmethod
+    def _sort_results(results: List[Release]) -> List[Release]:
+        # Prefer higher score, then version desc, then quality desc, then title (precomputed per release)
+        results.sort(key=lambda r: r.sort_key, reverse=True)
         return results
@@ -1,6 +1,6 @@
 import logging
 import re
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 
 def infer_season_from_title(series_title: str, default: int = 1) -> int:
@@ -41,6 +41,11 @@ def sanitize_title_for_nyaa(title: str) -> str:
     return sanitized
 
 
+def catalog_title(title: str) -> str:
+    """Lowercase word tokens of a sanitized title, the release catalog's lookup key for a series."""
+    return " ".join(re.findall(r"[a-z0-9]+", sanitize_title_for_nyaa(normalize_series_title(title)).lower()))
+
+
 def shorten_title(title: str, max_words: int = 5) -> str:
     """
     Shorten a title to the first N words for long series names.
@@ -52,7 +57,8 @@ def shorten_title(title: str, max_words: int = 5) -> str:
 
 RE_MAIN = re.compile(
     r"^(?:\[(?P<group>[^\]]+)\]\s*)?"  # optional [Group]
-    r"(?P<title>.+?)\s+S(?P<season>\d{2})E(?P<episode>\d{2,3})(?:v(?P<version>\d+))?\s*"
+    r"(?P<title>.+?)\s+S(?P<season>\d{2})(?:\s*[-~]\s*E?|\s*E)"  # S01E05, S01 E05, S01 - 05
+    r"(?P<episode>\d{2,3})(?!\d)(?:v(?P<version>\d+))?\s*"
     r"(?P<lang>VOSTFR|VF|ENG|MULTI)?\s*"
     r"(?P<quality>2160p|1080p|720p|480p)?\s*"
     r"(?P<source>WEB|WEB-DL|WEB\s?DL|BD|BluRay|DVD)?"
@@ -70,25 +76,91 @@ RE_FALLBACK_E = re.compile(
 )
 
 
+RE_BATCH = re.compile(
+    r"^(?:\[(?P<group>[^\]]+)\]\s*)?"  # optional [Group]
+    r"(?P<title>.+?)\s+S(?P<season>\d{2})"
+    r"(?:E(?P<start>\d{2,3})\s*[-~]\s*E?(?P<end>\d{2,3})\b"  # S01E01-12 / S01E01~E12
+    r"|\s+E?(?P<start2>\d{2,3})\s*[-~]\s*E?(?P<end2>\d{2,3})\b"  # S01 01-12
+    # S01 alone: whole season pack, unless an episode follows (S01E05, S01 E05, S01 - 05, S01 05)
+    r"|\b(?!\s*E\s*\d|\s*[-~]?\s*E?\d{2,3}(?![\dp])))",
+    re.IGNORECASE,
+)
+
+# Dash-separated range, season optional: "Title - 01-12", "Title S02 - 01 ~ 12"
+RE_BATCH_DASH = re.compile(
+    r"^(?:\[(?P<group>[^\]]+)\]\s*)?"  # optional [Group]
+    r"(?P<title>.+?)(?:\s+S(?P<season>\d{2}))?\s+-\s+"
+    r"E?(?P<start>\d{2,3})\s*[-~]\s*E?(?P<end>\d{2,3})(?![\dp])",  # the end is no resolution (- 01 - 720p)
+    re.IGNORECASE,
+)
+
+
+def _detect_extras(title: str) -> Dict:
+    # Post-detect quality/source/provider anywhere in title to handle varying order
+    qmatch = re.search(r"\b(2160p|1080p|720p|480p)\b", title, re.IGNORECASE)
+    smatch = re.search(r"\b(WEB(?:-?DL)?|BD|BluRay|DVD)\b", title, re.IGNORECASE)
+    # Provider often appears as trailing parentheses like (CR)
+    pmatch = re.search(r"\(([^)]+)\)\s*$", title)
+    lmatch = re.search(r"\b(VOSTFR|VF|ENG|MULTI)\b", title, re.IGNORECASE)
+    return {
+        'quality': qmatch.group(1) if qmatch else None,
+        'source': smatch.group(1).replace('WEBDL', 'WEB-DL') if smatch else None,
+        'provider': pmatch.group(1) if pmatch else None,
+        'language': lmatch.group(1) if lmatch else None,
+    }
+
+
+def parse_batch_title(title: str) -> Optional[Dict]:
+    """
+    Parse batch releases: episode ranges (S01E01-12, S01 01-12, Title - 01-12) or whole
+    season packs (S01). Returns the same shape as parse_release_title with 'batch': True,
+    'episode' as the first episode and 'episode_end' as the last one (both None for a
+    season pack). Without an Sxx the season is inferred from the title, as for queries.
+    """
+    m = RE_BATCH.search(title) or RE_BATCH_DASH.search(title)
+    if not m:
+        return None
+    d = m.groupdict()
+    start = d.get('start') or d.get('start2')
+    end = d.get('end') or d.get('end2')
+    if start and end and int(end) <= int(start):
+        return None
+    extras = _detect_extras(title)
+    return {
+        'group': d.get('group'),
+        'title': d.get('title'),
+        'season': int(d['season']) if d.get('season') else infer_season_from_title(d['title']),
+        'episode': int(start) if start else None,
+        'episode_end': int(end) if end else None,
+        'version': None,
+        'language': extras['language'],
+        'quality': extras['quality'],
+        'source': extras['source'],
+        'provider': extras['provider'],
+        'batch': True,
+    }
+
+
 def parse_release_title(title: str) -> Optional[Dict]:
+    batch = parse_batch_title(title)
+    if batch:
+        return batch
     m = RE_MAIN.search(title)
     if m:
         d = m.groupdict()
-        # Post-detect quality/source anywhere in title to handle varying order
-        qmatch = re.search(r"\b(2160p|1080p|720p|480p)\b", title, re.IGNORECASE)
-        smatch = re.search(r"\b(WEB(?:-?DL)?|BD|BluRay|DVD)\b", title, re.IGNORECASE)
-        # Provider often appears as trailing parentheses like (CR)
-        pmatch = re.search(r"\(([^)]+)\)\s*$", title)
+        extras = _detect_extras(title)
         return {
             'group': d.get('group'),
             'title': d.get('title'),
             'season': int(d['season']) if d.get('season') else None,
             'episode': int(d['episode']) if d.get('episode') else None,
+            'episode_end': None,
             'version': int(d['version']) if d.get('version') else None,
             'language': d.get('lang'),
-            'quality': (qmatch.group(1) if qmatch else d.get('quality')),
-            'source': (smatch.group(1).replace('WEBDL', 'WEB-DL') if smatch else d.get('source')),
-            'provider': (pmatch.group(1) if pmatch else d.get('provider')),
+            'quality': extras['quality'] or d.get('quality'),
+            'source': extras['source'] or d.get('source'),
+            'provider': extras['provider'] or d.get('provider'),
+            'batch': False,
         }
     m2 = RE_FALLBACK_E.search(title)
     if m2:
@@ -98,17 +170,23 @@ def parse_release_title(title: str) -> Optional[Dict]:
             'title': d.get('title'),
             'season': None,
             'episode': int(d['episode']) if d.get('episode') else None,
+            'episode_end': None,
             'version': int(d.get('version')) if d.get('version') else None,
             'language': d.get('lang'),
             'quality': d.get('quality'),
             'source': None,
             'provider': None,
+            'batch': False,
         }
     return None
 
 
-def build_queries_for_episode(series_title: str, season: Optional[int], episode: int) -> List[str]:
-    q: List[str] = []
+def build_query_variants(series_title: str, season: Optional[int], episode: int) -> List[Tuple[str, str]]:
+    """
+    Build the ordered (variant name, query) pairs for an episode.
+    Variant names are stable so the query planner can learn which one works per series.
+    """
+    q: List[Tuple[str, str]] = []
     cleaned = normalize_series_title(series_title)
     # Remove special chars that Nyaa uploaders often strip
     sanitized = sanitize_title_for_nyaa(cleaned)
@@ -119,59 +197,96 @@ def build_queries_for_episode(series_title: str, season: Optional[int], episode:
     
     # Strategy: try sanitized (no special chars) first, then original, then short
     # Prefer SxxEyy format (Tsundere-Raws, Team Arcedo)
-    q.append(f"{sanitized} S{s:02d}E{int(episode):02d}")
-    q.append(f"{sanitized} S{s:02d}E{int(episode):02d} VOSTFR")
+    q.append(("sxxeyy", f"{sanitized} S{s:02d}E{int(episode):02d}"))
+    q.append(("sxxeyy_vostfr", f"{sanitized} S{s:02d}E{int(episode):02d} VOSTFR"))
     
     # If title was shortened, try short version
     if shortened != sanitized:
-        q.append(f"{shortened} S{s:02d}E{int(episode):02d}")
-        q.append(f"{shortened} S{s:02d}E{int(episode):02d} VOSTFR")
+        q.append(("short_sxxeyy", f"{shortened} S{s:02d}E{int(episode):02d}"))
+        q.append(("short_sxxeyy_vostfr", f"{shortened} S{s:02d}E{int(episode):02d} VOSTFR"))
     
     # Fallback E## (some groups)
-    q.append(f"{sanitized} E{int(episode):02d}")
-    q.append(f"{sanitized} E{int(episode):02d} VOSTFR")
+    q.append(("e", f"{sanitized} E{int(episode):02d}"))
+    q.append(("e_vostfr", f"{sanitized} E{int(episode):02d} VOSTFR"))
     
     # Try original cleaned title as last resort
     if cleaned != sanitized:
-        q.append(f"{cleaned} S{s:02d}E{int(episode):02d}")
-        q.append(f"{cleaned} E{int(episode):02d}")
+        q.append(("original_sxxeyy", f"{cleaned} S{s:02d}E{int(episode):02d}"))
+        q.append(("original_e", f"{cleaned} E{int(episode):02d}"))
     
     # Ensure uniqueness, preserve order
     seen = set()
-    out: List[str] = []
-    for item in q:
+    out: List[Tuple[str, str]] = []
+    for variant, item in q:
         if item not in seen:
-            out.append(item)
+            out.append((variant, item))
             seen.add(item)
     return out
 
 
+def build_queries_for_episode(series_title: str, season: Optional[int], episode: int) -> List[str]:
+    return [query for _, query in build_query_variants(series_title, season, episode)]
+
+
+def build_series_query(series_title: str, season: Optional[int]) -> str:
+    """Series-scoped query (title + Sxx, no episode) used to cover many missing episodes at once."""
+    sanitized = sanitize_title_for_nyaa(normalize_series_title(series_title))
+    s = int(season) if season else infer_season_from_title(series_title, default=1)
+    return f"{sanitized} S{s:02d}"
+
+
+class ReleaseScorer:
+    """
+    Scores parsed releases against the preferences (language, qualities, sources).
+    Preferences are normalized once so scoring a large feed only does dict lookups.
+    """
+
+    def __init__(self, preferred: Optional[Dict]):
+        self.preferred = preferred or {}
+        self.language = (self.preferred.get('language') or '').upper()
+        qualities = list(self.preferred.get('qualities') or [])
+        # Higher index = lower preference, so invert weight (first occurrence wins)
+        self.quality_points: Dict[str, int] = {}
+        for i, q in enumerate(qualities):
+            self.quality_points.setdefault(q, (len(qualities) - i) * 10)
+        providers = list(self.preferred.get('sources') or [])
+        self.provider_points = [(p.upper(), (len(providers) - i) * 5) for i, p in enumerate(providers)]
+
+    def accepts_language(self, parsed: Dict) -> bool:
+        """Basic language filter; MULTI releases contain all languages, so always accept them."""
+        parsed_lang = parsed.get('language')
+        if not self.language or not parsed_lang or parsed_lang.upper() == 'MULTI':
+            return True
+        return self.language in parsed_lang.upper()
+
+    def max_score(self) -> int:
+        """Best score a v1 release can get with these preferences (preferred language, quality and source)."""
+        return ((50 if self.language else 0) + max(self.quality_points.values(), default=0)
+                + max((points for _, points in self.provider_points), default=0))
+
+    def score(self, parsed: Dict) -> int:
+        score = 0
+        # Language
+        lang = (parsed.get('language') or '').upper()
+        if self.language:
+            if self.language in lang:
+                score += 50
+            # MULTI releases contain all languages, give them a good score too
+            elif lang == 'MULTI':
+                score += 40
+        # Quality
+        score += self.quality_points.get(parsed.get('quality'), 0)
+        # Version bonus (v3>v2>v1)
+        version = parsed.get('version') or 1
+        score += max(0, version - 1) * 3
+        # Provider/source tag like (CR|ADN|AMZN)
+        prov = (parsed.get('provider') or '').upper()
+        for p, points in self.provider_points:
+            if p in prov:
+                score += points
+                break
+        return score
+
+
 def score_release(parsed: Dict, preferred: Optional[Dict]) -> int:
-    if not preferred:
-        preferred = {}
-    score = 0
-    # Language
-    lang = (parsed.get('language') or '').upper()
-    pref_lang = (preferred.get('language') or '').upper()
-    if pref_lang:
-        if pref_lang in lang:
-            score += 50
-        # MULTI releases contain all languages, give them a good score too
-        elif lang == 'MULTI':
-            score += 40
-    # Quality
-    qualities = preferred.get('qualities') or []
-    if parsed.get('quality') in qualities:
-        # Higher index = lower preference, so invert weight
-        score += (len(qualities) - qualities.index(parsed['quality'])) * 10
-    # Version bonus (v3>v2>v1)
-    version = parsed.get('version') or 1
-    score += max(0, version - 1) * 3
-    # Provider/source tag like (CR|ADN|AMZN)
-    providers = preferred.get('sources') or []
-    prov = (parsed.get('provider') or '').upper()
-    for i, p in enumerate(providers):
-        if p.upper() in prov:
-            score += (len(providers) - i) * 5
-            break
-    return score
+    return ReleaseScorer(preferred).score(parsed)
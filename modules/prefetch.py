@@ -0,0 +1,81 @@
+import logging
+import time
+from typing import List, Optional, Tuple
+
+from modules.episode_priority import air_timestamp
+from modules.parser import build_query_variants
+
+
+class Prefetcher:
+    """
+    Speculative searches for airing series during the idle time before the next
+    cycle. A series with an episode aired within `recent_days` in the last
+    cycle's list is airing, and the query for its next episode (same series,
+    episode + 1) is predictable: its first `variants` planned queries are sent to
+    every feed, and pages already holding that episode are kept in the search
+    cache, so the next cycle finds the release without a round trip. Budgeted by
+    `max_queries` per idle window and by free rate-limit tokens.
+    """
+
+    def __init__(self, searcher, shoko, cache, planner=None, recent_days: float = 14, variants: int = 1,
+                 max_queries: int = 40, clock=time.time):
+        self.searcher = searcher
+        self.shoko = shoko
+        self.cache = cache
+        self.planner = planner
+        self.recent = float(recent_days) * 86400
+        self.variants = max(1, int(variants))
+        self.max_queries = max(0, int(max_queries))
+        self._clock = clock
+        self._pending: Optional[List[Tuple[int, int, str]]] = None
+        self._sent = 0
+        self.logger = logging.getLogger(__name__)
+
+    def targets(self, episodes: list) -> List[Tuple[int, int]]:
+        """(series_id, next episode number) of the series airing among `episodes`."""
+        now = self._clock()
+        newest = {}
+        for ep in episodes:
+            aired = air_timestamp(ep.air_date)
+            if aired is None or not ep.series_id or not ep.episode_number or not 0 <= now - aired <= self.recent:
+                continue
+            newest[ep.series_id] = max(newest.get(ep.series_id, 0), int(ep.episode_number))
+        return sorted((series_id, number + 1) for series_id, number in newest.items())
+
+    def reset(self):
+        """Start a new idle window: predictions are rebuilt from the cycle that just ran."""
+        self._pending = None
+        self._sent = 0
+
+    def _plan(self) -> List[Tuple[int, int, str]]:
+        from modules.shoko_client import MissingEpisode
+        episodes = [MissingEpisode.from_row(row) for row in self.cache.get_cycle_episodes()]
+        planned = []
+        for series_id, episode in self.targets(episodes):
+            title = self.shoko.get_series_name(series_id)
+            if not title:
+                continue
+            variants = build_query_variants(title, None, episode)
+            if self.planner:
+                variants = self.planner.plan(series_id, variants)
+            planned.extend((series_id, episode, query) for _, query in variants[:self.variants])
+        return planned
+
+    def run(self) -> int:
+        """Warm predicted queries while the budget allows; returns the pages kept."""
+        if self._pending is None:
+            self._pending = self._plan()
+        kept = 0
+        while self._pending and self._sent < self.max_queries:
+            series_id, episode, query = self._pending[0]
+            warmed = self.searcher.prefetch(query, episode)
+            if warmed is None:
+                # No free rate-limit token right now: try again on the next idle tick
+                break
+            self._pending.pop(0)
+            self._sent += 1
+            kept += warmed
+        if kept:
+            from utils.i18n import lazy_t
+            self.logger.info(lazy_t("log.prefetch_warmed"), kept, self._sent)
+        return kept
@@ -1,8 +1,6 @@
 import logging
 from typing import Optional
 
-import qbittorrentapi
-
 
 class QbitClient:
     def __init__(self, url: str, username: str, password: str, dry_run: bool = False, verify_cert: bool = True, prefer_http: bool = False):
@@ -13,15 +11,25 @@ class QbitClient:
         self.username = username
         self.password = password
         self.dry_run = dry_run
-        self.client = qbittorrentapi.Client(
-            host=self.url,
-            username=self.username,
-            password=self.password,
-            VERIFY_WEBUI_CERTIFICATE=verify_cert,
-        )
+        self.verify_cert = verify_cert
+        self._client = None
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def client(self):
+        # qbittorrentapi is heavy to import; only load it once qBittorrent is actually used
+        if self._client is None:
+            import qbittorrentapi
+            self._client = qbittorrentapi.Client(
+                host=self.url,
+                username=self.username,
+                password=self.password,
+                VERIFY_WEBUI_CERTIFICATE=self.verify_cert,
+            )
+        return self._client
+
     def ensure_connected(self):
+        import qbittorrentapi
         try:
             self.client.auth_log_in()
         except qbittorrentapi.LoginFailed as e:
@@ -29,8 +37,8 @@ class QbitClient:
 
     def add_magnet(self, magnet_or_url: str, save_path: Optional[str] = None, category: Optional[str] = None, tags: Optional[str] = None):
         if self.dry_run:
-            from utils.i18n import t
-            self.logger.info(t("log.dry_run_add_short"), (magnet_or_url or '')[:60] + '...')
+            from utils.i18n import lazy_t
+            self.logger.info(lazy_t("log.dry_run_add_short"), (magnet_or_url or '')[:60] + '...')
             return
         kwargs = {}
         if save_path:
@@ -40,3 +48,11 @@ class QbitClient:
         if tags:
             kwargs['tags'] = tags
         self.client.torrents_add(urls=magnet_or_url, **kwargs)
+
+    def sync_maindata(self, rid: int = 0) -> dict:
+        """
+        Incremental torrent list (`sync/maindata`): with the `rid` of the previous
+        answer only changed fields of changed torrents come back, plus
+        `torrents_removed`; `full_update` is set when qBittorrent sends everything.
+        """
+        return dict(self.client.sync_maindata(rid=rid))
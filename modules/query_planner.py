@@ -0,0 +1,61 @@
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+
+class QueryPlanner:
+    """
+    Learns, per series, which query variant and which feed produced the accepted
+    release, and reorders the next plan so that variant is tried first.
+    Variants that were tried `drop_after_misses` times without ever hitting are
+    dropped once another variant is known to work for the series.
+    Stats are persisted in the SQLite cache so learning survives restarts.
+    """
+
+    def __init__(self, cache, drop_after_misses: int = 5, min_feed_hits: int = 2):
+        self.cache = cache
+        self.drop_after_misses = drop_after_misses
+        self.min_feed_hits = min_feed_hits
+        self.logger = logging.getLogger(__name__)
+
+    def plan(self, series_id: Optional[int], variants: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Reorder (variant, query) pairs: known hits first, dead variants dropped."""
+        if not series_id or not self.cache or not variants:
+            return list(variants)
+        stats = self.cache.get_query_stats(series_id)
+        if not stats:
+            return list(variants)
+        has_winner = any(hits > 0 for hits, _ in stats.values())
+        position = {variant: i for i, (variant, _) in enumerate(variants)}
+        kept = [
+            (variant, query) for variant, query in variants
+            if not (has_winner and stats.get(variant, (0, 0))[0] == 0 and stats.get(variant, (0, 0))[1] >= self.drop_after_misses)
+        ]
+        kept.sort(key=lambda vq: (-stats.get(vq[0], (0, 0))[0], position[vq[0]]))
+        if len(kept) != len(variants):
+            self.logger.debug("Planner dropped %d dead variant(s) for series %s", len(variants) - len(kept), series_id)
+        return kept or list(variants)
+
+    def preferred_feed(self, series_id: Optional[int], feeds: Sequence[str]) -> Optional[str]:
+        """Return the feed that produced most accepted releases for a series, if confident."""
+        if not series_id or not self.cache:
+            return None
+        stats = {feed: hits for feed, hits in self.cache.get_feed_stats(series_id).items() if feed in feeds}
+        if not stats:
+            return None
+        feed, hits = max(stats.items(), key=lambda kv: kv[1])
+        return feed if hits >= self.min_feed_hits else None
+
+    def record(self, series_id: Optional[int], plan: List[Tuple[str, str]], tried_queries: Sequence[str],
+               hit_query: Optional[str], feed: Optional[str]):
+        """Record the outcome of an episode search against the plan that was used."""
+        if not series_id or not self.cache:
+            return
+        tried = set(tried_queries)
+        hit_variant = None
+        missed: List[str] = []
+        for variant, query in plan:
+            if query == hit_query:
+                hit_variant = variant
+            elif query in tried:
+                missed.append(variant)
+        self.cache.record_query_outcome(series_id, hit_variant, missed, feed if hit_variant else None)
@@ -0,0 +1,418 @@
+"""
+Release search providers.
+
+A provider exposes one or more feeds (stable ids the query planner learns per
+series and a search can be restricted to) and fetches the raw entries of one
+feed page for a query. NyaaSearcher queries every provider concurrently and
+parses, filters and scores the entries the same way whatever their source.
+
+- nyaa: Nyaa RSS feeds per uploader (the default)
+- rss: any RSS/Atom search URL with {query} and {page} placeholders
+- torznab: a Torznab indexer or aggregator (Jackett, Prowlarr, ...)
+- local: an RSS/Atom file, or a directory of them, matched on title tokens
+"""
+import asyncio
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, quote_plus, urlencode, urlsplit
+
+from utils.parse_pool import get_parse_pool
+from utils.ratelimit import get_rate_limiter
+from utils.retry import http_retry
+
+# feedparser, httpx and bs4/lxml are imported on first use to keep startup fast
+
+# Connection pool of each HTTP provider's client: queries fanned out at once, idle keep-alive
+POOL_CONNECTIONS = 8
+POOL_KEEPALIVE_SECONDS = 30.0
+
+TORZNAB_NS = "{http://torznab.com/schemas/2015/feed}"
+RE_TOKEN = re.compile(r"[a-z0-9]+")
+RE_SXXEYY = re.compile(r"s(\d+)e(\d+)")
+
+
+def feed_url(base_url: str, query: Optional[str] = None, page: int = 1) -> str:
+    url = base_url
+    if query:
+        url += f"&q={query}"
+    if page > 1:
+        url += f"&p={page}"
+    return url
+
+
+def title_tokens(text: str) -> set:
+    """Lowercase word tokens; S01E05 also yields S01 and E05 so season and episode queries match it."""
+    out = set(RE_TOKEN.findall(text.lower()))
+    for tok in list(out):
+        m = RE_SXXEYY.fullmatch(tok)
+        if m:
+            out.update((f"s{m.group(1)}", f"e{m.group(2)}"))
+    return out
+
+
+class FeedEntry:
+    """
+    One raw feed item before scoring. `parsed` is the parse_release_title result
+    ({} if unparseable) when the page was parsed by parse_page, else None.
+    `published` is the item's pubDate (epoch seconds) when the feed gives one.
+    """
+    __slots__ = ('title', 'magnet', 'link', 'parsed', 'published', 'uploader')
+
+    def __init__(self, title: str, magnet: Optional[str] = None, link: Optional[str] = None,
+                 parsed: Optional[Dict] = None, published: Optional[int] = None, uploader: Optional[str] = None):
+        self.title = title
+        self.magnet = magnet
+        self.link = link
+        self.parsed = parsed
+        self.published = published
+        self.uploader = uploader
+
+
+# Parse functions below are module-level so the parse pool can run them in worker
+# processes; they return plain tuples, which pickle compactly.
+
+def rss_entries(text: str) -> List[tuple]:
+    """(title, magnet, link, published, uploader) of each RSS/Atom item."""
+    import calendar
+    import feedparser
+    return [(e.get('title', ''), RssProvider.entry_magnet(e), e.get('link'),
+             calendar.timegm(e.published_parsed) if e.get('published_parsed') else None, e.get('author'))
+            for e in feedparser.parse(text).entries]
+
+
+def torznab_entries(text: str) -> List[tuple]:
+    """(title, magnet, link, published, uploader) of each Torznab item; an error document raises ValueError."""
+    import xml.etree.ElementTree as ET
+    from email.utils import parsedate_to_datetime
+    root = ET.fromstring(text)
+    if root.tag == "error":
+        raise ValueError(f"Torznab error {root.get('code')}: {root.get('description')}")
+    entries = []
+    for item in root.iter("item"):
+        attrs = {a.get("name"): a.get("value") for a in item.iter(f"{TORZNAB_NS}attr")}
+        enclosure = item.find("enclosure")
+        link = (enclosure.get("url") if enclosure is not None else None) or item.findtext("link")
+        magnet = attrs.get("magneturl")
+        if not magnet and link and link.startswith("magnet:?"):
+            magnet = link
+        try:
+            published = int(parsedate_to_datetime(item.findtext("pubDate")).timestamp())
+        except (TypeError, ValueError):
+            published = None
+        entries.append((item.findtext("title") or "", magnet, link, published, attrs.get("poster")))
+    return entries
+
+
+def parse_page(extract, text: str) -> List[tuple]:
+    """
+    extract(text) with every title run through parse_release_title:
+    (title, magnet, link, parsed or {}, published, uploader).
+    """
+    from modules.parser import parse_release_title
+    return [(title, magnet, link, parse_release_title(title) or {}, *rest) for title, magnet, link, *rest in extract(text)]
+
+
+def page_magnet(html: str) -> Optional[str]:
+    """First magnet link of a release page."""
+    from bs4 import BeautifulSoup
+    a = BeautifulSoup(html, 'lxml').select_one('a[href^="magnet:"]')
+    return a['href'] if a else None
+
+
+class SearchProvider:
+    """
+    Base provider. `fetch` returns the entries of one feed page (empty when the
+    feed has no more pages) and raises on failure; network calls go through
+    `_bounded` so a slow provider times out instead of holding up the others.
+    """
+    kind = "base"
+
+    def __init__(self, name: str, timeout: Optional[float] = 20.0):
+        self.name = name
+        self.timeout = float(timeout) if timeout else None
+        # Shared with the searcher, which reads and resets the per-cycle counters
+        self.stats: Dict[str, int] = {'requests': 0}
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def feeds(self) -> List[str]:
+        return [self.name]
+
+    @property
+    def urls(self) -> List[str]:
+        """HTTP endpoints, for per-host rate limits."""
+        return []
+
+    def uploader(self, feed: str) -> Optional[str]:
+        """Uploader every entry of `feed` comes from, when the feed is per uploader."""
+        return None
+
+    async def fetch(self, feed: str, query: Optional[str], page: int = 1) -> List[FeedEntry]:
+        raise NotImplementedError
+
+    async def resolve_magnet(self, entry: FeedEntry) -> Optional[str]:
+        """Magnet for an accepted entry whose feed item did not carry one."""
+        return None
+
+    async def prefetch(self, feed: str, query: str, wanted) -> Optional[bool]:
+        """
+        Warm the search cache with page 1 of a query, keeping it only if
+        `wanted(entries)`: None when there is nothing to warm (no cache, or
+        already cached), else whether the page was kept.
+        """
+        return None
+
+    async def aclose(self):
+        """Release network resources (the HTTP client of HTTP providers)."""
+
+    async def _bounded(self, awaitable):
+        if not self.timeout:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, self.timeout)
+
+
+class RssProvider(SearchProvider):
+    """RSS/Atom search feeds fetched over HTTP; responses go through the search cache."""
+    kind = "rss"
+
+    def __init__(self, name: str, feeds: Sequence[str], cache=None, timeout: Optional[float] = 20.0):
+        super().__init__(name, timeout)
+        self._feeds = [f for f in feeds if f]
+        self.cache = cache
+        self.limiter = get_rate_limiter()
+        # (loop, client) of the loop the client was last used on
+        self._bound: Optional[tuple] = None
+
+    @property
+    def feeds(self) -> List[str]:
+        return list(self._feeds)
+
+    @property
+    def urls(self) -> List[str]:
+        return list(self._feeds)
+
+    def url_for(self, feed: str, query: Optional[str], page: int) -> str:
+        return feed.replace("{query}", quote_plus(query or "")).replace("{page}", str(page))
+
+    def request_params(self) -> Dict[str, str]:
+        """Extra query parameters sent but kept out of cache keys and logs (API keys)."""
+        return {}
+
+    # Page parser, (title, magnet, link, published, uploader) tuples; a module-level function so it can run in the parse pool
+    extract = staticmethod(rss_entries)
+
+    def parse(self, text: str) -> List[FeedEntry]:
+        return [FeedEntry(title, magnet, link, None, *rest) for title, magnet, link, *rest in self.extract(text)]
+
+    async def parse_async(self, text: str) -> List[FeedEntry]:
+        """Entries with parsed titles; large pages are parsed in the parse pool, off the event loop."""
+        rows = await get_parse_pool().run(parse_page, self.extract, text, size=len(text))
+        return [FeedEntry(*row) for row in rows]
+
+    @staticmethod
+    def entry_magnet(entry) -> Optional[str]:
+        magnet = entry.get('torrent_magneturi') or entry.get('magnet')
+        if magnet:
+            return magnet
+        for l in entry.get('links', []):
+            href = l.get('href', '')
+            if href.startswith('magnet:?'):
+                return href
+        return None
+
+    async def fetch(self, feed: str, query: Optional[str], page: int = 1) -> List[FeedEntry]:
+        url = self.url_for(feed, query, page)
+        self.logger.debug("Fetching %s feed: %s", self.name, url)
+        cached = self.cache.get_search_cache(url) if self.cache else None
+        if cached:
+            self.logger.debug("Cache hit for: %s", url)
+            return await self.parse_async(cached)
+        text = await self._download(url)
+        if self.cache:
+            self.cache.set_search_cache(url, text)
+        return await self.parse_async(text)
+
+    async def prefetch(self, feed: str, query: str, wanted) -> Optional[bool]:
+        url = self.url_for(feed, query, 1)
+        if not self.cache or self.cache.has_search_cache(url):
+            return None
+        text = await self._download(url)
+        # A page without the release is not cached: it would hide a release published before the next search
+        if not wanted(await self.parse_async(text)):
+            return False
+        self.cache.set_search_cache(url, text, prefetched=True)
+        return True
+
+    def _client(self):
+        """The provider's keep-alive client; one per event loop, like the Shoko client."""
+        loop = asyncio.get_running_loop()
+        if self._bound is None or self._bound[0] is not loop:
+            import httpx
+            from utils.http_replay import http_transport
+            limits = httpx.Limits(max_connections=POOL_CONNECTIONS, max_keepalive_connections=POOL_CONNECTIONS,
+                                  keepalive_expiry=POOL_KEEPALIVE_SECONDS)
+            client = httpx.AsyncClient(timeout=20, transport=http_transport(asynchronous=True, limits=limits))
+            self._bound = (loop, client)
+        return self._bound[1]
+
+    async def aclose(self):
+        if self._bound is not None:
+            client = self._bound[1]
+            self._bound = None
+            await client.aclose()
+
+    async def _download(self, url: str) -> str:
+        self.stats['requests'] += 1
+        # Waiting for a rate-limit token is not the provider being slow: only the request is bounded
+        await self.limiter.acquire_async(url)
+        resp = await self._bounded(self._client().get(url, params=self.request_params() or None))
+        resp.raise_for_status()
+        return resp.text
+
+
+class NyaaProvider(RssProvider):
+    """Nyaa RSS feeds, one per uploader; pages without a magnet are scraped for one."""
+    kind = "nyaa"
+
+    @classmethod
+    def from_users(cls, users: Sequence[str], rss_urls: Optional[Sequence[str]] = None, cache=None,
+                   timeout: Optional[float] = 20.0, name: str = "nyaa") -> "NyaaProvider":
+        # Generate rss urls from users if not provided
+        urls = list(rss_urls or []) or [f"https://nyaa.si/?page=rss&u={u}" for u in users or []]
+        return cls(name, urls, cache=cache, timeout=timeout)
+
+    def url_for(self, feed: str, query: Optional[str], page: int) -> str:
+        return feed_url(feed, query, page)
+
+    def uploader(self, feed: str) -> Optional[str]:
+        # Per-uploader feeds: https://nyaa.si/?page=rss&u=<user>
+        users = parse_qs(urlsplit(feed).query).get("u")
+        return users[0] if users else None
+
+    @http_retry()
+    async def _http_get_text(self, url: str) -> str:
+        await self.limiter.acquire_async(url)
+        resp = await self._client().get(url)
+        resp.raise_for_status()
+        return resp.text
+
+    async def resolve_magnet(self, entry: FeedEntry) -> Optional[str]:
+        # Last resort: fetch page and scrape magnet link
+        if not entry.link:
+            return None
+        try:
+            text = await self._http_get_text(entry.link)
+            return await get_parse_pool().run(page_magnet, text, size=len(text))
+        except Exception as e:
+            from utils.i18n import lazy_t
+            self.logger.debug(lazy_t("log.scrape_magnet_failed"), e)
+            return None
+
+
+class TorznabProvider(RssProvider):
+    """
+    Torznab indexer (`t=search`). The feed id is the indexer URL without the API
+    key, which is only added to the outgoing request.
+    """
+    kind = "torznab"
+
+    def __init__(self, name: str, url: str, api_key: Optional[str] = None, categories: Sequence = (5070,),
+                 cache=None, timeout: Optional[float] = 20.0, page_size: int = 100):
+        url = url.rstrip("/")
+        if not url.endswith("/api"):
+            url += "/api"
+        super().__init__(name, [url], cache=cache, timeout=timeout)
+        self.api_key = api_key or ""
+        self.categories = ",".join(str(c) for c in categories or ())
+        self.page_size = max(1, int(page_size))
+
+    def url_for(self, feed: str, query: Optional[str], page: int) -> str:
+        params = {"t": "search", "q": query or "", "limit": self.page_size}
+        if self.categories:
+            params["cat"] = self.categories
+        if page > 1:
+            params["offset"] = (page - 1) * self.page_size
+        return f"{feed}?{urlencode(params)}"
+
+    def request_params(self) -> Dict[str, str]:
+        return {"apikey": self.api_key} if self.api_key else {}
+
+    extract = staticmethod(torznab_entries)
+
+
+class LocalFeedProvider(SearchProvider):
+    """
+    RSS/Atom file, or every .xml/.rss file of a directory, re-read when it
+    changes. An entry matches a query when its title holds every query token;
+    there is a single page.
+    """
+    kind = "local"
+
+    def __init__(self, name: str, path: str, timeout: Optional[float] = 20.0):
+        super().__init__(name, timeout)
+        self.path = Path(path)
+        self._loaded: Tuple[tuple, List[Tuple[set, FeedEntry]]] = ((), [])
+
+    def _files(self) -> List[Path]:
+        if self.path.is_dir():
+            return sorted(p for p in self.path.iterdir() if p.suffix.lower() in (".xml", ".rss"))
+        return [self.path]
+
+    def _entries(self) -> List[Tuple[set, FeedEntry]]:
+        files = self._files()
+        stamp = tuple((str(p), os.stat(p).st_mtime_ns) for p in files)
+        if stamp != self._loaded[0]:
+            entries = []
+            for p in files:
+                for title, magnet, link, *rest in rss_entries(p.read_bytes()):
+                    entry = FeedEntry(title, magnet, link, None, *rest)
+                    entries.append((title_tokens(entry.title), entry))
+            self._loaded = (stamp, entries)
+        return self._loaded[1]
+
+    async def fetch(self, feed: str, query: Optional[str], page: int = 1) -> List[FeedEntry]:
+        if page > 1:
+            return []
+        entries = await self._bounded(asyncio.to_thread(self._entries))
+        wanted = title_tokens(query or "")
+        return [entry for tokens, entry in entries if wanted <= tokens]
+
+
+def build_providers(search_cfg: dict, cache=None) -> List[SearchProvider]:
+    """
+    Providers from `search.providers` (a list of {type, name, timeout_seconds, ...});
+    without it, the single `search.provider` (nyaa) configured by `search.nyaa`.
+    Entries whose url/path is empty (e.g. an unset env var) are skipped.
+    """
+    nyaa_cfg = search_cfg.get("nyaa") or {}
+    specs = search_cfg.get("providers") or [{"type": search_cfg.get("provider") or "nyaa"}]
+    providers: List[SearchProvider] = []
+    for spec in specs:
+        kind = str(spec.get("type") or "nyaa").strip().lower()
+        name = str(spec.get("name") or kind)
+        timeout = float(spec.get("timeout_seconds", 20) or 0)
+        if kind == "nyaa":
+            providers.append(NyaaProvider.from_users(
+                spec.get("users", nyaa_cfg.get("users", ["Tsundere-Raws"])),
+                spec.get("rss_urls", nyaa_cfg.get("rss_urls", [])),
+                cache=cache, timeout=timeout, name=name,
+            ))
+        elif kind in ("torznab", "rss", "local"):
+            target = spec.get("path" if kind == "local" else "url")
+            if not target:
+                logging.getLogger(__name__).debug("Search provider '%s' has no %s, skipping", name,
+                                                  "path" if kind == "local" else "url")
+                continue
+            if kind == "torznab":
+                providers.append(TorznabProvider(name, target, api_key=spec.get("api_key"),
+                                                 categories=spec.get("categories", (5070,)), cache=cache, timeout=timeout))
+            elif kind == "rss":
+                providers.append(RssProvider(name, [target], cache=cache, timeout=timeout))
+            else:
+                providers.append(LocalFeedProvider(name, target, timeout=timeout))
+        else:
+            raise ValueError(f"Unknown search provider type '{kind}'")
+    return providers
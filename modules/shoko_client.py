@@ -1,65 +1,217 @@
+import asyncio
+import json
 import logging
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional
 
-import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from utils.loop_thread import LoopThread
+from utils.ratelimit import get_rate_limiter
+from utils.retry import http_retry
+from utils.singleflight import AsyncSingleFlight
 
+# httpx is imported when the first request is made
+if TYPE_CHECKING:
+    import httpx
 
-class ShokoClient:
-    def __init__(self, base_url: str, api_key: str):
+
+class MissingEpisode:
+    """The four fields a cycle needs from a Shoko missing-episode entry."""
+    __slots__ = ('episode_id', 'series_id', 'episode_number', 'air_date')
+
+    def __init__(self, episode_id: Optional[int], series_id: Optional[int], episode_number: Optional[int], air_date: Optional[str] = None):
+        self.episode_id = episode_id
+        self.series_id = series_id
+        self.episode_number = episode_number
+        self.air_date = air_date
+
+    @classmethod
+    def from_shoko(cls, item: Dict) -> "MissingEpisode":
+        ids = item.get('IDs') or {}
+        anidb = item.get('AniDB') or {}
+        return cls(ids.get('ID') or item.get('ID'), ids.get('ParentSeries'), anidb.get('EpisodeNumber'),
+                   anidb.get('AirDate') or item.get('AirDate'))
+
+    def to_row(self) -> list:
+        return [self.episode_id, self.series_id, self.episode_number, self.air_date]
+
+    @classmethod
+    def from_row(cls, row) -> "MissingEpisode":
+        # Rows persisted by older versions are full Shoko entries
+        return cls.from_shoko(row) if isinstance(row, dict) else cls(*row)
+
+    def __eq__(self, other):
+        return isinstance(other, MissingEpisode) and self.to_row() == other.to_row()
+
+    def __repr__(self):
+        return f"MissingEpisode(episode_id={self.episode_id}, series_id={self.series_id}, episode_number={self.episode_number})"
+
+
+def json_loader(decoder: str = "auto") -> Callable[[bytes], object]:
+    """
+    JSON decoder for response bodies: 'orjson' (optional, much faster on large
+    pages), 'json' (standard library) or 'auto' (orjson when installed).
+    """
+    decoder = (decoder or "auto").lower()
+    if decoder in ("auto", "orjson"):
+        try:
+            import orjson
+            return orjson.loads
+        except ImportError:
+            if decoder == "orjson":
+                raise
+    if decoder not in ("auto", "orjson", "json"):
+        raise ValueError(f"Unknown JSON decoder '{decoder}'")
+    return json.loads
+
+
+class _AsyncResponseReader:
+    """Async file-like view of a streamed httpx response for incremental JSON parsing."""
+
+    def __init__(self, response: "httpx.Response"):
+        self._chunks = response.aiter_bytes()
+        self._buffer = b''
+
+    async def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = await anext(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _missing_params(page_size: int, collecting_only: bool, include_xrefs: bool,
+                    include_data_from: Optional[List[str]]) -> dict:
+    params = {
+        'pageSize': page_size,
+        'page': 1,
+        'collecting': str(collecting_only).lower(),
+        'includeFiles': 'false',
+        'includeMediaInfo': 'false',
+        'includeAbsolutePaths': 'false',
+        'includeXRefs': str(include_xrefs).lower(),
+    }
+    # Multiple entries allowed
+    for src in include_data_from or []:
+        params.setdefault('includeDataFrom', []).append(src)
+    return params
+
+
+class AsyncShokoClient:
+    """
+    Shoko API client for asyncio. Each event loop gets one AsyncClient with a
+    keep-alive connection pool, at most `max_concurrency` requests are in flight
+    and identical concurrent GETs share one request. Response bodies are decoded
+    with `json_loader(json_decoder)`.
+    """
+
+    def __init__(self, base_url: str, api_key: str, max_concurrency: int = 8, keepalive_seconds: float = 30,
+                 json_decoder: str = "auto"):
         self.base_url = base_url.rstrip('/') + '/'
         self.api_key = api_key
-        self.client = httpx.Client(base_url=self.base_url, timeout=30, headers={
-            'accept': 'application/json',
-            'apikey': self.api_key,
-        })
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.keepalive_seconds = float(keepalive_seconds)
+        self.loads = json_loader(json_decoder)
         self.logger = logging.getLogger(__name__)
+        self.limiter = get_rate_limiter()
+        # (loop, client, semaphore) of the loop the client was last used on
+        self._bound: Optional[tuple] = None
+        self._flights = AsyncSingleFlight()
+        self.stats = self._flights.stats
         self._series_cache: dict[int, str] = {}
+        self._series_titles_cache: dict[int, List[tuple]] = {}
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8), reraise=True,
-           retry=retry_if_exception_type((httpx.HTTPError,)))
-    def _get(self, path: str, params: dict) -> httpx.Response:
-        r = self.client.get(path, params=params)
-        r.raise_for_status()
-        return r
+    def _client(self) -> tuple:
+        loop = asyncio.get_running_loop()
+        if self._bound is None or self._bound[0] is not loop:
+            import httpx
+            from utils.http_replay import http_transport
+            limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency,
+                                  keepalive_expiry=self.keepalive_seconds)
+            client = httpx.AsyncClient(base_url=self.base_url, timeout=30,
+                                       transport=http_transport(asynchronous=True, limits=limits), headers={
+                                           'accept': 'application/json',
+                                           'apikey': self.api_key,
+                                       })
+            self._bound = (loop, client, asyncio.Semaphore(self.max_concurrency))
+        return self._bound[1], self._bound[2]
 
-    def get_series_name(self, series_id: int) -> Optional[str]:
-        if not series_id:
-            return None
-        if series_id in self._series_cache:
-            return self._series_cache[series_id]
-        r = self._get(f'Series/{series_id}', params={})
-        data = r.json() or {}
-        name = data.get('Name') or data.get('AniDB', {}).get('Title')
+    async def aclose(self):
+        if self._bound is not None:
+            client = self._bound[1]
+            self._bound = None
+            await client.aclose()
+
+    async def get_json(self, path: str, params: dict):
+        """GET and decode; identical requests in flight at the same time share one."""
+        key = (path, tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in params.items())))
+        return await self._flights.do(key, lambda: self._get_json(path, params))
+
+    async def _get_json(self, path: str, params: dict):
+        r = await self._request('GET', path, params)
+        return self.loads(r.content) if r.content else None
+
+    @http_retry()
+    async def _request(self, method: str, path: str, params: Optional[dict] = None) -> "httpx.Response":
+        client, slots = self._client()
+        async with slots:
+            await self.limiter.acquire_async(self.base_url)
+            r = await client.request(method, path, params=params)
+            r.raise_for_status()
+            return r
+
+    async def _load_series(self, series_id: int) -> None:
+        await self._flights.do(('series', series_id), lambda: self._fetch_series(series_id))
+
+    async def _fetch_series(self, series_id: int) -> None:
+        # Loaded by a flight that ended between the caller's cache check and this one
+        if series_id in self._series_titles_cache:
+            return
+        data = await self.get_json(f'Series/{series_id}', params={'includeDataFrom': ['AniDB']}) or {}
+        anidb = data.get('AniDB') or {}
+        name = data.get('Name') or anidb.get('Title')
+        # (title, language) pairs; main titles carry no language and are always kept
+        titles: List[tuple] = []
+        for main in (name, anidb.get('Title')):
+            if main and all(main != n for n, _ in titles):
+                titles.append((main, None))
+        for title_obj in anidb.get('Titles') or []:
+            alias = title_obj.get('Name')
+            if alias and all(alias != n for n, _ in titles):
+                titles.append((alias, (title_obj.get('Language') or '').lower()))
         if name:
             self._series_cache[series_id] = name
-        return name
+        self._series_titles_cache[series_id] = titles
 
-    def get_missing_episodes(
-        self,
-        page_size: int = 200,
-        include_data_from: Optional[List[str]] = None,
-        collecting_only: bool = False,
-        include_xrefs: bool = True,
-    ) -> List[Dict]:
+    async def get_series_name(self, series_id: int) -> Optional[str]:
+        if not series_id:
+            return None
+        if series_id not in self._series_cache:
+            await self._load_series(series_id)
+        return self._series_cache.get(series_id)
+
+    async def get_series_titles(self, series_id: int, languages: Optional[List[str]] = None) -> List[str]:
+        """Series name followed by its AniDB alias titles (see ShokoClient.get_series_titles)."""
+        if not series_id:
+            return []
+        if series_id not in self._series_titles_cache:
+            await self._load_series(series_id)
+        wanted = {l.lower() for l in languages} if languages is not None else None
+        return [
+            name for name, lang in self._series_titles_cache.get(series_id) or []
+            if lang is None or wanted is None or lang in wanted
+        ]
+
+    async def get_missing_episodes(self, page_size: int = 200, include_data_from: Optional[List[str]] = None,
+                                   collecting_only: bool = False, include_xrefs: bool = True) -> List[Dict]:
         # /ReleaseManagement/MissingEpisodes/Episodes
-        params = {
-            'pageSize': page_size,
-            'page': 1,
-            'collecting': str(collecting_only).lower(),
-            'includeFiles': 'false',
-            'includeMediaInfo': 'false',
-            'includeAbsolutePaths': 'false',
-            'includeXRefs': str(include_xrefs).lower(),
-        }
-        if include_data_from:
-            # Multiple entries allowed
-            for src in include_data_from:
-                params.setdefault('includeDataFrom', []).append(src)
+        params = _missing_params(page_size, collecting_only, include_xrefs, include_data_from)
         results: List[Dict] = []
         while True:
-            r = self._get('ReleaseManagement/MissingEpisodes/Episodes', params=params)
-            data = r.json() or {}
+            data = await self.get_json('ReleaseManagement/MissingEpisodes/Episodes', dict(params)) or {}
             items = data.get('List') or data.get('list') or []
             results.extend(items)
             total = data.get('Total', 0)
@@ -69,34 +221,197 @@ class ShokoClient:
             params['page'] = page + 1
         return results
 
-    def get_episode_details(self, episode_id: int, include_data_from: Optional[List[str]] = None) -> Optional[Dict]:
-        """Get detailed episode info including metadata from AniDB/TmDB.
-        
-        Args:
-            episode_id: Shoko episode ID
-            include_data_from: List of data sources (e.g., ['AniDB', 'TmDB'])
-        
-        Returns:
-            Episode details dict or None if not found
+    async def iter_missing_pages(self, page_size: int = 200, include_data_from: Optional[List[str]] = None,
+                                 collecting_only: bool = False, incremental: Optional[bool] = None):
+        """
+        Async generator of slim missing-episode records, one list per Shoko page;
+        each page's JSON is dropped once read. With `incremental` (default: when
+        ijson is installed) records are built while the page downloads.
         """
+        if incremental is None or incremental:
+            try:
+                import ijson
+            except ImportError:
+                ijson = None
+            incremental = ijson is not None
+        params = _missing_params(page_size, collecting_only, False, include_data_from)
+        seen = 0
+        while True:
+            if incremental:
+                total, records = await self._stream_missing_page(params)
+            else:
+                data = await self.get_json('ReleaseManagement/MissingEpisodes/Episodes', dict(params)) or {}
+                items = data.get('List') or data.get('list') or []
+                total, records = data.get('Total', 0), [MissingEpisode.from_shoko(item) for item in items]
+                del data, items
+            if records:
+                yield records
+            seen += len(records)
+            if not records or seen >= (total or 0):
+                break
+            params['page'] += 1
+
+    @http_retry()
+    async def _open_missing_page(self, params: dict):
+        client, _ = self._client()
+        await self.limiter.acquire_async(self.base_url)
+        request = client.build_request('GET', 'ReleaseManagement/MissingEpisodes/Episodes', params=params)
+        response = await client.send(request, stream=True)
+        if response.is_error:
+            await response.aread()
+            response.raise_for_status()
+        return response
+
+    async def _stream_missing_page(self, params: dict):
+        """Records of one page, built while it downloads: (Total, records)."""
+        import ijson
+        _, slots = self._client()
+        total = 0
+        records: List[MissingEpisode] = []
+        builder = None
+        async with slots:
+            response = await self._open_missing_page(params)
+            try:
+                async for prefix, event, value in ijson.parse_async(_AsyncResponseReader(response)):
+                    if builder is not None:
+                        builder.event(event, value)
+                        if prefix == 'List.item' and event == 'end_map':
+                            records.append(MissingEpisode.from_shoko(builder.value))
+                            builder = None
+                    elif prefix == 'List.item' and event == 'start_map':
+                        builder = ijson.ObjectBuilder()
+                        builder.event(event, value)
+                    elif prefix == 'Total' and event == 'number':
+                        total = int(value)
+            finally:
+                await response.aclose()
+        return total, records
+
+    async def get_episode_details(self, episode_id: int, include_data_from: Optional[List[str]] = None) -> Optional[Dict]:
+        """Episode info including AniDB/TmDB metadata, or None if it could not be fetched."""
         params = {
             'includeFiles': 'false',
             'includeMediaInfo': 'false',
             'includeAbsolutePaths': 'false',
             'includeXRefs': 'false',
         }
-        if include_data_from:
-            for src in include_data_from:
-                params.setdefault('includeDataFrom', []).append(src)
+        for src in include_data_from or []:
+            params.setdefault('includeDataFrom', []).append(src)
         try:
-            r = self._get(f'Episode/{episode_id}', params=params)
-            return r.json()
+            return await self.get_json(f'Episode/{episode_id}', params)
         except Exception as e:
-            self.logger.warning(f"Failed to fetch episode {episode_id} details: {e}")
+            self.logger.warning("Failed to fetch episode %s details: %s", episode_id, e)
             return None
 
-    def update_series_stats(self) -> None:
+    async def update_series_stats(self) -> None:
         """Queue a job on Shoko to update all series stats and group filters."""
-        r = self._get('Action/UpdateSeriesStats', params={})
+        r = await self._request('GET', 'Action/UpdateSeriesStats')
         # No payload expected; log status for debugging
         self.logger.debug("Requested Shoko UpdateSeriesStats: %s", r.status_code)
+
+    async def scan_import_folder(self, folder_id: int) -> None:
+        """Queue a scan of one import folder, so new files there are imported."""
+        r = await self._request('GET', f'ImportFolder/{folder_id}/Scan')
+        self.logger.debug("Requested Shoko scan of import folder %s: %s", folder_id, r.status_code)
+
+    async def refresh_series(self, series_id: int) -> None:
+        """Queue a refresh of one series (AniDB data and stats)."""
+        r = await self._request('POST', f'Series/{series_id}/Action/Refresh')
+        self.logger.debug("Requested Shoko refresh of series %s: %s", series_id, r.status_code)
+
+
+class ShokoClient:
+    """
+    Synchronous facade over AsyncShokoClient (`aio`): calls run on a background
+    event loop shared by every calling thread, so they share its connection pool,
+    concurrency limit and request coalescing. Async code should await `aio`.
+    """
+
+    def __init__(self, base_url: str, api_key: str, max_concurrency: int = 8, keepalive_seconds: float = 30,
+                 json_decoder: str = "auto"):
+        self.aio = AsyncShokoClient(base_url, api_key, max_concurrency=max_concurrency,
+                                    keepalive_seconds=keepalive_seconds, json_decoder=json_decoder)
+        self.base_url = self.aio.base_url
+        self.api_key = api_key
+        self.stats = self.aio.stats
+        self._loop = LoopThread("shoko-client")
+
+    def reset_stats(self):
+        self.stats.update(coalesced=0)
+
+    def close(self):
+        """Close the connection pool and stop the background loop."""
+        self._loop.run(self.aio.aclose())
+        self._loop.close()
+
+    def get_series_name(self, series_id: int) -> Optional[str]:
+        return self._loop.run(self.aio.get_series_name(series_id))
+
+    def get_series_titles(self, series_id: int, languages: Optional[List[str]] = None) -> List[str]:
+        """Get the series name followed by its AniDB alias titles.
+
+        Args:
+            series_id: Shoko series ID
+            languages: AniDB language codes to keep for aliases (e.g. ['x-jat', 'en']), all if None
+
+        Returns:
+            List of titles, main name first
+        """
+        return self._loop.run(self.aio.get_series_titles(series_id, languages))
+
+    def get_missing_episodes(
+        self,
+        page_size: int = 200,
+        include_data_from: Optional[List[str]] = None,
+        collecting_only: bool = False,
+        include_xrefs: bool = True,
+    ) -> List[Dict]:
+        return self._loop.run(self.aio.get_missing_episodes(page_size, include_data_from, collecting_only, include_xrefs))
+
+    def iter_missing_episodes(
+        self,
+        page_size: int = 200,
+        include_data_from: Optional[List[str]] = None,
+        collecting_only: bool = False,
+        incremental: Optional[bool] = None,
+    ) -> Iterator[MissingEpisode]:
+        """Yield slim missing-episode records page by page; each page's JSON is dropped once read.
+
+        Args:
+            page_size: Episodes per Shoko page
+            include_data_from: Data sources to include (AniDB carries the episode number and air date)
+            collecting_only: Only series marked as collecting
+            incremental: Decode each page incrementally with ijson (default: when ijson is installed)
+        """
+        pages = self.aio.iter_missing_pages(page_size, include_data_from, collecting_only, incremental)
+        try:
+            while True:
+                try:
+                    records = self._loop.run(anext(pages))
+                except StopAsyncIteration:
+                    return
+                yield from records
+        finally:
+            self._loop.run(pages.aclose())
+
+    def get_episode_details(self, episode_id: int, include_data_from: Optional[List[str]] = None) -> Optional[Dict]:
+        """Get detailed episode info including metadata from AniDB/TmDB.
+        
+        Args:
+            episode_id: Shoko episode ID
+            include_data_from: List of data sources (e.g., ['AniDB', 'TmDB'])
+        
+        Returns:
+            Episode details dict or None if not found
+        """
+        return self._loop.run(self.aio.get_episode_details(episode_id, include_data_from))
+
+    def update_series_stats(self) -> None:
+        """Queue a job on Shoko to update all series stats and group filters."""
+        self._loop.run(self.aio.update_series_stats())
+
+    def scan_import_folder(self, folder_id: int) -> None:
+        self._loop.run(self.aio.scan_import_folder(folder_id))
+
+    def refresh_series(self, series_id: int) -> None:
+        self._loop.run(self.aio.refresh_series(series_id))
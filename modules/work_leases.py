@@ -0,0 +1,74 @@
+import logging
+import time
+from typing import Dict, Optional
+
+
+class SeriesLeases:
+    """
+    Hands out series to workers sharing one state store (the SQLite cache on a
+    shared volume, or any object with `worker_id` and `claim_lease(key, ttl_seconds, now)`).
+    A worker processes its own shard (series_id % shard_count == shard_index) first,
+    then, if `steal` is set, any other series no live worker holds. Leases expire
+    after `lease_seconds`, so series of a crashed worker are picked up by the others;
+    held leases are renewed once half of their lifetime has passed, and released when
+    the cycle finishes. Global work (the Shoko series stats refresh) goes to whichever
+    worker takes its dedicated lease, which is kept for a whole `lease_seconds`.
+    """
+
+    def __init__(self, store, shard_index: int = 0, shard_count: int = 1, lease_seconds: int = 900,
+                 steal: bool = True, clock=time.time):
+        self.store = store
+        self.shard_count = max(1, int(shard_count))
+        self.shard_index = int(shard_index) % self.shard_count
+        self.lease_seconds = max(1, int(lease_seconds))
+        self.steal = steal
+        self._clock = clock
+        # series_id -> expiry of the lease this worker holds
+        self._held: Dict[int, float] = {}
+        self._refused: set = set()
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def worker_id(self) -> str:
+        return self.store.worker_id
+
+    def in_shard(self, series_id: Optional[int]) -> bool:
+        if series_id is None or self.shard_count == 1:
+            return True
+        return int(series_id) % self.shard_count == self.shard_index
+
+    def order(self, episodes: list) -> list:
+        """Own shard first, then the others (MissingEpisode records); stable within each group."""
+        return sorted(episodes, key=lambda ep: not self.in_shard(ep.series_id))
+
+    def claim(self, series_id: Optional[int]) -> bool:
+        """True if this worker may process the series now (lease taken, held or renewed)."""
+        if series_id is None:
+            return True
+        now = self._clock()
+        expires = self._held.get(series_id)
+        if expires is not None and expires - now > self.lease_seconds / 2:
+            return True
+        if expires is None and not self.in_shard(series_id) and not self.steal:
+            return False
+        if self.store.claim_lease(f"series:{series_id}", self.lease_seconds, now=now):
+            self._held[series_id] = now + self.lease_seconds
+            return True
+        self._held.pop(series_id, None)
+        if series_id not in self._refused:
+            self._refused.add(series_id)
+            self.logger.debug("Series %s is leased by another worker, skipping", series_id)
+        return False
+
+    def claim_global(self, name: str) -> bool:
+        """True if this worker should run the global task `name` now; not released with the series leases."""
+        return self.store.claim_lease(f"global:{name}", self.lease_seconds, now=self._clock())
+
+    def reset(self):
+        """Forget per-cycle bookkeeping; the store releases the leases when the cycle finishes."""
+        self._held.clear()
+        self._refused.clear()
+
+    @property
+    def refused(self) -> int:
+        return len(self._refused)
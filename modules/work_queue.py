@@ -0,0 +1,54 @@
+import logging
+import time
+from collections import Counter
+from typing import Optional, Tuple
+
+from modules.episode_priority import EpisodePrioritizer
+
+
+class WorkQueue:
+    """
+    Persisted, fair order of the missing episodes (episode_queue table in the
+    cache). The queue remembers when each episode was last searched; waiting
+    time ages its priority so episodes past the cycle budget move up and are
+    eventually searched. `max_per_series` caps how many episodes of one series
+    come before the other series' turn; the rest follow at the end of the
+    order, so the budget is still used when few series are missing.
+    """
+
+    def __init__(self, store, prioritizer: Optional[EpisodePrioritizer] = None, aging_hours: float = 24,
+                 max_per_series: int = 0, clock=time.time):
+        self.store = store
+        self.prioritizer = prioritizer
+        self.aging_hours = float(aging_hours)
+        self.max_per_series = max(0, int(max_per_series))
+        self._clock = clock
+        self.logger = logging.getLogger(__name__)
+
+    def schedule(self, episodes: list) -> Tuple[list, list, Optional[float]]:
+        """(episodes in search order, deferred too-fresh episodes, first expected availability or None)."""
+        state = self.store.sync_episode_queue([(ep.episode_id, ep.series_id) for ep in episodes])
+        now = self._clock()
+        waits = {episode_id: max(0.0, now - since) for episode_id, (since, _, _) in state.items()}
+        if self.prioritizer:
+            ordered, deferred, next_available = self.prioritizer.rank(episodes, waits, self.aging_hours)
+        else:
+            # Longest waiting first
+            ordered = sorted(episodes, key=lambda ep: -waits.get(ep.episode_id, 0))
+            deferred, next_available = [], None
+        return self._fair(ordered), deferred, next_available
+
+    def _fair(self, episodes: list) -> list:
+        if not self.max_per_series:
+            return episodes
+        taken: Counter = Counter()
+        first, rest = [], []
+        for ep in episodes:
+            if ep.series_id is not None and taken[ep.series_id] >= self.max_per_series:
+                rest.append(ep)
+            else:
+                taken[ep.series_id] += 1
+                first.append(ep)
+        if rest:
+            self.logger.debug("Per-series cap %d moved %d episode(s) after the other series", self.max_per_series, len(rest))
+        return first + rest
@@ -0,0 +1,27 @@
+from modules.cache import STAGE_ADDED, STAGE_NOTIFIED, STAGE_SELECTED, Cache
+
+
+def test_cycle_checkpoints_survive_reopen(tmp_path):
+    cache = Cache(tmp_path / "cache.db")
+    assert cache.get_cycle() is None
+
+    episodes = [{"IDs": {"ID": 1, "ParentSeries": 9}}, {"IDs": {"ID": 2, "ParentSeries": 9}}]
+    started = cache.start_cycle(episodes)
+    release = {"title": "Show S01E01", "magnet": "magnet:?xt=1", "parsed": {"episode": 1}}
+    cache.checkpoint_episode(1, STAGE_SELECTED, release)
+    cache.checkpoint_episode(1, STAGE_ADDED)
+
+    # A new process sees the interrupted cycle, its missing list and the chosen release
+    reopened = Cache(tmp_path / "cache.db")
+    assert reopened.get_cycle() == (started, None)
+    assert reopened.get_cycle_episodes() == episodes
+    assert reopened.get_episode_checkpoints() == {1: (STAGE_ADDED, release)}
+
+    reopened.checkpoint_episode(1, STAGE_NOTIFIED)
+    reopened.finish_cycle()
+    assert reopened.get_cycle()[1] is not None
+
+    # Starting the next cycle clears the previous checkpoints
+    reopened.start_cycle([])
+    assert reopened.get_episode_checkpoints() == {}
+    assert reopened.get_cycle()[1] is None
@@ -0,0 +1,84 @@
+import httpx
+import pytest
+
+from utils.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers, CircuitOpenError
+from utils.circuit_transport import CircuitTransport
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = Clock()
+    breaker = CircuitBreaker("nyaa.si", window=10, min_requests=4, failure_rate=0.5, cooldown=30, clock=clock)
+    for ok in (True, False, False):
+        assert breaker.allow()
+        breaker.record(ok)
+    assert breaker.state == CLOSED  # below min_requests
+    breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN and breaker.trips == 1
+    assert not breaker.allow() and breaker.rejected == 1
+    clock.now += 30
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # one probe at a time
+    breaker.record(False)
+    assert breaker.state == OPEN and breaker.retry_in() == 60  # cool-down doubled
+    clock.now += 60
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CLOSED and breaker.retry_in() == 0
+
+
+def test_cancelled_probe_frees_the_slot():
+    clock = Clock()
+    breaker = CircuitBreaker("h", min_requests=1, cooldown=1, clock=clock)
+    breaker.allow()
+    breaker.record(False)
+    clock.now += 1
+    assert breaker.allow()
+    breaker.record(None)
+    assert breaker.state == HALF_OPEN and breaker.allow()
+
+
+def test_transport_fails_fast_once_open():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.host)
+        return httpx.Response(503)
+
+    breakers = CircuitBreakers()
+    breakers.configure(min_requests=3, failure_rate=1.0, cooldown=60)
+    with httpx.Client(transport=CircuitTransport(breakers, httpx.MockTransport(handler))) as client:
+        for _ in range(3):
+            assert client.get("https://down.example/rss").status_code == 503
+        with pytest.raises(CircuitOpenError):
+            client.get("https://down.example/rss?q=other")
+        assert client.get("https://up.example/").status_code == 503  # other hosts are independent
+    assert calls.count("down.example") == 3
+    assert not breakers.available("https://down.example/x") and breakers.available("https://up.example/")
+    assert breakers.snapshot()["down.example"]["rejected"] == 1
+
+
+def test_reload_keeps_the_backoff_unless_the_cooldown_changes():
+    clock = Clock()
+    breaker = CircuitBreaker("h", min_requests=1, cooldown=10, max_cooldown=100, clock=clock)
+    breaker.allow()
+    breaker.record(False)
+    for _ in range(2):
+        clock.now += breaker.retry_in()
+        assert breaker.allow()
+        breaker.record(False)
+    assert breaker.retry_in() == 40
+    breaker.update(min_requests=1, cooldown=10, max_cooldown=100)
+    assert breaker.retry_in() == 40
+    breaker.update(min_requests=1, cooldown=10, max_cooldown=25)
+    assert breaker.retry_in() == 25
+    breaker.update(min_requests=1, cooldown=5, max_cooldown=25)
+    assert breaker.retry_in() == 5
@@ -0,0 +1,62 @@
+from modules.cache import Cache
+from modules.completion_tracker import CompletionTracker, info_hash
+
+HASH_A = "a" * 40
+HASH_B = "b" * 40
+
+
+class ScriptedQbit:
+    """Returns the scripted sync/maindata answers in order and records the rids asked for."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.rids = []
+
+    def sync_maindata(self, rid=0):
+        self.rids.append(rid)
+        return self.answers.pop(0)
+
+
+class RecordingShoko:
+    def __init__(self):
+        self.refreshed = []
+
+    def refresh_series(self, series_id):
+        self.refreshed.append(series_id)
+
+
+def test_info_hash_from_hex_and_base32_magnets():
+    assert info_hash(f"magnet:?xt=urn:btih:{HASH_A.upper()}&dn=x") == HASH_A
+    assert info_hash("magnet:?xt=urn:btih:" + "A" * 32) == "00" * 20
+    assert info_hash("https://nyaa.si/view/1") is None
+
+
+def test_deltas_resolve_completed_episodes_and_refresh_their_series(tmp_path):
+    cache = Cache(tmp_path / "c.db")
+    cache.sync_episode_queue([(1, 10), (2, 10), (3, 20)])
+    # A batch torrent covering episodes 1 and 2, and a single episode
+    cache.mark_episode_downloaded(1, 10, "m1", "batch", info_hash=HASH_A)
+    cache.mark_episode_downloaded(2, 10, "m1", "batch", info_hash=HASH_A)
+    cache.mark_episode_downloaded(3, 20, "m2", "single", info_hash=HASH_B)
+    qbit = ScriptedQbit(
+        {"rid": 1, "full_update": True, "torrents": {HASH_A: {"progress": 0.5}, HASH_B: {"progress": 0.1}, "c" * 40: {"progress": 1}}},
+        {"rid": 2, "torrents": {HASH_A: {"progress": 1.0}}},
+        {"rid": 3, "torrents_removed": [HASH_B]},
+    )
+    shoko = RecordingShoko()
+    tracker = CompletionTracker(qbit, shoko, cache)
+    assert tracker.poll() == 0
+    assert tracker.poll() == 2
+    assert shoko.refreshed == [10]
+    assert list(cache.pending_torrents()) == [HASH_B]
+    assert cache.sync_episode_queue([(1, 10), (2, 10), (3, 20)])[3][1:] == (0, 0)
+    # Shoko still lists 1 and 2 until it imports them; they are skipped meanwhile
+    assert cache.resolved_episodes([1, 2, 3]) == {1, 2}
+    assert cache.resolved_episodes([2, 3]) == {2}
+    # A tracked torrent removed from qBittorrent: the next poll asks for the full list, then untracks it
+    tracker.poll()
+    assert qbit.rids == [0, 1, 2]
+    assert tracker.rid == 0
+    qbit.answers.append({"rid": 4, "full_update": True, "torrents": {}})
+    tracker.poll()
+    assert cache.pending_torrents() == {}
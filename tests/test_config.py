@@ -0,0 +1,46 @@
+import os
+import time
+
+import pytest
+
+from modules.cycle_config import CycleConfig
+from utils.config import AppConfig, ConfigWatcher
+
+
+def test_app_config_is_frozen_and_typed(tmp_path):
+    cfg = AppConfig.from_mapping(tmp_path / "config.yaml", {"general": {"max_items": "5", "dry_run": "false"}})
+    assert cfg.max_items == 5
+    assert cfg.dry_run is False
+    assert cfg.schedule_hours == 24
+    with pytest.raises(TypeError):
+        cfg.section("general")["max_items"] = 1
+
+
+def test_cycle_config_precomputes_flags(tmp_path, monkeypatch):
+    monkeypatch.setenv("SHOKO_UPDATE_SERIES_STATS", "false")
+    monkeypatch.delenv("SHOKO_UPDATE_WAIT_SECONDS", raising=False)
+    app_cfg = AppConfig.from_mapping(tmp_path / "config.yaml", {
+        "general": {"shoko_update_series_stats": True, "shoko_update_wait_seconds": ""},
+        "search": {"nyaa": {"preferred": {"language": "VOSTFR", "qualities": ["1080p"]}}},
+        "qbittorrent": {"tag_enabled": "", "tag_value": "ShokoAT", "category_enabled": "false",
+                        "save_root": "/data/anime", "path_template": "{save_root}/{series}"},
+    })
+    cycle = CycleConfig.compile(app_cfg)
+    assert cycle.update_series_stats is False
+    assert cycle.update_wait_seconds == 20
+    assert cycle.tags == "ShokoAT"
+    assert cycle.category_enabled is False
+    assert cycle.scorer.score({"language": "VOSTFR", "quality": "1080p"}) == 60
+    assert cycle.path_template.render({"save_root": "/data/anime", "series": "Show"}) == "/data/anime/Show"
+
+
+def test_config_watcher_reloads_on_mtime_change(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text("general: {max_items: 3}\n")
+    watcher = ConfigWatcher(path)
+    assert watcher.poll() is None
+    path.write_text("general: {max_items: 7}\n")
+    later = time.time() + 10
+    os.utime(path, (later, later))
+    assert watcher.poll().max_items == 7
+    assert watcher.poll() is None
@@ -0,0 +1,47 @@
+from modules.episode_index import EpisodeIndex, title_key
+from modules.parser import parse_release_title
+
+
+def test_title_key_ignores_punctuation_and_case():
+    assert title_key("Disney Twisted-Wonderland: The Animation") == "disney twisted wonderland the animation"
+    assert title_key("DISNEY Twisted Wonderland The Animation") == "disney twisted wonderland the animation"
+
+
+def test_resolve_release_to_missing_episode():
+    index = EpisodeIndex()
+    index.add_episode(101, ["My Hero Academia Season 7"], 11)
+    index.add_episode(102, ["My Hero Academia Season 7"], 12)
+    parsed = parse_release_title("My Hero Academia S07E11 VOSTFR 1080p WEB x264 AAC -Tsundere-Raws (CR)")
+    assert index.resolve(parsed) == 101
+    assert index.matches(parsed, 101)
+    assert not index.matches(parsed, 102)
+
+
+def test_resolve_rejects_other_series_and_season():
+    index = EpisodeIndex()
+    index.add_episode(101, ["My Hero Academia Season 7"], 11)
+    assert index.resolve(parse_release_title("My Hero Academia Vigilantes S01E11 VOSTFR 1080p")) is None
+    assert index.resolve(parse_release_title("My Hero Academia S06E11 VOSTFR 1080p")) is None
+
+
+def test_resolve_alias_title_and_e_only_release():
+    index = EpisodeIndex()
+    index.add_episode(7, ["Frieren: Beyond Journey's End", "Sousou no Frieren"], 3)
+    assert index.resolve(parse_release_title("[Team Arcedo] Sousou no Frieren S01E03 VOSTFR WEB 1080p")) == 7
+    assert index.resolve(parse_release_title("Sousou no Frieren E03 720p")) == 7
+
+
+def test_ambiguous_keys_do_not_resolve():
+    index = EpisodeIndex()
+    index.add_episode(1, ["Same Title"], 1)
+    index.add_episode(2, ["Same Title"], 1)
+    assert index.resolve(parse_release_title("Same Title S01E01 VOSTFR")) is None
+
+
+def test_resolve_all_batch_and_season_pack():
+    index = EpisodeIndex()
+    for ep in (3, 4, 5, 13):
+        index.add_episode(100 + ep, ["My Show"], ep)
+    assert index.resolve_all(parse_release_title("My Show S01E01-12 VOSTFR 1080p")) == [103, 104, 105]
+    assert index.resolve_all(parse_release_title("My Show S01 VOSTFR 1080p")) == [103, 104, 105, 113]
+    assert index.resolve(parse_release_title("My Show S01E01-12 VOSTFR 1080p")) is None
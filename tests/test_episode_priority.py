@@ -0,0 +1,32 @@
+from modules.episode_priority import EpisodePrioritizer, air_timestamp
+from modules.shoko_client import MissingEpisode
+
+NOW = air_timestamp("2025-06-30T12:00:00")
+
+
+def ep(episode_id, air_date):
+    return MissingEpisode(episode_id, 1, episode_id, air_date)
+
+
+def test_rank_recent_first_fresh_deferred_stale_last():
+    episodes = [
+        ep(1, "2023-01-01"),           # stale
+        ep(2, "2025-06-20"),           # recent
+        ep(3, None),                   # undated
+        ep(4, "2025-06-30"),           # aired 12h ago, still within min_age
+        ep(5, "2025-05-01"),           # older
+        ep(6, "2025-06-28"),           # recent, newer than 2
+        ep(7, "not a date"),           # undated
+    ]
+    prioritizer = EpisodePrioritizer(min_age_hours=24, recent_days=14, stale_days=180, clock=lambda: NOW)
+    ranked, deferred, next_available = prioritizer.rank(episodes)
+    assert [e.episode_id for e in ranked] == [6, 2, 5, 3, 7, 1]
+    assert [e.episode_id for e in deferred] == [4]
+    assert next_available == air_timestamp("2025-07-01")
+    assert prioritizer.counts(ranked) == [2, 1, 2, 1]
+
+
+def test_stale_days_zero_never_demotes():
+    prioritizer = EpisodePrioritizer(min_age_hours=0, recent_days=1, stale_days=0, clock=lambda: NOW)
+    ranked, _, _ = prioritizer.rank([ep(1, None), ep(2, "2010-01-01")])
+    assert [e.episode_id for e in ranked] == [2, 1]
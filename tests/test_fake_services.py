@@ -0,0 +1,22 @@
+from benchmarks.fake_services import Corpus, FakeServices
+from modules.nyaa_search import NyaaSearcher
+from modules.shoko_client import ShokoClient
+
+
+def test_clients_run_against_fake_services():
+    corpus = Corpus(episodes=30, series_size=12)
+    with FakeServices(corpus) as services:
+        urls = services.urls()
+        shoko = ShokoClient(urls["shoko"], "key")
+        episodes = shoko.get_missing_episodes(page_size=8)
+        assert len(episodes) == 30
+        series_id = episodes[0]["IDs"]["ParentSeries"]
+        name = shoko.get_series_name(series_id)
+        assert name == corpus.series[series_id]["Name"]
+
+        nyaa = NyaaSearcher(users=[], rss_urls=urls["nyaa"], preferred={"language": "VOSTFR"}, rate_limit_seconds=0)
+        expected = [r["title"] for r in corpus.releases if f"{name} S01E" in r["title"]]
+        results = nyaa.search_series(f"{name} S01")
+        assert sorted(r.title for r in results) == sorted(expected)
+        assert all(r.magnet.startswith("magnet:?") for r in results)
+        assert services.request_counts()["shoko"] == 5
@@ -0,0 +1,25 @@
+from benchmarks.fake_services import Corpus, FakeServices
+from modules.discord_notifier import DiscordNotifier
+from modules.nyaa_search import NyaaSearcher
+from utils.notifier import Notifier
+
+
+def test_searches_and_notifications_reuse_their_connections():
+    corpus = Corpus(episodes=30, series_size=12)
+    with FakeServices(corpus) as services:
+        urls = services.urls()
+        nyaa = NyaaSearcher(users=[], rss_urls=urls["nyaa"], preferred={"language": "VOSTFR"}, rate_limit_seconds=0)
+        for series in list(corpus.series.values())[:3]:
+            nyaa.search_series(f"{series['Name']} S01")
+        discord = DiscordNotifier(urls["discord"])
+        notifier = Notifier({"discord_webhook_url": urls["discord"]})
+        for n in range(3):
+            discord.notify_download("Show", 1, n + 1, "[G] Show S01E01")
+            notifier.notify_error("Cycle failed", "boom")
+        nyaa.close()
+        discord.close()
+        notifier.close()
+        assert services.request_counts()["nyaa"] == 6 and services.request_counts()["discord"] == 6
+        # One connection per feed fetched concurrently, one for both notifiers each
+        assert services.connection_counts()["nyaa"] == 2
+        assert services.connection_counts()["discord"] == 2
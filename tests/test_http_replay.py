@@ -0,0 +1,87 @@
+import asyncio
+
+import httpx
+import pytest
+
+from utils.http_replay import (AsyncRecordingTransport, AsyncReplayTransport, HttpArchive, RecordingTransport,
+                               ReplayMissError, ReplayTransport, install_archive, uninstall_archive)
+from utils.ratelimit import get_rate_limiter
+
+
+def upstream(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, text=f"{request.method} {request.url.params.get('q', '')}",
+                          headers={"content-type": "text/plain", "x-calls": "1"})
+
+
+def test_record_then_replay_offline(tmp_path):
+    path = tmp_path / "cycle.jsonl"
+    recorder = HttpArchive(path, mode="record")
+    with httpx.Client(transport=RecordingTransport(recorder, httpx.MockTransport(upstream))) as client:
+        assert client.get("https://nyaa.si/?q=show&page=rss").text == "GET show"
+        client.post("https://discord.test/hook", json={"ts": 1})
+
+    async def fetch_async():
+        inner = httpx.MockTransport(upstream)
+        async with httpx.AsyncClient(transport=AsyncRecordingTransport(recorder, inner)) as client:
+            return (await client.get("https://nyaa.si/?q=other")).text
+    assert asyncio.run(fetch_async()) == "GET other"
+    assert recorder.stats["recorded"] == 3
+
+    replay = HttpArchive(path, mode="replay")
+    with httpx.Client(transport=ReplayTransport(replay)) as client:
+        # Query parameter order does not matter
+        resp = client.get("https://nyaa.si/?page=rss&q=show")
+        assert (resp.status_code, resp.text, resp.headers["x-calls"]) == (200, "GET show", "1")
+        # A different payload falls back to the same method and URL
+        assert client.post("https://discord.test/hook", json={"ts": 2}).status_code == 200
+        with pytest.raises(ReplayMissError):
+            client.get("https://nyaa.si/?q=unknown")
+
+    async def replay_async():
+        async with httpx.AsyncClient(transport=AsyncReplayTransport(replay)) as client:
+            return (await client.get("https://nyaa.si/?q=other")).text
+    assert asyncio.run(replay_async()) == "GET other"
+
+
+def test_method_calls_are_recorded_and_replayed(tmp_path):
+    class Qbit:
+        def add_magnet(self, magnet, save_path=None):
+            if magnet == "bad":
+                raise ValueError("rejected")
+            return "Ok."
+
+    path = tmp_path / "qbit.jsonl"
+    recorder = HttpArchive(path, mode="record")
+    qbit = recorder.wrap_calls(Qbit(), "qbit", ("add_magnet",))
+    assert qbit.add_magnet("magnet:?a", save_path="/data") == "Ok."
+    with pytest.raises(ValueError):
+        qbit.add_magnet("bad")
+
+    replayed = HttpArchive(path, mode="replay").wrap_calls(Qbit(), "qbit", ("add_magnet",))
+    assert replayed.add_magnet("magnet:?a", save_path="/data") == "Ok."
+    with pytest.raises(RuntimeError, match="rejected"):
+        replayed.add_magnet("bad")
+
+
+def test_replayed_answer_is_served_once_and_not_rate_limited(tmp_path):
+    path = tmp_path / "hook.jsonl"
+    recorder = HttpArchive(path, mode="record")
+    echo = httpx.MockTransport(lambda request: httpx.Response(200, content=request.content))
+    with httpx.Client(transport=RecordingTransport(recorder, echo)) as client:
+        client.post("https://discord.test/hook", content=b"a")
+        client.post("https://discord.test/hook", content=b"b")
+
+    with httpx.Client(transport=ReplayTransport(HttpArchive(path, mode="replay"))) as client:
+        assert client.post("https://discord.test/hook", content=b"b").text == "b"
+        # Unknown payloads fall back to the answers not served yet, then repeat the last one
+        assert client.post("https://discord.test/hook", content=b"c").text == "a"
+        assert client.post("https://discord.test/hook", content=b"c").text == "a"
+
+    get_rate_limiter().configure("https://discord.test", rate=0.01)
+    try:
+        install_archive(path, "replay")
+        assert get_rate_limiter().acquire("https://discord.test/hook") == 0.0
+        assert get_rate_limiter().acquire("https://discord.test/hook") == 0.0
+    finally:
+        uninstall_archive()
+    assert get_rate_limiter().bucket("https://discord.test") is not None
@@ -0,0 +1,43 @@
+import json
+import logging
+
+from utils.i18n import I18n, LazyMessage, flatten_catalog, set_locale
+from utils.logger import set_log_context, setup_logging, stop_logging
+
+
+class CountingMessage(LazyMessage):
+    __slots__ = ()
+    lookups = 0
+
+    def __str__(self):
+        CountingMessage.lookups += 1
+        return super().__str__()
+
+
+def test_flat_catalog_lookup():
+    assert flatten_catalog({"log": {"a": "x", "b": {"c": "y"}}, "n": 1}) == {"log.a": "x", "log.b.c": "y"}
+    i18n = I18n("en")
+    assert i18n.t("log.cycle_resumed").startswith("Resuming")
+    assert i18n.t("log.nope") == "log.nope"
+
+
+def test_json_logging_through_queue_with_context_and_lazy_lookup(capsys):
+    set_locale("en")
+    setup_logging(level=logging.INFO, fmt="json")
+    try:
+        logger = logging.getLogger("test")
+        set_log_context(cycle=1700000000, series=12, episode=345)
+        logger.info(CountingMessage("log.missing_found_count"), 3)
+        logger.debug(CountingMessage("log.missing_found_count"), 4)
+        set_log_context(series=None, episode=None)
+        logger.warning("plain %s", "text")
+    finally:
+        stop_logging()
+        for handler in list(logging.getLogger().handlers):
+            logging.getLogger().removeHandler(handler)
+    lines = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    assert lines[0]["msg"] == "3 missing episodes found"
+    assert (lines[0]["cycle"], lines[0]["series"], lines[0]["episode"]) == (1700000000, 12, 345)
+    assert lines[1]["msg"] == "plain text" and "episode" not in lines[1] and lines[1]["cycle"] == 1700000000
+    # The filtered DEBUG record never looked its message up
+    assert CountingMessage.lookups == 1
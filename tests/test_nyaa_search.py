@@ -0,0 +1,110 @@
+import asyncio
+import random
+import time
+
+from modules.nyaa_search import NyaaSearcher, Release
+from modules.parser import parse_release_title
+from modules.search_providers import FeedEntry, SearchProvider
+
+PREFERRED = {"language": "VOSTFR", "qualities": ["1080p", "720p"], "sources": ["CR", "ADN"]}
+
+
+def make_searcher(pages):
+    searcher = NyaaSearcher(users=[], rss_urls=["https://nyaa.si/?page=rss&u=A"], preferred=PREFERRED, rate_limit_seconds=0)
+
+    async def fake_query(query, feeds=None, page=1):
+        return [Release(t, f"magnet:?{t}", None, searcher.scorer.score(parse_release_title(t)),
+                        parse_release_title(t), query, "A") for t in pages[query]]
+    searcher._search_query_async = fake_query
+    return searcher
+
+
+def test_top_k_matches_full_sort():
+    rng = random.Random(1)
+    titles = [f"[G{i}] Show S01E01{' v2' if i % 3 == 0 else ''} VOSTFR {rng.choice(['1080p', '720p', '2160p'])} "
+              f"{rng.choice(['CR', 'ADN', 'WEB'])}" for i in range(60)]
+    pages = {"q1": titles[:40], "q2": titles[20:]}
+    full = make_searcher(pages).search_tsundere(["q1", "q2"], early_exit=False)
+    top = make_searcher(pages).search_tsundere(["q1", "q2"], early_exit=False, limit=5)
+    assert len(full) == 60
+    assert [r.title for r in top] == [r.title for r in full[:5]]
+    assert full == NyaaSearcher._sort_results(list(full))
+
+
+def test_release_key_is_interned_and_dedups():
+    a = Release("Show S01E01 VOSTFR", "magnet:?x", None, 1, {})
+    b = Release("Show S01E01 VOSTFR", "magnet:?x", None, 1, {})
+    assert a.key is b.key
+    searcher = make_searcher({"q": ["Show S01E01 VOSTFR 1080p CR", "Show S01E01 VOSTFR 1080p CR"]})
+    assert len(searcher.search_tsundere(["q"])) == 1
+
+
+class ScriptedProvider(SearchProvider):
+    """Answers each query with (delay, titles); `delays` overrides the delay per call, in order."""
+
+    def __init__(self, name, script, delays=()):
+        super().__init__(name, timeout=None)
+        self.script = script
+        self.delays = list(delays)
+
+    async def fetch(self, feed, query, page=1):
+        delay, titles = self.script.get(query, (0, []))
+        await asyncio.sleep(self.delays.pop(0) if self.delays else delay)
+        return [FeedEntry(t, f"magnet:?{t}") for t in titles]
+
+
+def fanout_searcher(*providers, **fanout):
+    searcher = NyaaSearcher(users=[], rss_urls=[], preferred=PREFERRED, rate_limit_seconds=0, providers=providers)
+    searcher.set_fanout(**fanout)
+    return searcher
+
+
+def test_fanout_keeps_sequential_answer_on_early_exit():
+    provider = ScriptedProvider("p", {
+        "q1": (0.2, []),
+        "q2": (0.0, ["Show S01E01 VOSTFR 720p WEB"]),
+        "q3": (0.0, ["Show S01E01 VOSTFR 1080p ADN"]),
+    })
+    results = fanout_searcher(provider, parallel_queries=3).search_tsundere(["q1", "q2", "q3"])
+    assert [r.query for r in results] == ["q2"]
+
+
+def test_fanout_stop_score_cancels_slow_feeds():
+    fast = ScriptedProvider("fast", {"q": (0.0, ["[G] Show S01E01 VOSTFR 1080p (CR)"])})
+    slow = ScriptedProvider("slow", {"q": (5.0, ["Show S01E01 VOSTFR 720p WEB"])})
+    searcher = fanout_searcher(fast, slow, parallel_queries=2)
+    start = time.perf_counter()
+    results = searcher.search_tsundere(["q", "q2"])
+    assert time.perf_counter() - start < 2
+    assert [r.feed for r in results] == ["fast"]
+    assert searcher.stats["cancelled"] >= 1
+
+
+def test_fanout_hedges_slow_feed():
+    provider = ScriptedProvider("p", {"q": (0.0, ["Show S01E01 VOSTFR 720p WEB"])}, delays=[5.0])
+    searcher = fanout_searcher(provider, parallel_queries=1, hedge_after=0.05)
+    start = time.perf_counter()
+    assert len(searcher.search_tsundere(["q"])) == 1
+    assert time.perf_counter() - start < 2
+    assert searcher.stats["hedged"] == 1
+
+
+class FlakyProvider(ScriptedProvider):
+    """The first call is slow and succeeds; later calls (the hedges) fail at once."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    async def fetch(self, feed, query, page=1):
+        self.calls += 1
+        if self.calls > 1:
+            raise ConnectionError("reset by peer")
+        return await super().fetch(feed, query, page)
+
+
+def test_failed_hedge_does_not_beat_a_slower_success():
+    provider = FlakyProvider("p", {"q": (0.3, ["Show S01E01 VOSTFR 720p WEB"])})
+    searcher = fanout_searcher(provider, parallel_queries=1, hedge_after=0.05)
+    assert [r.title for r in searcher.search_tsundere(["q"])] == ["Show S01E01 VOSTFR 720p WEB"]
+    assert searcher.stats["hedged"] == 1 and provider.calls == 2
@@ -90,3 +90,53 @@ def test_multi_language_scoring():
     assert score_multi == 60   # 40 + 20
     assert score_vf == 20      # 0 + 20
     assert score_vostfr > score_multi > score_vf
+
+
+def test_parse_batch_episode_range():
+    p = parse_release_title("My Show S01E01-12 VOSTFR 1080p WEB -Tsundere-Raws (CR)")
+    assert p is not None
+    assert p['batch'] is True
+    assert p['season'] == 1
+    assert (p['episode'], p['episode_end']) == (1, 12)
+    assert p['quality'] == '1080p'
+    assert p['provider'] == 'CR'
+
+
+def test_parse_season_pack():
+    p = parse_release_title("[Grp] My Show S02 VOSTFR 1080p BD")
+    assert p['batch'] is True
+    assert p['season'] == 2
+    assert p['episode'] is None and p['episode_end'] is None
+
+
+def test_single_episode_is_not_batch():
+    p = parse_release_title("My Show S01E05 - 1080p")
+    assert p['batch'] is False
+    assert p['episode'] == 5
+
+
+def test_spaced_episode_is_not_a_season_pack():
+    for title in ("My Show S01 E05 VOSTFR", "My Show S01 - 05 VOSTFR", "My Show S01E05 VOSTFR"):
+        p = parse_release_title(title)
+        assert p['batch'] is False, title
+        assert (p['season'], p['episode']) == (1, 5), title
+    pack = parse_release_title("[Grp] My Show S01 1080p VOSTFR")
+    assert pack['batch'] is True and pack['episode'] is None
+
+
+def test_parse_dash_episode_range():
+    for title, season, episodes in (("[Group] My Show - 01-12 [1080p]", 1, (1, 12)),
+                                    ("My Show - 01 ~ 12", 1, (1, 12)),
+                                    ("[Grp] My Show 2nd Season - 13-24 VOSTFR", 2, (13, 24)),
+                                    ("[Grp] My Show S02 - 01-12", 2, (1, 12))):
+        p = parse_release_title(title)
+        assert p['batch'] is True, title
+        assert (p['season'], p['episode'], p['episode_end']) == (season, *episodes), title
+    assert parse_release_title("[Group] My Show - 01-12 [1080p]")['title'] == "My Show"
+
+
+def test_dash_numbers_that_are_not_ranges():
+    for title in ("[Grp] My Show - 05 [1080p]", "My Show - 05 - 720p", "My Show - 12-01", "My Show - 2024-01-12"):
+        p = parse_release_title(title)
+        assert p is None or p['batch'] is False, title
+    assert parse_release_title("My Show S01E05 - 10bit 1080p")['batch'] is False
@@ -0,0 +1,39 @@
+import pytest
+
+from utils.pathing import compile_path_template, render_path_template, safe_name
+
+
+MAPPING = {
+    'save_root': '/data/anime',
+    'series': 'Re:Zero  kara Hajimeru',
+    'season': '',
+    'season2': '',
+    'episode': '3',
+    'episode2': '03',
+    'quality': '1080p',
+    'group': 'Tsundere-Raws',
+    'source': '',
+}
+
+
+def test_render_default_template_drops_empty_segments():
+    assert render_path_template("{save_root}/{series}/Season {season2}", MAPPING) == "/data/anime/Re_Zero kara Hajimeru"
+    assert render_path_template("{save_root}/{series}/Season {season2}", dict(MAPPING, season2="02")) == "/data/anime/Re_Zero kara Hajimeru/Season 02"
+
+
+def test_render_sanitizes_fields_but_not_save_root():
+    tmpl = compile_path_template("{save_root}/{group}: {quality}/E{episode2}")
+    assert tmpl.render(dict(MAPPING, save_root="/mnt/a b/")) == "/mnt/a b/Tsundere-Raws_ 1080p/E03"
+
+
+def test_compiled_template_is_cached_and_validated():
+    assert compile_path_template("{save_root}/{series}") is compile_path_template("{save_root}/{series}")
+    with pytest.raises(ValueError):
+        compile_path_template("{save_root}/{serie}").validate()
+    with pytest.raises(ValueError):
+        compile_path_template("{save_root}/{series")
+
+
+def test_safe_name():
+    assert safe_name('A/B:C*D?"E"<F>|G') == "A_B_C_D__E__F__G"
+    assert safe_name(None) == ""
@@ -0,0 +1,66 @@
+from modules.cache import Cache
+from modules.episode_priority import air_timestamp
+from modules.nyaa_search import NyaaSearcher
+from modules.prefetch import Prefetcher
+from modules.search_providers import RssProvider
+from modules.shoko_client import MissingEpisode
+
+NOW = air_timestamp("2025-06-30T12:00:00")
+
+
+def rss(*titles):
+    items = "".join(f"<item><title>{t}</title><link>magnet:?xt=urn:btih:{'a' * 40}</link></item>" for t in titles)
+    return f"<?xml version='1.0'?><rss version='2.0'><channel><title>f</title>{items}</channel></rss>"
+
+
+class ScriptedFeed(RssProvider):
+    """RSS provider answering from a {query: rss text} script instead of the network."""
+
+    def __init__(self, cache, script):
+        super().__init__("scripted", ["https://feed.test/?q={query}"], cache=cache, timeout=None)
+        self.script = script
+        self.downloads = 0
+
+    async def _download(self, url):
+        self.downloads += 1
+        query = url.split("q=", 1)[1].replace("+", " ")
+        return self.script.get(query, rss())
+
+
+class Names:
+    def get_series_name(self, series_id):
+        return {1: "Airing Show", 2: "Old Show"}[series_id]
+
+
+def test_targets_are_next_episodes_of_airing_series():
+    prefetcher = Prefetcher(None, None, None, recent_days=14, clock=lambda: NOW)
+    episodes = [
+        MissingEpisode(1, 1, 3, "2025-06-20"),
+        MissingEpisode(2, 1, 4, "2025-06-27"),
+        MissingEpisode(3, 2, 5, "2024-01-01"),   # long aired: not airing
+        MissingEpisode(4, 3, 1, None),           # undated
+    ]
+    assert prefetcher.targets(episodes) == [(1, 5)]
+
+
+def test_prefetch_keeps_only_pages_with_the_next_episode_and_reports_hits(tmp_path):
+    cache = Cache(tmp_path / "c.db")
+    cache.start_cycle([MissingEpisode(1, 1, 4, "2025-06-27").to_row(), MissingEpisode(2, 2, 9, "2025-06-28").to_row()])
+    provider = ScriptedFeed(cache, {
+        "Airing Show S01E05": rss("[G] Airing Show S01E05 VOSTFR 1080p WEB"),
+        "Old Show S01E10": rss("[G] Old Show S01E09 VOSTFR 1080p WEB"),
+    })
+    searcher = NyaaSearcher(users=[], rss_urls=[], preferred={"language": "VOSTFR"}, rate_limit_seconds=0,
+                            cache=cache, providers=[provider])
+    prefetcher = Prefetcher(searcher, Names(), cache, recent_days=14, clock=lambda: NOW)
+    assert prefetcher.run() == 1
+    assert provider.downloads == 2
+    # Already warmed: nothing is sent again within the window or the next one
+    prefetcher.reset()
+    assert prefetcher.run() == 0 and provider.downloads == 3
+
+    results = searcher.search_tsundere(["Airing Show S01E05"])
+    assert [r.title for r in results] == ["[G] Airing Show S01E05 VOSTFR 1080p WEB"]
+    searcher.search_tsundere(["Old Show S01E10"])
+    assert provider.downloads == 4
+    assert cache.take_prefetch_stats() == (1, 1)
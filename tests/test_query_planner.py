@@ -0,0 +1,33 @@
+from modules.cache import Cache
+from modules.parser import build_query_variants
+from modules.query_planner import QueryPlanner
+
+
+def test_query_variants_have_stable_names():
+    variants = build_query_variants("My Show", 2, 5)
+    assert variants[0] == ("sxxeyy", "My Show S02E05")
+    assert ("e", "My Show E05") in variants
+
+
+def test_planner_promotes_hit_and_drops_dead_variants(tmp_path):
+    cache = Cache(tmp_path / "cache.db")
+    planner = QueryPlanner(cache, drop_after_misses=2)
+    variants = build_query_variants("My Show", 1, 3)
+    queries = [q for _, q in variants]
+    e_query = dict(variants)["e"]
+
+    # Untrained: original order
+    assert planner.plan(42, variants) == variants
+
+    for _ in range(2):
+        tried = queries[:queries.index(e_query) + 1]
+        planner.record(42, variants, tried, e_query, "https://nyaa.si/?page=rss&u=Arcedo")
+
+    plan = planner.plan(42, variants)
+    assert plan[0] == ("e", e_query)
+    # sxxeyy and sxxeyy_vostfr missed twice without a hit
+    assert "sxxeyy" not in dict(plan)
+    assert "sxxeyy_vostfr" not in dict(plan)
+    assert planner.preferred_feed(42, ["https://nyaa.si/?page=rss&u=Arcedo"]) == "https://nyaa.si/?page=rss&u=Arcedo"
+    # Other series are unaffected
+    assert planner.plan(7, variants) == variants
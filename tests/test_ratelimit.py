@@ -0,0 +1,64 @@
+import asyncio
+
+from utils.ratelimit import RateLimiter, TokenBucket, host_of
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_burst_then_spaces_requests():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Next callers queue behind each other at 1/rate intervals
+    assert bucket.reserve() == 0.5
+    assert bucket.reserve() == 1.0
+
+
+def test_bucket_refills_over_time():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, burst=2, clock=clock)
+    bucket.reserve()
+    bucket.reserve()
+    clock.now = 10
+    # Refill is capped at burst
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 1.0
+
+
+def test_limiter_is_per_host_and_async_safe():
+    limiter = RateLimiter()
+    limiter.configure("https://nyaa.si/?page=rss&u=A", rate=1000, burst=1)
+    assert host_of("https://nyaa.si/?page=rss&u=B") == "nyaa.si"
+    assert limiter.bucket("https://nyaa.si/?page=rss&u=B") is limiter.bucket("nyaa.si")
+    assert limiter.bucket("https://discord.com/api/webhooks/x") is None
+    assert limiter.acquire("https://discord.com/api/webhooks/x") == 0.0
+
+    async def burst():
+        return await asyncio.gather(*(limiter.acquire_async("nyaa.si") for _ in range(3)))
+
+    waits = asyncio.run(burst())
+    assert waits[0] == 0.0
+    assert waits[-1] > 0
+
+
+def test_cancelled_waiter_gives_its_token_back():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, burst=1, clock=clock)
+    bucket.reserve()
+
+    async def cancel_waiter():
+        waiter = asyncio.ensure_future(bucket.acquire_async())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+    asyncio.run(cancel_waiter())
+    # Only the first reservation is still owed
+    assert bucket.reserve() == 1.0
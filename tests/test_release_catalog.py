@@ -0,0 +1,92 @@
+from modules.cache import Cache
+from modules.nyaa_search import NyaaSearcher
+from modules.search_providers import NyaaProvider, RssProvider
+
+SHOW = 7
+
+
+def rss(*titles):
+    items = "".join(
+        f"<item><title>{t}</title><link>magnet:?xt=urn:btih:{n:040x}</link>"
+        f"<pubDate>Sun, 29 Jun 2025 1{n}:00:00 GMT</pubDate></item>"
+        for n, t in enumerate(titles)
+    )
+    return f"<?xml version='1.0'?><rss version='2.0'><channel><title>f</title>{items}</channel></rss>"
+
+
+class ScriptedFeed(RssProvider):
+    """RSS provider answering from a {query: rss text} script instead of the network."""
+
+    def __init__(self, script):
+        super().__init__("scripted", ["https://feed.test/?q={query}"], timeout=None)
+        self.script = script
+        self.downloads = 0
+
+    async def _download(self, url):
+        self.downloads += 1
+        query = url.split("q=", 1)[1].replace("+", " ")
+        if query not in self.script:
+            raise ConnectionError("feed down")
+        return self.script[query]
+
+
+def searcher_for(cache, provider):
+    searcher = NyaaSearcher(users=[], rss_urls=[], preferred={"language": "VOSTFR"}, rate_limit_seconds=0,
+                            cache=cache, providers=[provider])
+    searcher.set_catalog(fresh_seconds=3600)
+    return searcher
+
+
+def test_listed_series_is_searched_in_the_catalog(tmp_path):
+    cache = Cache(tmp_path / "c.db")
+    provider = ScriptedFeed({"Frieren S01": rss(
+        "[G] Frieren S01E04 VOSTFR 1080p WEB",
+        "[G] Frieren S01E05 VF 1080p WEB",
+        "[G] Frieren S01E05 VOSTFR 1080p WEB",
+        "[G] Frieren S01E06-E08 VOSTFR 1080p WEB",
+    )})
+    searcher = searcher_for(cache, provider)
+    assert not searcher.catalog_answers(SHOW)
+    # Page 2 repeats page 1: the listing was read to its end
+    assert len(searcher.search_series("Frieren S01", max_pages=2, series_id=SHOW)) == 3
+    assert provider.downloads == 2 and searcher.catalog_answers(SHOW)
+
+    found = searcher.search_tsundere(["Frieren S01E05", "Frieren E05"], series_id=SHOW)
+    assert [r.title for r in found] == ["[G] Frieren S01E05 VOSTFR 1080p WEB"]
+    # Batch ranges are found through the episode index, season-less queries match any season
+    found = searcher.search_tsundere(["Frieren E07"], series_id=SHOW)
+    assert [r.title for r in found] == ["[G] Frieren S01E06-E08 VOSTFR 1080p WEB"]
+    assert searcher.search_tsundere(["Frieren S01E09"], series_id=SHOW) == []
+    # The series query itself goes through the full-text index
+    assert len(searcher.search_series("Frieren S01", series_id=SHOW)) == 3
+    assert provider.downloads == 2 and searcher.stats["catalog"] == 4
+    # Without a series the feeds are searched as before
+    searcher.search_tsundere(["Frieren S01"])
+    assert provider.downloads == 3
+
+
+def test_failed_or_truncated_listings_leave_the_catalog_stale(tmp_path):
+    cache = Cache(tmp_path / "c.db")
+    searcher = searcher_for(cache, ScriptedFeed({"Frieren S01": rss("[G] Frieren S01E04 VOSTFR 1080p WEB")}))
+    searcher.search_series("Frieren S01", max_pages=1, series_id=SHOW)
+    assert not searcher.catalog_answers(SHOW)
+    searcher.search_series("Other S01", max_pages=2, series_id=8)
+    assert not searcher.catalog_answers(8)
+
+
+def test_retention_bounds_the_catalog_and_forgets_listings(tmp_path):
+    cache = Cache(tmp_path / "c.db")
+    searcher = searcher_for(cache, ScriptedFeed({"Frieren S01": rss(
+        "[G] Frieren S01E04 VOSTFR 1080p WEB", "[G] Frieren S01E05 VOSTFR 1080p WEB")}))
+    searcher.search_series("Frieren S01", max_pages=2, series_id=SHOW)
+    assert len(cache.catalog_match(["frieren"])) == 2
+    assert cache.prune_catalog(max_rows=1) == 1
+    assert len(cache.catalog_match(["frieren"])) == 1
+    assert not searcher.catalog_answers(SHOW)
+
+
+def test_nyaa_feed_entries_carry_pub_date_and_uploader():
+    provider = NyaaProvider.from_users(["Tsundere-Raws"])
+    entry = provider.parse(rss("[G] Frieren S01E04 VOSTFR 1080p WEB"))[0]
+    assert entry.published == 1751191200  # 2025-06-29 10:00 UTC
+    assert provider.uploader(provider.feeds[0]) == "Tsundere-Raws"
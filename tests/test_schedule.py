@@ -0,0 +1,122 @@
+import time
+
+import logging
+
+from main import apply_app_config, next_period_start, reload_config, run_cycle
+from modules.cache import Cache
+from modules.cycle_config import CycleConfig
+from modules.nyaa_search import NyaaSearcher
+from utils.config import AppConfig
+
+
+def test_failed_cycle_waits_a_full_period_from_the_attempt(tmp_path):
+    cache = Cache(tmp_path / "c.db")
+    attempt = time.time()
+    assert next_period_start(cache, attempt) == attempt
+    # A cycle recorded long ago, then an attempt failing before it records a new one
+    cache.start_cycle([])
+    cache.finish_cycle()
+    old = cache.get_cycle()[0]
+    assert next_period_start(cache, old + 7 * 86400) == old + 7 * 86400
+    # A cycle recorded by this attempt: its start keeps the cadence
+    started = cache.start_cycle([])
+    assert next_period_start(cache, started - 0.5) == started
+
+
+class StubWatcher:
+    def __init__(self, path, result):
+        self.path = path
+        self.result = result
+
+    def poll(self):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class StubShoko:
+    base_url = "http://shoko.test"
+
+
+def test_bad_reload_keeps_and_reapplies_the_current_config(tmp_path):
+    path = tmp_path / "config.yaml"
+    nyaa = NyaaSearcher(users=[], rss_urls=[], preferred={}, rate_limit_seconds=0, providers=[])
+    current = AppConfig.from_mapping(path, {"search": {"nyaa": {"preferred": {"language": "VOSTFR"}}}})
+    cycle = apply_app_config(current, nyaa, StubShoko(), None)
+    logger = logging.getLogger("test")
+    # Fails after the new preferences were pushed into the searcher
+    broken = AppConfig.from_mapping(path, {"search": {"nyaa": {"preferred": {"language": "VF"}}},
+                                           "circuit_breaker": {"window": [20]}})
+    for result in (broken, OSError("file is being rewritten")):
+        assert reload_config(StubWatcher(path, result), current, cycle, nyaa, StubShoko(), None, logger) == (current, cycle, False)
+        assert nyaa.preferred == {"language": "VOSTFR"}
+    good = AppConfig.from_mapping(path, {"search": {"nyaa": {"preferred": {"language": "VF"}}}})
+    app_cfg, _, reloaded = reload_config(StubWatcher(path, good), current, cycle, nyaa, StubShoko(), None, logger)
+    assert reloaded and app_cfg is good and nyaa.preferred == {"language": "VF"}
+
+
+class StubQbit:
+    dry_run = True
+
+    def ensure_connected(self):
+        pass
+
+
+class CountingShoko:
+    """Shoko with no missing episodes, counting refreshes and fetches."""
+
+    def __init__(self):
+        self.stats = {"coalesced": 0}
+        self.refreshes = 0
+        self.fetches = 0
+
+    def update_series_stats(self):
+        self.refreshes += 1
+
+    def iter_missing_episodes(self, **kwargs):
+        self.fetches += 1
+        return iter(())
+
+    def reset_stats(self):
+        pass
+
+
+def cycle_run(tmp_path, cache, shoko, attempt_ts):
+    cfg = CycleConfig.compile(AppConfig.from_mapping(tmp_path / "config.yaml", {
+        "general": {"shoko_update_wait_seconds": 0}}))
+    nyaa = NyaaSearcher(users=[], rss_urls=[], preferred={}, rate_limit_seconds=0, providers=[])
+    run_cycle(cfg, logging.getLogger("test"), StubQbit(), shoko, nyaa, cache, None, None, attempt_ts=attempt_ts)
+
+
+def test_cycle_keeps_the_cadence_of_its_attempts(tmp_path):
+    cache = Cache(tmp_path / "c.db")
+    shoko = CountingShoko()
+    # A slow refresh and fetch do not push the recorded start (and the next period) later
+    attempt = time.time() - 3600
+    cycle_run(tmp_path, cache, shoko, attempt)
+    assert shoko.fetches == 1 and cache.get_cycle()[0] == int(attempt)
+
+    # An interrupted cycle resumes without refetching and keeps its original start
+    started = cache.start_cycle([], started_ts=attempt + 60)
+    cycle_run(tmp_path, cache, shoko, attempt + 120)
+    assert shoko.fetches == 1 and shoko.refreshes == 1
+    last = cache.get_cycle()
+    assert last[0] == started and last[1] is not None
+
+
+class StubClient:
+    dry_run = True
+
+
+def test_reload_pushes_dry_run_and_reports_restart_settings(tmp_path, caplog):
+    path = tmp_path / "config.yaml"
+    nyaa = NyaaSearcher(users=[], rss_urls=[], preferred={}, rate_limit_seconds=0, providers=[])
+    qbit, discord = StubClient(), StubClient()
+    current = AppConfig.from_mapping(path, {"general": {"dry_run": True}, "shoko": {"base_url": "http://shoko.test"}})
+    cycle = apply_app_config(current, nyaa, StubShoko(), None, qbit, discord)
+    live = AppConfig.from_mapping(path, {"general": {"dry_run": False}, "shoko": {"base_url": "http://other.test"}})
+    with caplog.at_level(logging.WARNING):
+        _, _, reloaded = reload_config(StubWatcher(path, live), current, cycle, nyaa, StubShoko(), None,
+                                       logging.getLogger("test"), qbit=qbit, discord=discord)
+    assert reloaded and not qbit.dry_run and not discord.dry_run
+    assert "shoko.base_url" in caplog.text and "dry_run" not in caplog.text
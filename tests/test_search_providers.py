@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+from modules.nyaa_search import NyaaSearcher
+from modules.search_providers import (LocalFeedProvider, NyaaProvider, SearchProvider, TorznabProvider,
+                                      build_providers)
+
+PREFERRED = {"language": "VOSTFR", "qualities": ["1080p", "720p"], "sources": ["CR", "ADN"]}
+
+LOCAL_RSS = """<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>Local</title>
+<item><title>[Tsundere-Raws] Kaze Densetsu S01E05 VOSTFR 1080p CR</title><link>magnet:?xt=urn:btih:aaa</link></item>
+<item><title>[Tsundere-Raws] Kaze Densetsu S01E06 VOSTFR 1080p CR</title><link>magnet:?xt=urn:btih:bbb</link></item>
+<item><title>[Tsundere-Raws] Other Show S01E05 VOSTFR 1080p CR</title><link>magnet:?xt=urn:btih:ccc</link></item>
+</channel></rss>"""
+
+TORZNAB_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:torznab="http://torznab.com/schemas/2015/feed"><channel>
+<item><title>[Arcedo] Kaze Densetsu S01E05 VOSTFR 720p ADN</title><link>http://indexer/dl/1.torrent</link>
+<enclosure url="http://indexer/dl/1.torrent" length="1" type="application/x-bittorrent"/>
+<torznab:attr name="seeders" value="12"/><torznab:attr name="magneturl" value="magnet:?xt=urn:btih:ddd"/></item>
+<item><title>[Arcedo] Kaze Densetsu S01E05 VOSTFR 1080p WEB</title><link>http://indexer/dl/2.torrent</link></item>
+</channel></rss>"""
+
+
+class SlowProvider(SearchProvider):
+    kind = "slow"
+
+    async def fetch(self, feed, query, page=1):
+        await self._bounded(asyncio.sleep(5))
+        return []
+
+
+def test_local_provider_matches_all_query_tokens(tmp_path):
+    path = tmp_path / "feed.xml"
+    path.write_text(LOCAL_RSS, encoding="utf-8")
+    provider = LocalFeedProvider("archive", str(path))
+    titles = [e.title for e in asyncio.run(provider.fetch("archive", "Kaze Densetsu S01E05"))]
+    assert titles == ["[Tsundere-Raws] Kaze Densetsu S01E05 VOSTFR 1080p CR"]
+    assert len(asyncio.run(provider.fetch("archive", "Kaze Densetsu S01"))) == 2
+    assert asyncio.run(provider.fetch("archive", "Kaze Densetsu S01", page=2)) == []
+
+
+def test_torznab_feed_id_and_parsing():
+    provider = TorznabProvider("prowlarr", "http://indexer:9696/1/", api_key="secret")
+    assert provider.feeds == ["http://indexer:9696/1/api"]
+    url = provider.url_for(provider.feeds[0], "Kaze Densetsu S01E05", 2)
+    assert "secret" not in url and "offset=100" in url and "cat=5070" in url
+    entries = provider.parse(TORZNAB_XML)
+    assert [e.magnet for e in entries] == ["magnet:?xt=urn:btih:ddd", None]
+    assert entries[1].link == "http://indexer/dl/2.torrent"
+
+
+def test_slow_provider_times_out_without_dropping_others(tmp_path):
+    path = tmp_path / "feed.xml"
+    path.write_text(LOCAL_RSS, encoding="utf-8")
+    searcher = NyaaSearcher(users=[], rss_urls=[], preferred=PREFERRED, rate_limit_seconds=0, providers=[
+        SlowProvider("slow", timeout=0.1), LocalFeedProvider("archive", str(path)),
+    ])
+    start = time.perf_counter()
+    results = searcher.search_tsundere(["Kaze Densetsu S01E05"])
+    assert time.perf_counter() - start < 2
+    assert [(r.feed, r.magnet) for r in results] == [("archive", "magnet:?xt=urn:btih:aaa")]
+    assert searcher.feeds == ["slow", "archive"]
+
+
+def test_build_providers_defaults_to_nyaa():
+    providers = build_providers({"provider": "nyaa", "nyaa": {"users": ["A", "B"]}})
+    assert len(providers) == 1 and isinstance(providers[0], NyaaProvider)
+    assert providers[0].feeds == ["https://nyaa.si/?page=rss&u=A", "https://nyaa.si/?page=rss&u=B"]
+    providers = build_providers({"providers": [{"type": "torznab", "url": ""}, {"type": "local", "name": "x", "path": "/tmp"}]})
+    assert [p.kind for p in providers] == ["local"]
+
+
+def test_parse_pool_returns_the_same_entries_as_inline_parsing():
+    from utils.parse_pool import get_parse_pool
+    provider = NyaaProvider("nyaa", ["https://nyaa.si/?page=rss&u=x"])
+    inline = asyncio.run(provider.parse_async(LOCAL_RSS))
+    pool = get_parse_pool()
+    pool.configure(workers=1, min_bytes=0)
+    try:
+        pooled = asyncio.run(provider.parse_async(LOCAL_RSS))
+        assert pool._executor is not None
+    finally:
+        pool.shutdown()
+        pool.configure(workers=0)
+    assert [(e.title, e.magnet, e.parsed) for e in pooled] == [(e.title, e.magnet, e.parsed) for e in inline]
+    assert inline[0].parsed["episode"] == 5
@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fake_services import Corpus, FakeServices
+from modules.shoko_client import AsyncShokoClient, json_loader
+
+
+def test_async_shoko_client_bounds_concurrency_on_one_pool():
+    corpus = Corpus(episodes=120, series_size=12)
+    with FakeServices(corpus, latency_ms=100) as services:
+        shoko = AsyncShokoClient(services.urls()["shoko"], "key", max_concurrency=5, json_decoder="json")
+
+        async def run():
+            try:
+                return await asyncio.gather(*(shoko.get_series_name(sid) for sid in corpus.series))
+            finally:
+                await shoko.aclose()
+
+        names = asyncio.run(run())
+        assert names == [s["Name"] for s in corpus.series.values()]
+        assert services.request_counts()["shoko"] == 10
+        # 10 slow requests: several in flight at once, never more than max_concurrency, over one pool
+        assert 2 <= services.shoko.peak_active <= 5
+        assert services.connection_counts()["shoko"] <= 5
+
+
+def test_unknown_json_decoder_is_rejected():
+    with pytest.raises(ValueError):
+        json_loader("simdjson")
@@ -0,0 +1,22 @@
+import pytest
+
+from benchmarks.fake_services import Corpus, FakeServices
+from modules.shoko_client import MissingEpisode, ShokoClient
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_missing_episodes_stream_as_slim_records(incremental):
+    if incremental:
+        pytest.importorskip("ijson")
+    corpus = Corpus(episodes=30, series_size=12)
+    with FakeServices(corpus) as services:
+        shoko = ShokoClient(services.urls()["shoko"], "key")
+        records = list(shoko.iter_missing_episodes(page_size=8, include_data_from=["AniDB"], incremental=incremental))
+        assert services.request_counts()["shoko"] == 4
+    assert len(records) == 30
+    first = records[0]
+    assert (first.episode_id, first.series_id, first.episode_number, first.air_date) == (100000, 1, 1, "2024-01-01")
+    assert not hasattr(first, "__dict__")
+    # Checkpoint rows round-trip, and full Shoko entries from older checkpoints still load
+    assert MissingEpisode.from_row(first.to_row()) == first
+    assert MissingEpisode.from_row(corpus.episodes[0]) == first
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from benchmarks.fake_services import Corpus, FakeServices
+from modules.nyaa_search import NyaaSearcher
+from modules.search_providers import FeedEntry, SearchProvider
+from modules.shoko_client import ShokoClient
+from utils.singleflight import SingleFlight
+
+
+class CountingProvider(SearchProvider):
+    def __init__(self):
+        super().__init__("p", timeout=None)
+        self.calls = 0
+
+    async def fetch(self, feed, query, page=1):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return [FeedEntry("Show S01E01 VOSTFR 1080p WEB", "magnet:?x")]
+
+
+def test_concurrent_identical_searches_share_one_fetch():
+    provider = CountingProvider()
+    searcher = NyaaSearcher(users=[], rss_urls=[], preferred={"language": "VOSTFR"}, rate_limit_seconds=0,
+                            providers=[provider])
+
+    async def run():
+        return await asyncio.gather(*(searcher._search_query_async("q") for _ in range(5)),
+                                    searcher._search_query_async("other"))
+
+    results = asyncio.run(run())
+    assert all(len(r) == 1 for r in results)
+    assert provider.calls == 2 and searcher.stats["coalesced"] == 4
+
+
+def test_waiters_share_the_leader_failure():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("down")
+
+    def call():
+        try:
+            flight.do("k", failing)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=call) for _ in range(3)]
+    for t in followers:
+        t.start()
+    while flight.stats["coalesced"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for t in [leader, *followers]:
+        t.join(5)
+    assert len(errors) == 4 and flight.stats["coalesced"] == 3
+    with pytest.raises(KeyError):
+        flight.do("k", lambda: {}["missing"])
+
+
+def test_shoko_series_lookups_coalesce_across_threads():
+    corpus = Corpus(episodes=24, series_size=12)
+    with FakeServices(corpus, latency_ms=100) as services:
+        shoko = ShokoClient(services.urls()["shoko"], "key")
+        names = []
+        threads = [threading.Thread(target=lambda: names.append(shoko.get_series_name(1))) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert names == [corpus.series[1]["Name"]] * 6
+        assert services.request_counts()["shoko"] == 1
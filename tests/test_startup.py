@@ -0,0 +1,5 @@
+from benchmarks.startup_importtime import loaded_modules
+
+
+def test_heavy_dependencies_are_imported_lazily():
+    assert loaded_modules("main") == []
@@ -0,0 +1,50 @@
+from modules.cache import Cache
+from modules.shoko_client import MissingEpisode
+from modules.work_leases import SeriesLeases
+
+
+def test_workers_claim_disjoint_series(tmp_path):
+    db = tmp_path / "shared.db"
+    a = SeriesLeases(Cache(db, worker_id="a"), shard_index=0, shard_count=2, lease_seconds=60)
+    b = SeriesLeases(Cache(db, worker_id="b"), shard_index=1, shard_count=2, lease_seconds=60)
+
+    episodes = [MissingEpisode(i, s, 1) for i, s in enumerate([1, 2, 3, 4])]
+    assert [ep.series_id for ep in a.order(episodes)] == [2, 4, 1, 3]
+
+    assert a.claim(2) and b.claim(1)
+    # Held by the other worker: refused, and repeated claims stay refused
+    assert not b.claim(2)
+    assert not a.claim(1)
+    assert a.claim(2)
+    assert b.refused == 1
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    db = tmp_path / "shared.db"
+    now = [1_750_000_000.0]
+    a = SeriesLeases(Cache(db, worker_id="a"), lease_seconds=60, clock=lambda: now[0])
+    b = SeriesLeases(Cache(db, worker_id="b"), lease_seconds=60, clock=lambda: now[0])
+    assert a.claim(7)
+    now[0] += 59
+    assert not b.claim(7)
+    now[0] += 2
+    assert b.claim(7)
+
+
+def test_no_steal_keeps_to_own_shard(tmp_path):
+    leases = SeriesLeases(Cache(tmp_path / "c.db", worker_id="a"), shard_index=0, shard_count=2, steal=False)
+    assert leases.claim(2)
+    assert not leases.claim(3)
+
+
+def test_finished_cycle_releases_series_leases(tmp_path):
+    db = tmp_path / "shared.db"
+    cache_a = Cache(db, worker_id="a")
+    a = SeriesLeases(cache_a, lease_seconds=60)
+    b = SeriesLeases(Cache(db, worker_id="b"), lease_seconds=60)
+    assert a.claim(7) and a.claim_global("update_series_stats")
+    assert not b.claim(7)
+    cache_a.finish_cycle()
+    assert b.claim(7)
+    # The global task stays with its holder until the lease expires
+    assert not b.claim_global("update_series_stats")
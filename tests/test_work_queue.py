@@ -0,0 +1,44 @@
+import sqlite3
+
+from modules.cache import STAGE_SEARCHED, STAGE_SELECTED, Cache
+from modules.episode_priority import EpisodePrioritizer
+from modules.shoko_client import MissingEpisode
+from modules.work_queue import WorkQueue
+
+
+def episodes(n, series_size=10):
+    # All aired long ago: same tier, ordered by air date (newest first) until aging kicks in
+    return [MissingEpisode(i, i // series_size + 1, i % series_size + 1, f"2020-01-{i % 28 + 1:02d}") for i in range(n)]
+
+
+def test_queue_tracks_attempts_and_drops_resolved(tmp_path):
+    cache = Cache(tmp_path / "c.db")
+    state = cache.sync_episode_queue([(1, 10), (2, 10), (3, 11)])
+    assert sorted(state) == [1, 2, 3] and state[1][1:] == (0, 0)
+    cache.checkpoint_episode(1, STAGE_SEARCHED)
+    cache.checkpoint_episode(2, STAGE_SELECTED, {"title": "x"})
+    state = cache.sync_episode_queue([(1, 10), (2, 10), (4, 12)])
+    assert sorted(state) == [1, 2, 4]
+    assert state[1][1:] == (1, 1) and state[2][1:] == (1, 0)
+
+
+def test_aging_brings_skipped_episodes_forward(tmp_path):
+    cache = Cache(tmp_path / "c.db")
+    queue = WorkQueue(cache, EpisodePrioritizer(min_age_hours=0, recent_days=1, stale_days=0), aging_hours=24)
+    eps = episodes(20)
+    first, _, _ = queue.schedule(eps)
+    # The backlog has been known for a day; a cycle budget of 5 only searched the first five
+    with sqlite3.connect(cache.db_path) as conn:
+        conn.execute("UPDATE episode_queue SET first_seen_ts = first_seen_ts - 25 * 3600")
+    for ep in first[:5]:
+        cache.checkpoint_episode(ep.episode_id, STAGE_SEARCHED)
+    second, _, _ = queue.schedule(eps)
+    assert {ep.episode_id for ep in second[:5]}.isdisjoint(ep.episode_id for ep in first[:5])
+
+
+def test_per_series_cap_interleaves_series(tmp_path):
+    cache = Cache(tmp_path / "c.db")
+    eps = [MissingEpisode(i, 1, i, None) for i in range(1, 9)] + [MissingEpisode(100, 2, 1, None)]
+    ordered, _, _ = WorkQueue(cache, None, max_per_series=3).schedule(eps)
+    assert [ep.episode_id for ep in ordered[:4]] == [1, 2, 3, 100]
+    assert len(ordered) == 9
@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from utils.ratelimit import host_of
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    The upstream host's circuit is open: the request was not sent. Deliberately
+    not an httpx error, so http_retry does not retry it.
+    """
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit open for {host}, retrying in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Breaker for one upstream host. Closed: requests flow and the last `window`
+    outcomes are kept; once at least `min_requests` of them are known and the
+    failure share reaches `failure_rate`, the circuit opens. Open: requests fail
+    fast for the cool-down, which doubles on each consecutive trip up to
+    `max_cooldown`. Half-open: one probe request goes through; success closes the
+    circuit, failure opens it again.
+    """
+
+    def __init__(self, host: str, window: int = 20, min_requests: int = 5, failure_rate: float = 0.5,
+                 cooldown: float = 60.0, max_cooldown: float = 600.0, clock: Callable[[], float] = time.monotonic):
+        self.host = host
+        self._clock = clock
+        self.state = CLOSED
+        self._outcomes: deque = deque()
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.cooldown: Optional[float] = None
+        self._current_cooldown = 0.0
+        self.update(window, min_requests, failure_rate, cooldown, max_cooldown)
+        # Metrics since startup, reported in the cycle summary
+        self.trips = 0
+        self.rejected = 0
+        self.logger = logging.getLogger(__name__)
+
+    def update(self, window: int = 20, min_requests: int = 5, failure_rate: float = 0.5,
+               cooldown: float = 60.0, max_cooldown: float = 600.0):
+        """Apply (possibly reloaded) thresholds; the current state and recent outcomes are kept."""
+        self.window = max(1, int(window))
+        self.min_requests = max(1, int(min_requests))
+        self.failure_rate = float(failure_rate)
+        # The backoff built up by consecutive trips survives a reload unless the base cool-down changed
+        if float(cooldown) != self.cooldown:
+            self._current_cooldown = float(cooldown)
+        self.cooldown = float(cooldown)
+        self.max_cooldown = max(float(max_cooldown), self.cooldown)
+        self._current_cooldown = min(self._current_cooldown, self.max_cooldown)
+        self._outcomes = deque(self._outcomes, maxlen=self.window)
+
+    def retry_in(self) -> float:
+        """Seconds left before an open circuit lets a probe through (0 unless open)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self._current_cooldown - self._clock())
+
+    def allow(self) -> bool:
+        """Take permission to send one request; False means fail fast."""
+        with self._lock:
+            if self.state == OPEN and self.retry_in() <= 0:
+                self.state = HALF_OPEN
+                self._log("log.circuit_half_open", self.host)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok: Optional[bool]):
+        """Outcome of an allowed request; None (e.g. cancelled) gives no verdict."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probing:
+                self._probing = False
+                if ok:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    self._current_cooldown = self.cooldown
+                    self._log("log.circuit_closed", self.host)
+                elif ok is False:
+                    self._current_cooldown = min(self._current_cooldown * 2, self.max_cooldown)
+                    self._trip()
+                return
+            if ok is None or self.state != CLOSED:
+                return
+            self._outcomes.append(bool(ok))
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_requests and failures >= self.failure_rate * len(self._outcomes):
+                self._trip()
+
+    def _trip(self):
+        failures, total = self._outcomes.count(False), len(self._outcomes)
+        self.state = OPEN
+        self._opened_at = self._clock()
+        self.trips += 1
+        self._outcomes.clear()
+        self._log("log.circuit_opened", self.host, failures, total, self._current_cooldown, level=logging.WARNING)
+
+    def _log(self, key: str, *args, level: int = logging.INFO):
+        from utils.i18n import lazy_t
+        self.logger.log(level, lazy_t(key), *args)
+
+
+class CircuitBreakers:
+    """Per-host breakers shared by every HTTP client (through utils.http_replay.http_transport)."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.enabled = True
+        self.settings: Dict[str, float] = {}
+        self._clock = clock
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool = True, **settings):
+        """Thresholds for breakers created from now on and existing ones; state is kept."""
+        self.enabled = bool(enabled)
+        self.settings = settings
+        with self._lock:
+            for breaker in self._breakers.values():
+                breaker.update(**settings)
+
+    def breaker(self, url_or_host: str) -> CircuitBreaker:
+        host = host_of(url_or_host)
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(host, clock=self._clock, **self.settings)
+            return breaker
+
+    def before(self, url_or_host: str) -> CircuitBreaker:
+        """Breaker for the host, or CircuitOpenError if the request must not be sent."""
+        breaker = self.breaker(url_or_host)
+        if not breaker.allow():
+            raise CircuitOpenError(breaker.host, breaker.retry_in())
+        return breaker
+
+    def available(self, url_or_host: str) -> bool:
+        """False while the host's circuit is open and cooling down (nothing is taken)."""
+        if not self.enabled:
+            return True
+        breaker = self._breakers.get(host_of(url_or_host))
+        return breaker is None or breaker.retry_in() <= 0
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Per-host state and counters, for logs and tests."""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.host: {"state": b.state, "trips": b.trips, "rejected": b.rejected, "retry_in": round(b.retry_in(), 1)}
+                for b in breakers}
+
+
+# Process-wide breakers shared by all clients
+_breakers = CircuitBreakers()
+
+
+def get_circuit_breakers() -> CircuitBreakers:
+    return _breakers
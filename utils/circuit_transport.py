@@ -0,0 +1,67 @@
+"""
+httpx transports in front of the per-host circuit breakers (utils/circuit.py):
+a request to an open circuit fails fast with CircuitOpenError, and every
+outcome is recorded on the host's breaker. `http_transport()` in
+utils/http_replay.py wraps each client's transport with them.
+
+Only import this module where httpx is already being imported.
+"""
+from typing import Optional
+
+import httpx
+
+
+def _succeeded(response: httpx.Response) -> bool:
+    # A 4xx still proves the host is up; overload (429) and server errors count against it
+    return response.status_code < 500 and response.status_code != 429
+
+
+class CircuitTransport(httpx.BaseTransport):
+    """Fails fast with CircuitOpenError while the host's circuit is open; feeds outcomes to its breaker."""
+
+    def __init__(self, breakers, inner: Optional[httpx.BaseTransport] = None):
+        self.breakers = breakers
+        self.inner = inner or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.breakers.enabled:
+            return self.inner.handle_request(request)
+        breaker = self.breakers.before(request.url.host)
+        ok = None
+        try:
+            response = self.inner.handle_request(request)
+            ok = _succeeded(response)
+            return response
+        except httpx.TransportError:
+            ok = False
+            raise
+        finally:
+            breaker.record(ok)
+
+    def close(self):
+        self.inner.close()
+
+
+class AsyncCircuitTransport(httpx.AsyncBaseTransport):
+    def __init__(self, breakers, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.breakers = breakers
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.breakers.enabled:
+            return await self.inner.handle_async_request(request)
+        breaker = self.breakers.before(request.url.host)
+        ok = None
+        try:
+            response = await self.inner.handle_async_request(request)
+            ok = _succeeded(response)
+            return response
+        except httpx.TransportError:
+            ok = False
+            raise
+        finally:
+            # Cancelled requests (hedging, fan-out) give no verdict
+            breaker.record(ok)
+
+    async def aclose(self):
+        await self.inner.aclose()
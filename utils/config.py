@@ -0,0 +1,141 @@
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, Optional
+
+import yaml
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+
+def expand_env_vars(obj):
+    if isinstance(obj, dict):
+        return {k: expand_env_vars(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [expand_env_vars(v) for v in obj]
+    if isinstance(obj, str) and obj.startswith("${") and obj.endswith("}"):
+        return os.environ.get(obj[2:-1], "")
+    return obj
+
+
+def freeze(obj):
+    """Recursively turn dicts into read-only mappings and lists into tuples."""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+
+def to_bool(value, default=False) -> bool:
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return default
+    if isinstance(value, str):
+        s = value.strip().lower()
+        if s == "":
+            return default
+        if s in ("1", "true", "yes", "on"):  # common truthy
+            return True
+        if s in ("0", "false", "no", "off"):  # common falsy
+            return False
+    return bool(value)
+
+
+def to_int(value, default: int) -> int:
+    try:
+        return int(str(value).strip()) if value is not None and str(value).strip() != "" else default
+    except Exception:
+        return default
+
+
+def load_config(path: Path) -> dict:
+    with Path(path).open("r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    return expand_env_vars(cfg)
+
+
+@dataclass(frozen=True)
+class AppConfig:
+    """
+    Configuration loaded once at startup: the env-expanded YAML as a read-only
+    mapping plus the typed general settings the entry point needs.
+    CLI overrides are applied with dataclasses.replace().
+    """
+    path: Path
+    raw: Mapping[str, Any]
+    language: str
+    log_level: int
+    log_format: str
+    dry_run: bool
+    max_items: int
+    early_exit: bool
+    schedule_hours: int
+    cache_path: Path
+    cache_ttl_hours: int
+
+    def section(self, name: str) -> Mapping[str, Any]:
+        return self.raw.get(name) or _EMPTY
+
+    @classmethod
+    def from_mapping(cls, path: Path, data: dict) -> "AppConfig":
+        raw = freeze(data or {})
+        general = raw.get("general") or _EMPTY
+        cache = raw.get("cache") or _EMPTY
+        return cls(
+            path=Path(path),
+            raw=raw,
+            language=str(general.get("language", "fr")),
+            log_level=getattr(logging, str(general.get("log_level", "INFO")).upper(), logging.INFO),
+            # "text" or "json" (one object per line with cycle/series/episode fields)
+            log_format=str(general.get("log_format", "text") or "text").lower(),
+            # DRY-RUN: default True if unset
+            dry_run=to_bool(general.get("dry_run", None), default=True),
+            max_items=to_int(general.get("max_items", None), 10),
+            # EARLY_EXIT: default True if unset
+            early_exit=to_bool(general.get("early_exit", None), default=True),
+            # Scheduler interval in hours (default 24h if unset/empty)
+            schedule_hours=to_int(general.get("schedule_hours", None), 24),
+            cache_path=Path(cache.get("path", ".cache/shoko_auto_torrent.db")),
+            cache_ttl_hours=to_int(cache.get("ttl_hours", None), 24),
+        )
+
+
+def load_app_config(path: Path) -> AppConfig:
+    return AppConfig.from_mapping(path, load_config(path))
+
+
+class ConfigWatcher:
+    """
+    Detects config file changes by mtime. poll() returns a freshly loaded config
+    (passed through `overrides`, e.g. CLI flags) when the file changed, or None.
+    A file that fails to parse is reported once and the current config is kept.
+    """
+
+    def __init__(self, path: Path, overrides: Optional[Callable[[AppConfig], AppConfig]] = None):
+        self.path = Path(path)
+        self.overrides = overrides
+        self.logger = logging.getLogger(__name__)
+        self._mtime = self._current_mtime()
+
+    def _current_mtime(self) -> Optional[float]:
+        try:
+            return self.path.stat().st_mtime
+        except OSError:
+            return None
+
+    def poll(self) -> Optional[AppConfig]:
+        mtime = self._current_mtime()
+        if mtime is None or mtime == self._mtime:
+            return None
+        self._mtime = mtime
+        try:
+            app_cfg = load_app_config(self.path)
+        except Exception as e:
+            from utils.i18n import lazy_t
+            self.logger.error(lazy_t("log.config_reload_failed"), self.path, e)
+            return None
+        return self.overrides(app_cfg) if self.overrides else app_cfg
@@ -0,0 +1,277 @@
+"""
+Transports shared by every httpx client (see `http_transport()`): record/replay
+of external calls for offline, deterministic runs, behind the per-host circuit
+breaker transports (utils/circuit_transport.py).
+
+In record mode every httpx request made by the clients goes through a
+RecordingTransport that stores the request, the response and its duration in a
+JSON Lines archive. In replay mode a ReplayTransport serves those responses back
+without touching the network, optionally sleeping the recorded duration (scaled
+by `latency`). qBittorrent goes through qbittorrentapi/requests, so it is
+recorded at the QbitClient method level with `wrap_calls()`.
+
+Request headers and API key query parameters are never written to the archive.
+Only import this module where httpx is already being imported.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+
+from utils.ratelimit import get_rate_limiter
+
+# Response headers that no longer describe the stored (already decoded) body
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+_SECRET_PARAMS = {"apikey", "api_key"}
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayMissError(LookupError):
+    """A call was made in replay mode that the archive has no answer for."""
+
+
+def _canonical_url(url: str) -> str:
+    parts = urlsplit(str(url))
+    # API keys passed as query parameters (Torznab) stay out of the archive too
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in _SECRET_PARAMS))
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, query, ""))
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha1(data or b"").hexdigest()
+
+
+class HttpArchive:
+    """
+    JSON Lines archive of recorded exchanges. Identical requests are served back
+    in recorded order; the last answer is repeated once they run out. A request
+    whose body differs (e.g. a webhook payload with a timestamp) falls back to
+    the same method and URL.
+    """
+
+    def __init__(self, path: Path, mode: str = "replay", latency: float = 0.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown archive mode '{mode}'")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency = max(0.0, float(latency))
+        self.stats = {"recorded": 0, "replayed": 0, "missed": 0}
+        self._lock = threading.Lock()
+        self._exact: Dict[tuple, deque] = defaultdict(deque)
+        self._loose: Dict[tuple, deque] = defaultdict(deque)
+        self._last: Dict[tuple, dict] = {}
+        if mode == "record":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text("", encoding="utf-8")
+        else:
+            self._load()
+
+    def _load(self):
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._exact[tuple(entry["key"])].append(entry)
+                self._loose[tuple(entry["key"][:3])].append(entry)
+
+    def append(self, entry: dict):
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.stats["recorded"] += 1
+
+    def take(self, key: tuple) -> dict:
+        """Pop the next recorded answer for `key` (kind, target, method/url, body digest)."""
+        with self._lock:
+            for index, lookup in ((self._exact, key), (self._loose, key[:3])):
+                queue = index.get(lookup)
+                if queue:
+                    entry = queue.popleft()
+                    # Served once: drop it from the other index as well
+                    other, other_key = (self._loose, key[:3]) if index is self._exact else (self._exact, tuple(entry["key"]))
+                    self._discard(other.get(other_key), entry)
+                    self._last[lookup] = entry
+                    self.stats["replayed"] += 1
+                    return entry
+            for lookup in (key, key[:3]):
+                if lookup in self._last:
+                    self.stats["replayed"] += 1
+                    return self._last[lookup]
+            self.stats["missed"] += 1
+        raise ReplayMissError(f"No recorded answer for {' '.join(str(k) for k in key[:3])}")
+
+    @staticmethod
+    def _discard(queue: Optional[deque], entry: dict):
+        for i, queued in enumerate(queue or ()):
+            if queued is entry:
+                del queue[i]
+                return
+
+    def delay(self, entry: dict) -> float:
+        return entry.get("elapsed", 0.0) * self.latency
+
+    def wrap_calls(self, obj, target: str, methods: Iterable[str]):
+        """Record or replay `methods` of `obj` (return value, raised error and duration)."""
+        for name in methods:
+            setattr(obj, name, self._wrap_call(getattr(obj, name), target, name))
+        return obj
+
+    def _wrap_call(self, fn, target: str, name: str):
+        def wrapper(*args, **kwargs):
+            body = json.dumps([args, kwargs], sort_keys=True, default=str).encode("utf-8")
+            key = ("call", target, name, _digest(body))
+            if self.mode == "replay":
+                entry = self.take(key)
+                if self.latency:
+                    time.sleep(self.delay(entry))
+                if entry.get("error"):
+                    raise RuntimeError(entry["error"])
+                return entry.get("result")
+            start = time.perf_counter()
+            error = None
+            try:
+                result = fn(*args, **kwargs)
+                return result
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                result = None
+                raise
+            finally:
+                self.append({
+                    "key": list(key),
+                    "elapsed": time.perf_counter() - start,
+                    "result": result if isinstance(result, (str, int, float, bool, type(None), list, dict)) else None,
+                    "error": error,
+                })
+        return wrapper
+
+
+def _request_key(request: httpx.Request) -> tuple:
+    return ("http", request.method, _canonical_url(request.url), _digest(request.content))
+
+
+def _entry_for(request: httpx.Request, response: httpx.Response, elapsed: float) -> dict:
+    return {
+        "key": list(_request_key(request)),
+        "elapsed": elapsed,
+        "status": response.status_code,
+        "headers": [(k, v) for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS],
+        "content": base64.b64encode(response.content).decode("ascii"),
+    }
+
+
+def _response_for(request: httpx.Request, entry: dict) -> httpx.Response:
+    return httpx.Response(
+        entry["status"],
+        headers=entry.get("headers") or [],
+        content=base64.b64decode(entry.get("content") or ""),
+        request=request,
+    )
+
+
+class RecordingTransport(httpx.BaseTransport):
+    def __init__(self, archive: HttpArchive, inner: Optional[httpx.BaseTransport] = None):
+        self.archive = archive
+        self.inner = inner or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = self.inner.handle_request(request)
+        content = response.read()
+        response.close()
+        recorded = httpx.Response(response.status_code, headers=response.headers, content=content, request=request)
+        self.archive.append(_entry_for(request, recorded, time.perf_counter() - start))
+        return recorded
+
+
+class AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, archive: HttpArchive, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.archive = archive
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        recorded = httpx.Response(response.status_code, headers=response.headers, content=content, request=request)
+        self.archive.append(_entry_for(request, recorded, time.perf_counter() - start))
+        return recorded
+
+
+class ReplayTransport(httpx.BaseTransport):
+    def __init__(self, archive: HttpArchive):
+        self.archive = archive
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self.archive.take(_request_key(request))
+        if self.archive.latency:
+            time.sleep(self.archive.delay(entry))
+        return _response_for(request, entry)
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, archive: HttpArchive):
+        self.archive = archive
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self.archive.take(_request_key(request))
+        if self.archive.latency:
+            await asyncio.sleep(self.archive.delay(entry))
+        return _response_for(request, entry)
+
+
+# Process-wide archive; None means clients talk to the network directly
+_archive: Optional[HttpArchive] = None
+
+
+def install_archive(path: Path, mode: str, latency: float = 0.0) -> HttpArchive:
+    global _archive
+    _archive = HttpArchive(path, mode=mode, latency=latency)
+    # Replayed answers cost nothing upstream: only the recorded latency paces them
+    get_rate_limiter().enabled = mode != "replay"
+    logger.info("HTTP %s mode: %s", mode, path)
+    return _archive
+
+
+def uninstall_archive():
+    global _archive
+    _archive = None
+    get_rate_limiter().enabled = True
+
+
+def get_archive() -> Optional[HttpArchive]:
+    return _archive
+
+
+def http_transport(asynchronous: bool = False, limits: Optional[httpx.Limits] = None):
+    """
+    Transport for a new httpx client: recording/replaying when an archive is
+    installed, behind the circuit breaker when enabled; None means httpx's default.
+    `limits` sizes the connection pool of the network transport.
+    """
+    from utils.circuit import get_circuit_breakers
+    from utils.circuit_transport import AsyncCircuitTransport, CircuitTransport
+    network = None
+    if limits is not None:
+        network = httpx.AsyncHTTPTransport(limits=limits) if asynchronous else httpx.HTTPTransport(limits=limits)
+    inner = network
+    if _archive is not None and _archive.mode == "record":
+        inner = AsyncRecordingTransport(_archive, network) if asynchronous else RecordingTransport(_archive, network)
+    elif _archive is not None:
+        inner = AsyncReplayTransport(_archive) if asynchronous else ReplayTransport(_archive)
+    breakers = get_circuit_breakers()
+    if not breakers.enabled:
+        return inner
+    return AsyncCircuitTransport(breakers, inner) if asynchronous else CircuitTransport(breakers, inner)
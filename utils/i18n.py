@@ -4,11 +4,31 @@ from functools import lru_cache
 from typing import Any, Dict
 
 
+def flatten_catalog(tree: Dict[str, Any], prefix: str = "") -> Dict[str, str]:
+    """{'log': {'x': 'msg'}} -> {'log.x': 'msg'}; non-string leaves are dropped."""
+    flat: Dict[str, str] = {}
+    for name, value in (tree or {}).items():
+        key = f"{prefix}{name}"
+        if isinstance(value, dict):
+            flat.update(flatten_catalog(value, key + "."))
+        elif isinstance(value, str):
+            flat[key] = value
+    return flat
+
+
 class I18n:
     def __init__(self, language: str = "fr", locales_dir: Path | None = None):
         self.language = (language or "fr").lower()
         self.locales_dir = locales_dir or Path(__file__).resolve().parent.parent / "locales"
-        self._messages = self._load_locale(self.language)
+        # Locale YAML is read on first lookup, not when the locale is selected
+        self._messages: Dict[str, str] | None = None
+
+    @property
+    def messages(self) -> Dict[str, str]:
+        """Flat catalog: dotted key -> message, so a lookup is a single dict access."""
+        if self._messages is None:
+            self._messages = flatten_catalog(self._load_locale(self.language))
+        return self._messages
 
     @lru_cache(maxsize=8)
     def _load_locale(self, lang: str) -> Dict[str, Any]:
@@ -24,16 +44,8 @@ class I18n:
             return yaml.safe_load(f) or {}
 
     def t(self, key: str, **kwargs) -> str:
-        text = self._messages
-        for part in key.split('.'):
-            if isinstance(text, dict) and part in text:
-                text = text[part]
-            else:
-                text = None
-                break
-        if not isinstance(text, str):
-            # Key missing -> return key itself
-            text = key
+        # Key missing -> return key itself
+        text = self.messages.get(key, key)
         if kwargs:
             try:
                 return text.format(**kwargs)
@@ -55,4 +67,26 @@ def t(key: str, **kwargs) -> str:
     global _i18n
     if _i18n is None:
         _i18n = I18n(language="fr")
-    return _i18n.t(key, **kwargs)
\ No newline at end of file
+    return _i18n.t(key, **kwargs)
+
+
+class LazyMessage:
+    """
+    A message key looked up only when converted to str. Passed as a log message,
+    the lookup happens when a record is actually emitted, not for filtered ones.
+    """
+    __slots__ = ("key",)
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def __str__(self) -> str:
+        return t(self.key)
+
+    def __repr__(self) -> str:
+        return f"LazyMessage({self.key!r})"
+
+
+def lazy_t(key: str) -> LazyMessage:
+    """Log-message form of t(): `logger.debug(lazy_t("log.key"), arg)`."""
+    return LazyMessage(key)
\ No newline at end of file
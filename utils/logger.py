@@ -1,8 +1,98 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
 
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+# Fields set with set_log_context() and written by the JSON formatter
+CONTEXT_FIELDS = ("worker", "cycle", "series", "episode")
 
-def setup_logging(level=logging.INFO):
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
-    )
+_context: ContextVar[Optional[dict]] = ContextVar("log_context", default=None)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def set_log_context(**fields):
+    """Attach fields (cycle, series, episode, ...) to records logged from this context; None removes one."""
+    ctx = dict(_context.get() or {})
+    for name, value in fields.items():
+        if value is None:
+            ctx.pop(name, None)
+        else:
+            ctx[name] = value
+    _context.set(ctx)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, context fields and exception."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for name in CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                out[name] = value
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread. The message (lazy i18n lookup and %
+    args) and the traceback text are resolved here, in the logging thread, so
+    records carry no references to mutable objects; context fields are copied
+    onto the record. Writing and JSON encoding happen in the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        for name, value in (_context.get() or {}).items():
+            setattr(record, name, value)
+        return record
+
+
+def stop_logging():
+    """Flush and stop the background listener (registered at exit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging(level=logging.INFO, fmt: str = "text"):
+    """
+    Root logging through a queue: callers only enqueue records, a listener thread
+    formats and writes them (`fmt` "text" or "json"). Safe to call again.
+    """
+    global _listener
+    stop_logging()
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if str(fmt).lower() == "json" else logging.Formatter(TEXT_FORMAT))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(_ContextQueueHandler(records))
+    root.setLevel(level)
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
+
+
+atexit.register(stop_logging)
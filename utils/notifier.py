@@ -2,22 +2,37 @@ import json
 import logging
 from typing import Optional
 
-import httpx
+from utils.ratelimit import get_rate_limiter
 
 
 class Notifier:
     def __init__(self, cfg: dict):
         self.cfg = cfg or {}
         self.logger = logging.getLogger(__name__)
+        # Keep-alive client, created on the first notification and kept until close()
+        self._client = None
+
+    def _http(self):
+        if self._client is None:
+            import httpx
+            from utils.http_replay import http_transport
+            self._client = httpx.Client(timeout=15, transport=http_transport())
+        return self._client
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
 
     def notify_error(self, title: str, details: str):
         url = self.cfg.get('discord_webhook_url')
         if not url:
             return
         try:
-            httpx.post(url, json={
+            get_rate_limiter().acquire(url)
+            self._http().post(url, json={
                 'content': f"❗ {title}\n```\n{details}\n```"
-            }, timeout=15)
+            })
         except Exception as e:
-            from utils.i18n import t
-            self.logger.debug(t("log.discord_notify_failed"), e)
+            from utils.i18n import lazy_t
+            self.logger.debug(lazy_t("log.discord_notify_failed"), e)
@@ -0,0 +1,67 @@
+"""
+Process pool for CPU-heavy parsing (feed XML, release titles, magnet pages).
+
+Parsing in the event loop thread serializes concurrent fetches: while one large
+feed is parsed no other response is read. With workers configured, parse
+functions run in child processes and send back plain tuples (no feedparser or
+BeautifulSoup objects cross the process boundary). Inputs smaller than
+`min_bytes` are parsed inline, where pickling would cost more than parsing.
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Callable
+
+# concurrent.futures and multiprocessing are imported when a pool is first used
+
+
+class ParsePool:
+    def __init__(self):
+        self.workers = 0
+        self.min_bytes = 64 * 1024
+        self._executor = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def configure(self, workers: int = 0, min_bytes: int = 64 * 1024):
+        """Set the worker count (0: parse inline); a running pool of another size is shut down."""
+        workers = max(0, int(workers))
+        with self._lock:
+            if workers != self.workers and self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            self.workers = workers
+            self.min_bytes = max(0, int(min_bytes))
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None and self.workers:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # spawn: forking would copy the client threads (logging, Shoko loop) into the children
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                self.logger.debug("Started %d parse worker(s)", self.workers)
+            return self._executor
+
+    def offloads(self, size: int) -> bool:
+        return bool(self.workers) and size >= self.min_bytes
+
+    async def run(self, fn: Callable[..., Any], *args, size: int = 0) -> Any:
+        """fn(*args) in a worker process when the input (`size` bytes) is large enough, else inline."""
+        if not self.offloads(size):
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor(), fn, *args)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+# Process-wide pool shared by all providers
+_pool = ParsePool()
+
+
+def get_parse_pool() -> ParsePool:
+    return _pool
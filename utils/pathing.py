@@ -1,44 +1,135 @@
+import logging
 import os
 import re
-from typing import Dict, Optional
+from functools import lru_cache
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
 
+# Placeholders run_cycle provides to path templates
+KNOWN_PLACEHOLDERS = frozenset({
+    'save_root', 'series', 'season', 'season2', 'episode', 'episode2', 'quality', 'group', 'source',
+})
 
+_FORBIDDEN_CHARS = re.compile(r"[\\/:*?\"<>|]")
+_WHITESPACE = re.compile(r"\s+")
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4096)
 def safe_name(name: Optional[str]) -> str:
+    # Memoized: the same series title is sanitized for every episode, category and path
     if not name:
         return ""
     # Replace forbidden chars and collapse whitespace
-    s = re.sub(r"[\\/:*?\"<>|]", "_", name)
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _FORBIDDEN_CHARS.sub("_", name)
+    s = _WHITESPACE.sub(" ", s).strip()
     return s
 
 
+@lru_cache(maxsize=64)
+def _root_parts(value: str) -> Tuple[bool, Tuple[str, ...]]:
+    """Split a raw save_root value into (is absolute, path components)."""
+    raw = os.path.normpath(value)
+    return raw.startswith("/"), tuple(p for p in raw.split("/") if p)
+
+
+class PathTemplate:
+    """
+    A save path template compiled once into a segment plan.
+
+    Each '/'-separated segment is either literal text (sanitized at compile time),
+    a {save_root} segment (inserted as a raw path, not sanitized), or a list of
+    literal/placeholder parts joined at render time and then sanitized.
+    A segment whose placeholders render empty is dropped (e.g. 'Season {season2}'
+    when the season is unknown); each such drop is logged once at debug level.
+    """
+
+    # Segment kinds
+    LITERAL = 0
+    ROOT = 1
+    FIELDS = 2
+
+    def __init__(self, template: str):
+        self.template = template or ""
+        self.leading = self.template.startswith("/")
+        self.fields: frozenset = frozenset()
+        self._plan: List[Tuple[int, object, Tuple[str, ...]]] = []
+        self._reported_drops: set = set()
+        fields = set()
+        for seg in self.template.split("/"):
+            if seg == "":
+                continue
+            parts: List[Tuple[str, Optional[str], str]] = []
+            seg_fields: List[str] = []
+            for literal, field, spec, conversion in Formatter().parse(seg):
+                if field is not None:
+                    if not field.isidentifier():
+                        raise ValueError(f"Invalid placeholder '{{{field}}}' in path template '{self.template}'")
+                    if conversion:
+                        raise ValueError(f"Conversions are not supported in path template '{self.template}'")
+                    seg_fields.append(field)
+                parts.append((literal, field, spec or ""))
+            fields.update(seg_fields)
+            if not seg_fields:
+                self._plan.append((self.LITERAL, safe_name("".join(p[0] for p in parts)), ()))
+            elif seg_fields == ["save_root"]:
+                self._plan.append((self.ROOT, tuple(parts), ("save_root",)))
+            else:
+                self._plan.append((self.FIELDS, tuple(parts), tuple(seg_fields)))
+        self.fields = frozenset(fields)
+
+    def validate(self, known=KNOWN_PLACEHOLDERS) -> "PathTemplate":
+        unknown = sorted(self.fields - set(known))
+        if unknown:
+            raise ValueError(f"Unknown placeholder(s) {', '.join(unknown)} in path template '{self.template}' "
+                             f"(known: {', '.join(sorted(known))})")
+        return self
+
+    def render(self, mapping: Dict[str, str]) -> str:
+        if not self.template:
+            return ""
+        leading = self.leading
+        out: List[str] = []
+        for kind, data, seg_fields in self._plan:
+            if kind == self.LITERAL:
+                if data:
+                    out.append(data)
+                continue
+            # If any placeholder is empty, drop the whole segment
+            values = [mapping.get(f, "") for f in seg_fields]
+            if any(v == "" for v in values):
+                if seg_fields not in self._reported_drops:
+                    self._reported_drops.add(seg_fields)
+                    logger.debug("Path template segment with %s dropped: empty value", ", ".join(seg_fields))
+                continue
+            rendered = "".join(
+                literal + ("" if field is None else (format(mapping[field], spec) if spec else str(mapping[field])))
+                for literal, field, spec in data
+            )
+            if kind == self.ROOT:
+                # Special-case save_root: treat as raw path, not sanitized
+                absolute, parts = _root_parts(rendered)
+                leading = leading or absolute
+                out.extend(parts)
+                continue
+            # Default behavior: sanitize the segment
+            rendered = safe_name(rendered)
+            if rendered:
+                out.append(rendered)
+        path = "/".join(out)
+        if leading:
+            path = "/" + path
+        # Components are already clean; only dot segments (or nothing at all) need normpath
+        if not out or any(part in (".", "..") for part in out):
+            return os.path.normpath(path)
+        return path
+
+
+@lru_cache(maxsize=32)
+def compile_path_template(template: str) -> PathTemplate:
+    return PathTemplate(template)
+
+
 def render_path_template(template: str, mapping: Dict[str, str]) -> str:
-    if not template:
-        return ""
-    leading = template.startswith("/")
-    segments = [seg for seg in template.split("/") if seg != ""]
-    out = []
-    for seg in segments:
-        fields = re.findall(r"{(\w+)}", seg)
-        # If any placeholder is empty, drop the whole segment
-        if fields and any((mapping.get(f, "") == "") for f in fields):
-            continue
-        seg_fmt = seg.format(**mapping)
-        # Special-case save_root: treat as raw path, not sanitized
-        if fields and len(fields) == 1 and fields[0] == "save_root":
-            raw = os.path.normpath(seg_fmt)
-            if raw.startswith("/"):
-                leading = True
-                raw = raw[1:]
-            # extend by raw components
-            for part in [p for p in raw.split("/") if p]:
-                out.append(part)
-            continue
-        # Default behavior: sanitize the segment
-        seg_fmt = safe_name(seg_fmt)
-        if seg_fmt:
-            out.append(seg_fmt)
-    path = "/".join(out)
-    if leading:
-        path = "/" + path if not path.startswith("/") else path
-    return os.path.normpath(path)
+    return compile_path_template(template).render(mapping)
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """
+    Token bucket shared by threads and asyncio tasks.
+    Callers reserve a token under a lock and are told how long to wait for it,
+    so concurrent callers queue up fairly and only sleep when the burst is spent.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return the number of seconds to wait before using it."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def refund(self):
+        """Give back a reserved token that was never used (its waiter was cancelled)."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def available(self) -> float:
+        """Tokens that could be taken right now without waiting (nothing is consumed)."""
+        with self._lock:
+            return min(self.burst, self._tokens + (self._clock() - self._updated) * self.rate)
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Fan-out cancels queries still waiting for a token: it goes to the next caller
+                self.refund()
+                raise
+        return wait
+
+
+def host_of(url_or_host: str) -> str:
+    if "://" in url_or_host:
+        return (urlsplit(url_or_host).hostname or "").lower()
+    return url_or_host.lower()
+
+
+class RateLimiter:
+    """Per-host token buckets. Hosts without a bucket are not limited, nor is anything while disabled."""
+
+    def __init__(self):
+        self._buckets: Dict[str, TokenBucket] = {}
+        # Off while an HTTP archive is replayed (utils/http_replay.py)
+        self.enabled = True
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def configure(self, host: str, rate: float, burst: int = 1):
+        with self._lock:
+            self._buckets[host_of(host)] = TokenBucket(rate, burst)
+
+    def ensure(self, host: str, rate: float, burst: int = 1):
+        """Configure a bucket only if the host has none yet (used for defaults)."""
+        with self._lock:
+            self._buckets.setdefault(host_of(host), TokenBucket(rate, burst))
+
+    def bucket(self, url_or_host: str) -> Optional[TokenBucket]:
+        if not self.enabled:
+            return None
+        return self._buckets.get(host_of(url_or_host))
+
+    def available(self, url_or_host: str) -> float:
+        """Tokens left in the host's bucket right now; unlimited hosts report infinity."""
+        bucket = self.bucket(url_or_host)
+        return bucket.available() if bucket else float("inf")
+
+    def acquire(self, url_or_host: str) -> float:
+        bucket = self.bucket(url_or_host)
+        if not bucket:
+            return 0.0
+        wait = bucket.acquire()
+        if wait > 0:
+            self.logger.debug("Rate limit: waited %.2fs for %s", wait, host_of(url_or_host))
+        return wait
+
+    async def acquire_async(self, url_or_host: str) -> float:
+        bucket = self.bucket(url_or_host)
+        if not bucket:
+            return 0.0
+        wait = await bucket.acquire_async()
+        if wait > 0:
+            self.logger.debug("Rate limit: waited %.2fs for %s", wait, host_of(url_or_host))
+        return wait
+
+
+# Process-wide limiter shared by all clients
+_limiter = RateLimiter()
+
+
+def get_rate_limiter() -> RateLimiter:
+    return _limiter
@@ -0,0 +1,23 @@
+import functools
+
+
+def http_retry(attempts: int = 3, reraise: bool = True):
+    """
+    Retry decorator for HTTP calls: `attempts` tries with exponential backoff on
+    httpx errors. tenacity and httpx are only imported on the first call so that
+    importing a client module stays cheap.
+    """
+    def decorator(fn):
+        wrapped = None
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            nonlocal wrapped
+            if wrapped is None:
+                import httpx
+                from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+                wrapped = retry(stop=stop_after_attempt(attempts), wait=wait_exponential(min=1, max=8), reraise=reraise,
+                                retry=retry_if_exception_type((httpx.HTTPError,)))(fn)
+            return wrapped(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,87 @@
+"""
+In-flight request coalescing.
+
+Concurrent calls for the same key share a single execution: the first caller
+runs the function, the others wait for its outcome (result or exception)
+instead of repeating the request. Nothing is kept once the call completes;
+callers cache the result themselves (write-through) before it returns, so a
+later caller finds it in the cache rather than starting another flight.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls from several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        # Calls that joined one in flight; owners may swap in their own counters dict
+        self.stats: Dict[str, int] = {'coalesced': 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.stats['coalesced'] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent coroutine calls on one event loop (calls from another
+    loop never join each other). The shared task is cancelled only when every
+    caller waiting for it has been cancelled.
+    """
+
+    def __init__(self):
+        self._calls: Dict[tuple, list] = {}
+        self.stats: Dict[str, int] = {'coalesced': 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight_key = (id(asyncio.get_running_loop()), key)
+        entry = self._calls.get(flight_key)
+        if entry is None:
+            task = asyncio.ensure_future(fn())
+            entry = self._calls[flight_key] = [task, 0]
+            task.add_done_callback(lambda _: self._calls.pop(flight_key, None))
+        else:
+            self.stats['coalesced'] += 1
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and entry[1] == 1:
+                task.cancel()
+            raise
+        finally:
+            entry[1] -= 1